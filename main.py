@@ -31,7 +31,7 @@ def main():
     audio_transcriber.record_audio()  # Recording the audio
     live_transcription = audio_transcriber.transcribe_audio()  # Transcribing the recorded audio
 
-    # Step 2: NLP Processing
+    # Step 2: NLP Processing (both views share a single GPT-4 request)
     print("Processing transcription for bullet points and emotion analysis...")
     bullet_points = nlp_processor.summarize_conversation(live_transcription)
     detected_emotion = nlp_processor.analyze_emotion(live_transcription)
@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, patient TEXT NOT NULL, started_at REAL NOT NULL, ended_at REAL, "
+    "transcript TEXT, bullet_points TEXT, emotion TEXT, image TEXT)",
+    "CREATE TABLE IF NOT EXISTS timeline ("
+    "session_id INTEGER NOT NULL REFERENCES sessions (id), timestamp REAL NOT NULL, end REAL, "
+    "label TEXT, emotion TEXT, intensity REAL, text TEXT)",
+    "CREATE TABLE IF NOT EXISTS summaries ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER REFERENCES sessions (id), "
+    "patient TEXT NOT NULL, created_at REAL NOT NULL, summary TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS sessions_patient_started ON sessions (patient, started_at)",
+    "CREATE INDEX IF NOT EXISTS timeline_session_timestamp ON timeline (session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS summaries_patient_created ON summaries (patient, created_at)",
+)
+
+
+class DataManager:
+    """
+    Stores therapy sessions, their per-window emotion timeline and their summaries in SQLite.
+    """
+
+    def __init__(self, db_path=None):
+        """
+        Opens (or creates) the session database in WAL mode, so the dashboard can read while a session writes.
+        :param db_path: SQLite file (defaults to SESSION_DB_PATH or ./data/sessions.db); ':memory:' for tests
+        """
+        self.db_path = db_path or os.getenv("SESSION_DB_PATH", "./data/sessions.db")
+        if self.db_path != ":memory:":
+            folder = os.path.dirname(self.db_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def start_session(self, patient="anonymous", started_at=None):
+        """
+        Opens a new session row.
+        :return: The session id.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO sessions (patient, started_at) VALUES (?, ?)",
+                (patient, started_at or time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def end_session(self, session_id, transcript=None, bullet_points=None, emotion=None, image=None,
+                    ended_at=None):
+        """
+        Closes a session and records its results (fields left as None keep their stored value).
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET ended_at = ?, transcript = COALESCE(?, transcript), "
+                "bullet_points = COALESCE(?, bullet_points), emotion = COALESCE(?, emotion), "
+                "image = COALESCE(?, image) WHERE id = ?",
+                (ended_at or time.time(), transcript,
+                 json.dumps(bullet_points) if bullet_points is not None else None,
+                 emotion, self._image_reference(image), session_id)
+            )
+            self._db.commit()
+
+    def add_timeline_entries(self, session_id, entries):
+        """
+        Appends emotion timeline entries (as produced by LiveSession) to a session in one transaction.
+        """
+        rows = [
+            (session_id, entry["timestamp"], entry.get("end"), entry.get("label"), entry.get("emotion"),
+             entry.get("intensity"), entry.get("text"))
+            for entry in entries
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO timeline (session_id, timestamp, end, label, emotion, intensity, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+
+    def save_summary(self, summary, patient="anonymous", session_id=None):
+        """
+        Stores a session summary; earlier summaries are kept as history.
+        :return: The summary id.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO summaries (session_id, patient, created_at, summary) VALUES (?, ?, ?, ?)",
+                (session_id, patient, time.time(), json.dumps(summary))
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def save_session_data(self, live_transcription, bullet_points, detected_emotion, therapeutic_image,
+                          patient="anonymous", timeline=None):
+        """
+        Saves a completed session in one call.
+        :param timeline: Optional list of emotion timeline entries
+        :return: The session id, or None on failure.
+        """
+        try:
+            session_id = self.start_session(patient)
+            if timeline:
+                self.add_timeline_entries(session_id, timeline)
+            self.end_session(session_id, transcript=live_transcription, bullet_points=bullet_points,
+                             emotion=detected_emotion, image=therapeutic_image)
+            print(f"Session {session_id} saved to {self.db_path}")
+            return session_id
+        except Exception as e:
+            print(f"Error saving session data: {e}")
+            return None
+
+    def recent_sessions(self, patient, limit=10):
+        """
+        Returns a patient's most recent sessions, newest first.
+        :return: List of session dicts (bullet points decoded).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM sessions WHERE patient = ? ORDER BY started_at DESC LIMIT ?", (patient, limit)
+            ).fetchall()
+        sessions = []
+        for row in rows:
+            session = dict(row)
+            session["bullet_points"] = json.loads(session["bullet_points"]) if session["bullet_points"] else []
+            sessions.append(session)
+        return sessions
+
+    def latest_summaries(self, patient, limit=10):
+        """
+        Returns a patient's most recent summaries, newest first.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM summaries WHERE patient = ? ORDER BY created_at DESC LIMIT ?", (patient, limit)
+            ).fetchall()
+        return [dict(row, summary=json.loads(row["summary"])) for row in rows]
+
+    def session_timeline(self, session_id):
+        """
+        Returns a session's emotion timeline in order.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT timestamp, end, label, emotion, intensity, text FROM timeline "
+                "WHERE session_id = ? ORDER BY timestamp", (session_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def emotion_trend(self, patient, limit=10):
+        """
+        Aggregates the timeline of a patient's last sessions, oldest first, for trend charts.
+        :return: List of dicts with 'session_id', 'started_at', 'windows', 'mean_intensity' and 'emotions'
+                 (window count per emotion).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.id, s.started_at, t.emotion, COUNT(t.timestamp), AVG(t.intensity) "
+                "FROM (SELECT id, started_at FROM sessions WHERE patient = ? ORDER BY started_at DESC LIMIT ?) s "
+                "JOIN timeline t ON t.session_id = s.id "
+                "GROUP BY s.id, t.emotion ORDER BY s.started_at", (patient, limit)
+            ).fetchall()
+
+        trend = {}
+        for session_id, started_at, emotion, windows, mean_intensity in rows:
+            point = trend.setdefault(session_id, {
+                "session_id": session_id, "started_at": started_at, "windows": 0,
+                "mean_intensity": 0.0, "emotions": {}
+            })
+            # Running window-weighted mean across the per-emotion groups
+            total = point["windows"] + windows
+            point["mean_intensity"] = (point["mean_intensity"] * point["windows"]
+                                       + (mean_intensity or 0.0) * windows) / total
+            point["windows"] = total
+            point["emotions"][emotion] = windows
+        return list(trend.values())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _image_reference(image):
+        # Images are stored by path or URL; anything else (e.g. raw image objects) is not persisted
+        return image if isinstance(image, str) else None
@@ -1,49 +1,132 @@
-import openai
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'structure')))
+from backend.emotion_classifier import EmotionClassifier
+from backend.prompt_builder import PromptBuilder
+from integrations.openai_config import OpenAIConfig, local_chat_response
+
+# JSON schema of the combined analysis, requested through function calling
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "bullet_points": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Key points of the conversation, one per item."
+        },
+        "emotion": {
+            "type": "string",
+            "description": "Dominant emotion of the conversation, in one lowercase word (e.g., 'anxiety', 'calm')."
+        },
+        "intensity": {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 1,
+            "description": "Intensity of the dominant emotion, from 0 (barely present) to 1 (overwhelming)."
+        },
+        "confidence": {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 1,
+            "description": "Confidence in the detected emotion, from 0 to 1."
+        }
+    },
+    "required": ["bullet_points", "emotion", "intensity", "confidence"]
+}
+
 
 class NLPProcessor:
     """
     Class to process natural language data for summarization and emotion analysis.
     """
 
-    def __init__(self, api_key="YOUR_OPENAI_API_KEY"):
-        openai.api_key = api_key
+    def __init__(self, api_key="YOUR_OPENAI_API_KEY", cache_size=32, openai_config=None, prompt_builder=None):
+        """
+        :param prompt_builder: PromptBuilder that compresses conversations to a token budget behind a
+                               stable system prompt (a 3,000-token budget by default).
+        """
+        self.openai_config = openai_config or OpenAIConfig(api_key=api_key)
+        self.prompt_builder = prompt_builder or PromptBuilder(
+            "You are an assistant summarizing therapy conversations and analyzing their emotional tone."
+        )
+        self.cache_size = cache_size
+        self._analysis_cache = OrderedDict()
 
-    def summarize_conversation(self, conversation_text):
+    def analyze(self, conversation_text):
         """
-        Summarizes the transcribed conversation into bullet points.
+        Summarizes the conversation and detects its dominant emotion in a single GPT-4 request.
+        Results are cached per transcript, so repeated calls on the same text are free.
+        :return: Dict with 'bullet_points', 'emotion', 'intensity' and 'confidence', or None on failure.
         """
-        print("Generating bullet points...")
+        key = hashlib.sha256(conversation_text.encode("utf-8")).hexdigest()
+        if key in self._analysis_cache:
+            self._analysis_cache.move_to_end(key)
+            return self._analysis_cache[key]
+
+        print("Analyzing conversation...")
 
-        prompt = (
-            "Summarize the following conversation into key bullet points:\n\n"
-            f"{conversation_text}\n\nBullet Points:"
+        messages = self.prompt_builder.build(
+            "Summarize the following conversation into key bullet points and analyze its emotional tone.",
+            conversation_text
         )
 
-        response = openai.ChatCompletion.create(
+        response = self.openai_config.create_chat_completion(
             model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200
+            messages=messages,
+            functions=[{
+                "name": "report_analysis",
+                "description": "Report the summary and emotional analysis of a conversation.",
+                "parameters": ANALYSIS_SCHEMA
+            }],
+            function_call={"name": "report_analysis"},
+            max_tokens=300,
+            fallback=lambda: self._local_analysis(conversation_text)
         )
+        if response is None:
+            print("Error analyzing conversation.")
+            return None
 
-        summary = response["choices"][0]["message"]["content"]
-        return summary.split("\n")  # Return as a list of bullet points
+        try:
+            analysis = json.loads(response["choices"][0]["message"]["function_call"]["arguments"])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            print(f"Error parsing conversation analysis: {e}")
+            return None
 
-    def analyze_emotion(self, conversation_text):
+        # Local fallbacks aren't cached, so the next call tries the API again
+        if not response.get("fallback"):
+            self._analysis_cache[key] = analysis
+            if len(self._analysis_cache) > self.cache_size:
+                self._analysis_cache.popitem(last=False)
+        return analysis
+
+    def _local_analysis(self, conversation_text):
         """
-        Analyzes the emotional tone of the conversation text.
+        Emotion analysis from the local classifier, shaped like the API's function call, for when
+        the API is unavailable. Bullet points need the LLM, so they are left empty.
         """
-        print("Analyzing emotion...")
+        result = EmotionClassifier().classify(conversation_text)
+        arguments = {
+            "bullet_points": [],
+            "emotion": result["emotion"],
+            "intensity": result["intensity"],
+            "confidence": 0.5,
+        }
+        return local_chat_response(function_call={"name": "report_analysis", "arguments": json.dumps(arguments)})
 
-        prompt = (
-            "Analyze the emotional tone of the following conversation and return the dominant emotion:\n\n"
-            f"{conversation_text}\n\nEmotion:"
-        )
-
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=50
-        )
+    def summarize_conversation(self, conversation_text):
+        """
+        Summarizes the transcribed conversation into bullet points.
+        """
+        analysis = self.analyze(conversation_text)
+        return analysis["bullet_points"] if analysis else []
 
-        emotion = response["choices"][0]["message"]["content"]
-        return emotion.strip()
+    def analyze_emotion(self, conversation_text):
+        """
+        Analyzes the emotional tone of the conversation text.
+        """
+        analysis = self.analyze(conversation_text)
+        return analysis["emotion"].strip() if analysis else ""
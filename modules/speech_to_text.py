@@ -1,23 +1,36 @@
-import openai
-import pyaudio
+import os
+import sys
 import wave
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'structure')))
+from backend.audio_profile import StreamingResampler, encode_audio, get_profile
+from backend.audio_stream import AudioRingBuffer, write_wav
+from backend.transcription import OpenAIWhisperEngine
+
 class AudioTranscriber:
-    def __init__(self, api_key, record_seconds=10, output_filename="output.wav"):
+    def __init__(self, api_key, record_seconds=10, output_filename="output.wav", transcription_engine=None,
+                 capture_profile=None):
         """
         Initializes the AudioTranscriber with the OpenAI API key and recording settings.
         :param api_key: OpenAI API Key
         :param record_seconds: Duration to record in seconds
         :param output_filename: Filename to save the recorded audio
+        :param transcription_engine: Speech-to-text backend (defaults to OpenAI Whisper)
+        :param capture_profile: Rate and codec of recorded audio (defaults to 16 kHz WAV)
         """
-        openai.api_key = api_key
         self.record_seconds = record_seconds
         self.output_filename = output_filename
+        self.transcription_engine = transcription_engine or OpenAIWhisperEngine(api_key=api_key)
+        self.capture_profile = capture_profile or get_profile("speech")
+        self.recorded_filename = output_filename
 
     def record_audio(self):
         """
         Captures real-time audio from the microphone and saves it to a .wav file.
+        Audio is resampled to the capture profile's rate while recording and encoded with its codec.
         """
+        import pyaudio
+
         print("Recording audio...")
 
         # Set up audio recording
@@ -35,11 +48,12 @@ class AudioTranscriber:
                         frames_per_buffer=chunk)
 
         frames = []
+        resampler = StreamingResampler(rate, self.capture_profile.rate)
 
         # Record the audio
         for _ in range(0, int(rate / chunk * self.record_seconds)):
             data = stream.read(chunk)
-            frames.append(data)
+            frames.append(resampler.process(data))
 
         # Stop and close the stream
         stream.stop_stream()
@@ -50,24 +64,88 @@ class AudioTranscriber:
         wf = wave.open(self.output_filename, 'wb')
         wf.setnchannels(channels)
         wf.setsampwidth(p.get_sample_size(sample_format))
-        wf.setframerate(rate)
+        wf.setframerate(self.capture_profile.rate)
         wf.writeframes(b''.join(frames))
         wf.close()
+        self.recorded_filename = encode_audio(self.output_filename, self.capture_profile.codec)
+
+        saved = resampler.bytes_in - os.path.getsize(self.recorded_filename)
+        print("Recording complete. Audio saved as:", self.recorded_filename)
+        print(f"Capture profile saved {saved / 1024:.0f} KB compared with raw PCM.")
+
+    def stream_audio(self, window_seconds=5, overlap_seconds=1, buffer_seconds=30):
+        """
+        Captures audio and yields overlapping windows while recording continues.
+        Each window is resampled to the capture profile's rate and written to its own file
+        so it can be transcribed right away.
+        :param window_seconds: Length of each window in seconds
+        :param overlap_seconds: Audio shared between consecutive windows
+        :param buffer_seconds: Capacity of the ring buffer; the oldest audio is dropped beyond it
+        :return: Generator of (start_seconds, filename) tuples
+        """
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError("overlap_seconds must be smaller than window_seconds.")
+        import pyaudio
+
+        print("Recording audio (streaming)...")
+
+        chunk = 1024
+        sample_format = pyaudio.paInt16
+        channels = 1
+        rate = 44100
+        out_rate = self.capture_profile.rate
+
+        p = pyaudio.PyAudio()
+        sample_width = p.get_sample_size(sample_format)
+        bytes_per_second = out_rate * channels * sample_width
+        window_bytes = int(window_seconds * out_rate) * channels * sample_width
+        step_bytes = int((window_seconds - overlap_seconds) * out_rate) * channels * sample_width
+        ring = AudioRingBuffer(max(int(buffer_seconds * out_rate) * channels * sample_width, window_bytes))
+        resampler = StreamingResampler(rate, out_rate)
+
+        total_frames = int(rate * self.record_seconds)
+        captured = {"frames": 0}
+
+        def on_audio(in_data, frame_count, time_info, status):
+            ring.write(resampler.process(in_data))
+            captured["frames"] += frame_count
+            if captured["frames"] >= total_frames:
+                ring.close()
+                return (None, pyaudio.paComplete)
+            return (None, pyaudio.paContinue)
+
+        stream = p.open(format=sample_format, channels=channels,
+                        rate=rate, input=True,
+                        frames_per_buffer=chunk, stream_callback=on_audio)
 
-        print("Recording complete. Audio saved as:", self.output_filename)
+        base = os.path.splitext(self.output_filename)[0]
+        try:
+            index = 0
+            while True:
+                window = ring.read_window(window_bytes, step_bytes)
+                if window is None:
+                    break
+                start, data = window
+                filename = write_wav(f"{base}_{index:04d}.wav", data, out_rate, channels, sample_width)
+                filename = encode_audio(filename, self.capture_profile.codec)
+                yield start / bytes_per_second, filename
+                index += 1
+        finally:
+            ring.close()
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+            print("Recording complete.")
 
-    def transcribe_audio(self):
+    def transcribe_audio(self, filename=None):
         """
-        Transcribes the recorded audio file using OpenAI's Whisper model.
+        Transcribes the recorded audio file using the configured transcription engine.
+        :param filename: Audio file to transcribe (defaults to the last recording)
         :return: Transcribed text from the audio.
         """
         print("Transcription in progress...")
 
-        # Use OpenAI Whisper for transcription
-        with open(self.output_filename, "rb") as audio_file:
-            transcript = openai.Audio.transcribe("whisper-1", audio_file)
-        
-        return transcript["text"]
+        return self.transcription_engine.transcribe(filename or self.recorded_filename)
 
 # Example usage
 if __name__ == "__main__":
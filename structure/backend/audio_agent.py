@@ -1,13 +1,26 @@
-import openai
 import json
-import pyaudio
 import wave
 import datetime
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.audio_profile import StreamingResampler, encode_audio, get_profile
+from backend.audio_stream import AudioRingBuffer, write_wav
+from backend.emotion_classifier import EmotionClassifier
+from backend.incremental_summary import SYSTEM_PROMPT, IncrementalSummarizer
+from backend.long_transcription import LongAudioTranscriber
+from backend.prompt_builder import PromptBuilder, compress_transcript
+from backend.transcription import OpenAIWhisperEngine, create_transcription_engine
+from backend.vad import VoiceActivityDetector
+from integrations.openai_config import OpenAIConfig
+from integrations.tracing import get_tracer
+
 class AudioAgent:
-    def __init__(self, openai_api_key, patient_data, target_language="en"):
+    def __init__(self, openai_api_key, patient_data, target_language="en", transcription_engine=None,
+                 openai_config=None, emotion_classifier=None, capture_profile=None, vad=None,
+                 data_manager=None, tracer=None, prompt_builder=None):
         """
         Initialize the AudioAgent with OpenAI API credentials and patient data.
 
@@ -15,67 +28,281 @@ class AudioAgent:
             openai_api_key (str): OpenAI API key.
             patient_data (dict): Patient-specific information for contextual summaries.
             target_language (str): Language to translate the transcription into (default is 'en' for English).
+            transcription_engine (TranscriptionEngine): Speech-to-text backend (defaults to OpenAI Whisper).
+            openai_config (OpenAIConfig): Shared OpenAI client (built from openai_api_key if omitted).
+            emotion_classifier (EmotionClassifier): Local classifier used by analyze_sentiment.
+            capture_profile (CaptureProfile): Rate and codec of captured audio (defaults to 16 kHz WAV).
+            vad (VoiceActivityDetector): Drops silence from streamed windows before transcription.
+            data_manager (DataManager): Session store that keeps every saved summary as history.
+            tracer (Tracer): Records a span for every capture, transcription and summary (defaults to
+                the process-wide tracer).
+            prompt_builder (PromptBuilder): Fits summary prompts to a token budget behind a prefix
+                shared by every summary request of the session (built from patient_data if omitted).
         """
         self.openai_api_key = openai_api_key
         self.patient_data = patient_data
         self.target_language = target_language
-        openai.api_key = self.openai_api_key
+        self.openai_config = openai_config or OpenAIConfig(api_key=self.openai_api_key)
+        self.transcription_engine = transcription_engine or OpenAIWhisperEngine(api_key=self.openai_config.api_key)
+        self.emotion_classifier = emotion_classifier or EmotionClassifier()
+        self.capture_profile = capture_profile or get_profile("speech")
+        self.capture_stats = {"raw_bytes": 0, "written_bytes": 0}
+        self.vad = vad or VoiceActivityDetector()
+        self.data_manager = data_manager
+        self.tracer = tracer or get_tracer()
+        self.prompt_builder = prompt_builder or PromptBuilder(
+            SYSTEM_PROMPT, patient_data, emotion_classifier=self.emotion_classifier
+        )
+
+    def warm_up(self):
+        """
+        Load the transcription engine and the OpenAI client ahead of the first window.
+        """
+        self.transcription_engine.warm_up()
+        self.openai_config.warm_up()
 
     def capture_audio(self, chunk_size=1024, rate=44100, duration=60, output_folder="./recordings", file_name="recorded_audio.wav"):
         """
         Captures real-time audio from the microphone and saves it to a file.
 
+        Audio is recorded at the device `rate` and resampled to the capture profile's rate as it is
+        captured, then encoded with the profile's codec.
+
         Returns:
-            str: Path to the saved audio file.
+            str: Path to the saved audio file (its extension follows the profile's codec).
+        """
+        with self.tracer.span("capture_audio", seconds=duration) as span:
+            import pyaudio
+
+            audio_format = pyaudio.paInt16
+            channels = 1
+
+            # Ensure the output folder exists
+            if not os.path.exists(output_folder):
+                os.makedirs(output_folder)
+
+            output_path = os.path.join(output_folder, file_name)
+
+            audio = pyaudio.PyAudio()
+            stream = audio.open(format=audio_format, channels=channels, rate=rate, input=True, frames_per_buffer=chunk_size)
+
+            resampler = StreamingResampler(rate, self.capture_profile.rate)
+
+            print("Recording...")
+            frames = []
+            for _ in range(0, int(rate / chunk_size * duration)):
+                data = stream.read(chunk_size)
+                frames.append(resampler.process(data))
+            print("Recording complete.")
+
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+
+            with wave.open(output_path, 'wb') as wf:
+                wf.setnchannels(channels)
+                wf.setsampwidth(audio.get_sample_size(audio_format))
+                wf.setframerate(self.capture_profile.rate)
+                wf.writeframes(b''.join(frames))
+            output_path = self._finish_capture(output_path, resampler.bytes_in)
+            savings = self.capture_savings()
+            print(f"Capture profile saved {savings['saved_bytes'] / 1024:.0f} KB so far "
+                  f"({savings['ratio']:.2f}x smaller than raw PCM).")
+
+            span.add("bytes", os.path.getsize(output_path))
+            print(f"Audio saved at: {output_path}")
+            return output_path
+
+    def stream_audio(self, chunk_size=1024, rate=44100, duration=60, window_seconds=10,
+                     overlap_seconds=2, buffer_seconds=60):
+        """
+        Captures audio from the microphone and yields overlapping windows while recording continues.
+
+        Frames are resampled to the capture profile's rate and pushed by the PyAudio callback into a
+        bounded ring buffer, so transcription and emotion analysis can start on the first window
+        instead of waiting for the whole recording.
+
+        Args:
+            chunk_size (int): Frames per PyAudio buffer.
+            rate (int): Sample rate of the input device in Hz.
+            duration (float): Total recording length in seconds.
+            window_seconds (float): Length of each yielded window.
+            overlap_seconds (float): Audio shared between consecutive windows.
+            buffer_seconds (float): Capacity of the ring buffer; the oldest audio is dropped beyond it.
+
+        Yields:
+            dict: Window with 'index', 'start' and 'end' (seconds from the start of the recording),
+                  'frames' (raw PCM bytes), 'rate', 'source_rate' (device rate), 'channels' and 'sample_width'.
         """
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError("overlap_seconds must be smaller than window_seconds.")
+        import pyaudio
+
         audio_format = pyaudio.paInt16
         channels = 1
 
-        # Ensure the output folder exists
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+        audio = pyaudio.PyAudio()
+        sample_width = audio.get_sample_size(audio_format)
+        frame_bytes = channels * sample_width
+        out_rate = self.capture_profile.rate
+        window_bytes = int(window_seconds * out_rate) * frame_bytes
+        step_bytes = int((window_seconds - overlap_seconds) * out_rate) * frame_bytes
+        ring = AudioRingBuffer(max(int(buffer_seconds * out_rate) * frame_bytes, window_bytes))
+        resampler = StreamingResampler(rate, out_rate)
 
-        output_path = os.path.join(output_folder, file_name)
+        total_frames = int(rate * duration)
+        captured = {"frames": 0}
 
-        audio = pyaudio.PyAudio()
-        stream = audio.open(format=audio_format, channels=channels, rate=rate, input=True, frames_per_buffer=chunk_size)
+        def on_audio(in_data, frame_count, time_info, status):
+            ring.write(resampler.process(in_data))
+            captured["frames"] += frame_count
+            if captured["frames"] >= total_frames:
+                ring.close()
+                return (None, pyaudio.paComplete)
+            return (None, pyaudio.paContinue)
+
+        stream = audio.open(format=audio_format, channels=channels, rate=rate, input=True,
+                            frames_per_buffer=chunk_size, stream_callback=on_audio)
+
+        print("Recording (streaming)...")
+        try:
+            index = 0
+            while True:
+                window = ring.read_window(window_bytes, step_bytes)
+                if window is None:
+                    break
+                start, data = window
+                start_seconds = start / (out_rate * frame_bytes)
+                yield {
+                    "index": index,
+                    "start": start_seconds,
+                    "end": start_seconds + len(data) / (out_rate * frame_bytes),
+                    "frames": data,
+                    "rate": out_rate,
+                    "source_rate": rate,
+                    "channels": channels,
+                    "sample_width": sample_width,
+                }
+                index += 1
+        finally:
+            ring.close()
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+            print("Recording complete.")
+            if ring.dropped_bytes:
+                print(f"Warning: dropped {ring.dropped_bytes / (out_rate * frame_bytes):.1f}s of audio "
+                      f"because processing fell behind.")
 
-        print("Recording...")
-        frames = []
-        for _ in range(0, int(rate / chunk_size * duration)):
-            data = stream.read(chunk_size)
-            frames.append(data)
-        print("Recording complete.")
+    def save_window_to_wav(self, window, output_folder="./recordings", file_name=None):
+        """
+        Save a window yielded by stream_audio so it can be transcribed, encoded with the
+        capture profile's codec.
 
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
+        Returns:
+            str: Path to the saved audio file.
+        """
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        file_name = file_name or f"window_{window['index']:04d}.wav"
+        path = write_wav(os.path.join(output_folder, file_name), window["frames"],
+                         window["rate"], window["channels"], window["sample_width"])
+        raw_bytes = len(window["frames"]) * window.get("source_rate", window["rate"]) // window["rate"]
+        return self._finish_capture(path, raw_bytes)
 
-        with wave.open(output_path, 'wb') as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(audio.get_sample_size(audio_format))
-            wf.setframerate(rate)
-            wf.writeframes(b''.join(frames))
+    def capture_savings(self):
+        """
+        Report how many bytes the capture profile saved compared with raw device-rate PCM.
 
-        print(f"Audio saved at: {output_path}")
-        return output_path
+        Returns:
+            dict: 'raw_bytes', 'written_bytes', 'saved_bytes' and 'ratio' (raw / written).
+        """
+        raw, written = self.capture_stats["raw_bytes"], self.capture_stats["written_bytes"]
+        return {
+            "raw_bytes": raw,
+            "written_bytes": written,
+            "saved_bytes": raw - written,
+            "ratio": raw / written if written else 0.0,
+        }
+
+    def _finish_capture(self, wav_path, raw_bytes):
+        # Encode with the profile's codec and account for the bytes saved
+        path = encode_audio(wav_path, self.capture_profile.codec)
+        self.capture_stats["raw_bytes"] += raw_bytes
+        self.capture_stats["written_bytes"] += os.path.getsize(path)
+        return path
 
     def transcribe_audio(self, audio_file):
         """
-        Transcribes audio to text using OpenAI's Whisper API.
+        Transcribes audio to text using the configured transcription engine.
 
         Returns:
             str: Transcribed text.
         """
+        with self.tracer.span("transcribe_audio", engine=type(self.transcription_engine).__name__) as span:
+            try:
+                print("Transcribing audio...")
+                span.add("bytes", os.path.getsize(audio_file))
+                return self.transcription_engine.transcribe(audio_file)
+            except Exception as e:
+                print(f"Error during transcription: {e}")
+                span.fail(e)
+                return None
+
+    def detect_speech(self, window):
+        """
+        Run voice-activity detection on a window yielded by stream_audio.
+
+        Returns:
+            list: Speech segments with 'start' and 'end' (seconds into the recording) and 'frames'.
+        """
+        return self.vad.detect(window["frames"], window["rate"], offset=window["start"])
+
+    def transcribe_window(self, window, output_folder="./recordings", file_name=None):
+        """
+        Transcribes only the speech in a streamed window; silent windows are skipped without an API call.
+
+        Returns:
+            str: Transcribed text ("" for a silent window), or None on failure.
+        """
+        segments = self.detect_speech(window)
+        if not segments:
+            return ""
+        speech_window = dict(window, frames=b"".join(segment["frames"] for segment in segments),
+                             start=segments[0]["start"], end=segments[-1]["end"])
+        return self.transcribe_audio(self.save_window_to_wav(speech_window, output_folder, file_name))
+
+    def transcribe_long_audio(self, audio_file, max_workers=4, chunk_seconds=240, overlap_seconds=5):
+        """
+        Transcribes a long recording by splitting it at silences into overlapping chunks that are
+        transcribed concurrently and stitched back together.
+
+        Returns:
+            dict: 'text', 'segments' (timed against the whole recording) and 'chunks', or None on failure.
+        """
         try:
-            print("Transcribing audio...")
-            with open(audio_file, "rb") as file:
-                response = openai.Audio.transcribe(model="whisper-1", file=file)
-            return response.get("text", "")
+            transcriber = LongAudioTranscriber(self.transcription_engine, max_workers=max_workers,
+                                               chunk_seconds=chunk_seconds, overlap_seconds=overlap_seconds)
+            return transcriber.transcribe(audio_file)
         except Exception as e:
-            print(f"Error during transcription: {e}")
+            print(f"Error during long transcription: {e}")
             return None
 
+    def analyze_sentiment(self, texts):
+        """
+        Classifies the emotion of one or more transcript windows locally, without an API call.
+
+        Args:
+            texts (str or list): A transcript, or a list of transcript windows to classify as a batch.
+
+        Returns:
+            list: One dict per window with 'label' (calm, uplifting or neutral, as used by
+                  VisualLightAgent), 'emotion', 'intensity' and 'score'.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.emotion_classifier.classify_batch(texts)
+
     def translate_text(self, text):
         """
         Translates the transcribed text to the target language.
@@ -86,64 +313,100 @@ class AudioAgent:
         Returns:
             str: Translated text.
         """
-        try:
-            print("Translating text...")
-            response = openai.Completion.create(
-                model="text-davinci-003",
-                prompt=f"Translate the following text to {self.target_language}: {text}",
-                max_tokens=500
-            )
-            translated_text = response.choices[0].text.strip()
-            return translated_text
-        except Exception as e:
-            print(f"Error during translation: {e}")
+        print("Translating text...")
+        response = self.openai_config.create_completion(
+            model="text-davinci-003",
+            prompt=f"Translate the following text to {self.target_language}: {text}",
+            max_tokens=500
+        )
+        if response is None:
+            print("Error during translation.")
             return None
+        translated_text = response["choices"][0]["text"].strip()
+        return translated_text
 
-    def summarize_transcript(self, transcript):
+    def incremental_summarizer(self, **kwargs):
+        """
+        Build an IncrementalSummarizer that summarizes this patient's session chunk by chunk as it runs.
+
+        Args:
+            **kwargs: IncrementalSummarizer options (e.g., chunk_chars, merge_fanin).
+        """
+        return IncrementalSummarizer(self.openai_config, self.patient_data, prompt_builder=self.prompt_builder,
+                                     **kwargs)
+
+    def summarize_transcript(self, transcript, max_transcript_tokens=None):
         """
         Summarizes the transcribed speech using OpenAI's GPT API, incorporating patient data.
 
+        Filler and repetition are removed from the transcript first. A transcript still longer than
+        the token budget is summarized in chunks that are merged hierarchically, so no single
+        request outgrows the budget and no part of the session is left out.
+
         Args:
             transcript (str): Transcribed speech text.
+            max_transcript_tokens (int): Transcript token budget (defaults to the prompt builder's).
 
         Returns:
             dict: A summary of the session in structured JSON format.
         """
-        patient_context = f"Patient Name: {self.patient_data.get('name', 'Unknown')}, " \
-                          f"Age: {self.patient_data.get('age', 'Unknown')}, " \
-                          f"History: {self.patient_data.get('history', 'No history provided')}."
-        
-        prompt = (
-            f"Context: {patient_context}\n\n"
-            f"Instructions:\n"
-            f"Summarize the session with these sections:\n"
-            f"- Overview: A concise description of the discussion.\n"
-            f"- Key Insights: Specific observations or patterns.\n"
-            f"- Emotions: Any noticeable emotional states.\n"
-            f"- Goals: Actionable therapeutic goals.\n"
-            f"Provide the summary in JSON format."
-            f"\nTranscript:\n{transcript}\n\n"
-        )
+        with self.tracer.span("summarize_transcript") as span:
+            span.add("bytes", len(transcript.encode("utf-8")))
+            budget = max_transcript_tokens or self.prompt_builder.budget_tokens
+            compressed = compress_transcript(transcript)
+            if self.prompt_builder.count(compressed) > budget:
+                print("Transcript exceeds the token budget; summarizing it in chunks...")
+                # About three characters per token leaves each chunk some headroom under the budget
+                summarizer = self.incremental_summarizer(chunk_chars=budget * 3)
+                summarizer.add_text(compressed)
+                return summarizer.finish()
 
-        try:
-            print("Generating summary...")
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an assistant helping a therapist interpret patient speech."},
-                    {"role": "user", "content": prompt}
-                ]
+            messages = self.prompt_builder.build(
+                "Summarize the session with these sections:\n"
+                "- Overview: A concise description of the discussion.\n"
+                "- Key Insights: Specific observations or patterns.\n"
+                "- Emotions: Any noticeable emotional states.\n"
+                "- Goals: Actionable therapeutic goals.\n"
+                "Provide the summary in JSON format.",
+                transcript,
+                budget_tokens=max_transcript_tokens
             )
-            summary_json = json.loads(response.choices[0].message['content'])
-            return summary_json
-        except Exception as e:
-            print(f"Error generating summary: {e}")
-            return None
+            report = self.prompt_builder.last_report
+            if report and report["tokens_saved"]:
+                print(f"Prompt reduced from {report['original_tokens']} to {report['prompt_tokens']} tokens.")
+
+            try:
+                print("Generating summary...")
+                response = self.openai_config.create_chat_completion(model="gpt-4", messages=messages)
+                if response is None:
+                    print("Error generating summary.")
+                    span.fail("no response")
+                    return None
+                summary_json = json.loads(response["choices"][0]["message"]["content"])
+                return summary_json
+            except Exception as e:
+                print(f"Error generating summary: {e}")
+                span.fail(e)
+                return None
 
-    def save_summary_to_json(self, summary, output_folder="./summaries", file_name="session_summary.json"):
+    def generate_session_structure(self, transcript):
+        """
+        Build the structured session summary used by TherapySessionManager.
+
+        Returns:
+            dict: A summary of the session in structured JSON format.
+        """
+        return self.summarize_transcript(transcript)
+
+    def save_summary_to_json(self, summary, output_folder="./summaries", file_name="session_summary.json",
+                             session_id=None):
         """
         Save the session summary to a JSON file in the specified folder.
+
+        With a data manager the summary is also added to the patient's summary history.
         """
+        if self.data_manager is not None:
+            self.data_manager.save_summary(summary, self.patient_data.get("name", "anonymous"), session_id)
         try:
             if not os.path.exists(output_folder):
                 os.makedirs(output_folder)
@@ -166,10 +429,19 @@ if __name__ == "__main__":
         "history": "Anxiety and mild depression."
     }
 
-    # Initialize the AudioAgent
-    audio_agent = AudioAgent(openai_api_key=openai_api_key, patient_data=patient_data, target_language="en")
+    # Initialize the AudioAgent ('openai', 'local' or 'stub' transcription)
+    transcription_engine = create_transcription_engine(os.getenv("TRANSCRIPTION_ENGINE", "openai"))
+    audio_agent = AudioAgent(openai_api_key=openai_api_key, patient_data=patient_data, target_language="en",
+                             transcription_engine=transcription_engine)
 
     # Step 1: Capture audio
+    if "--stream" in sys.argv:
+        # Transcribe each window as soon as it is captured
+        for window in audio_agent.stream_audio(duration=60):
+            window_file = audio_agent.save_window_to_wav(window)
+            print(f"[{window['start']:.0f}s-{window['end']:.0f}s] {audio_agent.transcribe_audio(window_file)}")
+        sys.exit(0)
+
     audio_file = audio_agent.capture_audio(duration=60)
 
     # Step 2: Transcribe and translate the audio
@@ -0,0 +1,119 @@
+import os
+import numpy as np
+
+CODEC_EXTENSIONS = {"wav": ".wav", "flac": ".flac", "opus": ".ogg"}
+
+
+class CaptureProfile:
+    def __init__(self, rate=16000, channels=1, codec="wav"):
+        """
+        Output format for captured audio.
+
+        Args:
+            rate (int): Sample rate audio is resampled to as it is captured (16 kHz is enough for speech).
+            channels (int): Number of channels.
+            codec (str): 'wav' (16-bit PCM), 'flac' (lossless) or 'opus' (lossy, smallest).
+                FLAC and Opus need the soundfile package.
+        """
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown codec '{codec}'. Choose one of: {', '.join(CODEC_EXTENSIONS)}.")
+        self.rate = rate
+        self.channels = channels
+        self.codec = codec
+
+
+PROFILES = {
+    "raw": CaptureProfile(rate=44100),
+    "speech": CaptureProfile(rate=16000),
+    "speech_flac": CaptureProfile(rate=16000, codec="flac"),
+    "speech_opus": CaptureProfile(rate=16000, codec="opus"),
+}
+
+
+def get_profile(name):
+    """
+    Return a predefined capture profile ('raw', 'speech', 'speech_flac' or 'speech_opus').
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown capture profile '{name}'. Choose one of: {', '.join(PROFILES)}.")
+    return PROFILES[name]
+
+
+class StreamingResampler:
+    def __init__(self, source_rate, target_rate, taps=63):
+        """
+        Resamples 16-bit mono PCM chunk by chunk, with state carried across chunk boundaries.
+
+        A windowed-sinc low-pass filter removes content above the new Nyquist frequency, then
+        samples are linearly interpolated at the target rate.
+
+        Args:
+            source_rate (int): Rate of the incoming audio.
+            target_rate (int): Rate of the returned audio.
+            taps (int): Length of the anti-aliasing filter.
+        """
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        cutoff = 0.45 * min(source_rate, target_rate) / source_rate
+        n = np.arange(taps) - (taps - 1) / 2
+        self._taps = (2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)).astype(np.float32)
+        self._taps /= self._taps.sum()
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._position = 0.0
+
+    def process(self, data):
+        """
+        Resample one chunk of 16-bit PCM bytes.
+
+        Returns:
+            bytes: Resampled 16-bit PCM.
+        """
+        self.bytes_in += len(data)
+        if self.source_rate == self.target_rate:
+            self.bytes_out += len(data)
+            return data
+
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        buffered = np.concatenate([self._history, samples])
+        filtered = np.convolve(buffered, self._taps, mode="valid")
+        self._history = buffered[len(buffered) - len(self._history):]
+
+        stream = np.concatenate([self._carry, filtered])
+        positions = np.arange(self._position, len(stream) - 1, self.step)
+        resampled = np.interp(positions, np.arange(len(stream)), stream)
+        next_position = positions[-1] + self.step if len(positions) else self._position
+        self._position = next_position - (len(stream) - 1)
+        self._carry = stream[-1:]
+
+        output = np.clip(np.round(resampled), -32768, 32767).astype(np.int16).tobytes()
+        self.bytes_out += len(output)
+        return output
+
+
+def encode_audio(wav_path, codec):
+    """
+    Encode a WAV file with a compressed codec next to the original, and remove the WAV.
+
+    Returns:
+        str: Path to the encoded file (the WAV path itself for the 'wav' codec).
+    """
+    if codec == "wav":
+        return wav_path
+    try:
+        import soundfile as sf
+    except ImportError as e:
+        raise ImportError(f"Encoding to {codec} requires soundfile: pip install soundfile") from e
+
+    data, rate = sf.read(wav_path, dtype="int16")
+    encoded_path = os.path.splitext(wav_path)[0] + CODEC_EXTENSIONS[codec]
+    if codec == "flac":
+        sf.write(encoded_path, data, rate, format="FLAC")
+    else:
+        sf.write(encoded_path, data, rate, format="OGG", subtype="OPUS")
+    os.remove(wav_path)
+    return encoded_path
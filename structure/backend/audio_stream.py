@@ -0,0 +1,86 @@
+import threading
+import wave
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity_bytes):
+        """
+        Bounded buffer of raw PCM bytes shared between the capture callback and a consumer.
+
+        When the consumer falls behind, the oldest audio is dropped so memory stays bounded.
+
+        Args:
+            capacity_bytes (int): Maximum number of bytes held at once.
+        """
+        self.capacity_bytes = capacity_bytes
+        self.dropped_bytes = 0
+        self._buffer = bytearray()
+        self._offset = 0  # Absolute byte offset of self._buffer[0] in the recording
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def write(self, data):
+        """
+        Append captured audio, dropping the oldest bytes if the buffer is full.
+        """
+        with self._condition:
+            self._buffer.extend(data)
+            overflow = len(self._buffer) - self.capacity_bytes
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self._offset += overflow
+                self.dropped_bytes += overflow
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Mark the end of the recording and wake up any waiting reader.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def read_window(self, window_bytes, step_bytes, timeout=None):
+        """
+        Block until a full window is available, return it and advance by one step.
+
+        Args:
+            window_bytes (int): Size of the window to return.
+            step_bytes (int): Number of bytes to advance after reading (window minus overlap).
+            timeout (float): Maximum seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            tuple: (start_offset, data), or None once the buffer is closed and drained.
+                   The last window of a recording may be shorter than window_bytes.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._closed or len(self._buffer) >= window_bytes, timeout=timeout
+            )
+            if len(self._buffer) >= window_bytes:
+                data = bytes(self._buffer[:window_bytes])
+            elif self._closed and len(self._buffer) > window_bytes - step_bytes:
+                # Flush the tail, but only if it holds audio not covered by the previous window
+                data = bytes(self._buffer)
+            else:
+                return None
+            start = self._offset
+            advance = min(step_bytes, len(self._buffer))
+            del self._buffer[:advance]
+            self._offset += advance
+            return start, data
+
+
+def write_wav(path, frames, rate, channels=1, sample_width=2):
+    """
+    Write raw PCM frames to a WAV file.
+
+    Returns:
+        str: Path to the written file.
+    """
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(frames)
+    return path
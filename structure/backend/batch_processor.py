@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.audio_agent import AudioAgent
+from backend.transcription import create_transcription_engine
+from integrations.openai_config import OpenAIConfig
+from integrations.resilience import TokenBucketLimiter
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def file_sha256(path, block_size=1 << 20):
+    """
+    Hash a file's contents block by block.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def audio_seconds(path):
+    """
+    Return the duration of a WAV file from its header, or 0.0 if it can't be read.
+    """
+    try:
+        with wave.open(path, 'rb') as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return 0.0
+
+
+class Manifest:
+    def __init__(self, path):
+        """
+        Append-only JSONL record of processed recordings, keyed by content hash, so reruns skip finished ones.
+
+        The latest record for a hash wins, so a recording that is rerun after a partial result is
+        recorded again once it completes.
+
+        Args:
+            path (str): Manifest file.
+        """
+        self.path = path
+        self.completed = {}
+        if os.path.exists(path):
+            with open(path) as manifest_file:
+                for line in manifest_file:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self.completed[record["sha256"]] = record
+
+    def is_complete(self, file_hash, summarize=True):
+        """
+        Whether a recording was fully processed: its status is 'done' and, if summaries are
+        requested, it has one.
+        """
+        record = self.completed.get(file_hash)
+        if record is None or record.get("status", "done") != "done":
+            return False
+        return record.get("summary", False) or not summarize
+
+    def add(self, record):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.path, "a") as manifest_file:
+            manifest_file.write(json.dumps(record) + "\n")
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        self.completed[record["sha256"]] = record
+
+
+def _init_worker(engine_name, patient, workers, transcribe_slots, summary_slots, summarize, chunk_workers):
+    # Every process shares the account's rate limits, so each gets an equal share of them
+    limiter = TokenBucketLimiter(
+        requests_per_minute=float(os.environ.get("OPENAI_RPM", 500)) / workers,
+        tokens_per_minute=float(os.environ.get("OPENAI_TPM", 40000)) / workers
+    )
+    openai_config = OpenAIConfig(limiter=limiter)
+    _worker["agent"] = AudioAgent(
+        openai_api_key=openai_config.api_key,
+        patient_data={"name": patient},
+        transcription_engine=create_transcription_engine(engine_name),
+        openai_config=openai_config
+    )
+    _worker["transcribe_slots"] = transcribe_slots
+    _worker["summary_slots"] = summary_slots
+    _worker["summarize"] = summarize
+    _worker["chunk_workers"] = chunk_workers
+
+
+def process_recording(path, file_hash, output_folder):
+    """
+    Transcribe one recording, build its emotion timeline and summarize it (runs in a pool process).
+
+    Returns:
+        dict: Manifest record with 'path', 'sha256', 'audio_seconds', 'output', 'summary' (bool),
+              'processing_seconds' and 'status' ('done', 'partial' if the summary failed, or 'failed').
+    """
+    agent = _worker["agent"]
+    started = time.perf_counter()
+    record = {"path": path, "sha256": file_hash, "audio_seconds": audio_seconds(path)}
+
+    with _worker["transcribe_slots"]:
+        transcript = agent.transcribe_long_audio(path, max_workers=_worker["chunk_workers"])
+    if not transcript or not transcript["text"]:
+        return dict(record, status="failed", error="No transcript",
+                    processing_seconds=time.perf_counter() - started)
+
+    segments = transcript["segments"]
+    timeline = [
+        {
+            "timestamp": segment["start"],
+            "end": segment["end"],
+            "label": result["label"],
+            "emotion": result["emotion"],
+            "intensity": result["intensity"],
+            "text": segment["text"],
+        }
+        for segment, result in zip(segments, agent.analyze_sentiment([segment["text"] for segment in segments]))
+    ]
+
+    summary = None
+    if _worker["summarize"]:
+        with _worker["summary_slots"]:
+            summary = agent.summarize_transcript(transcript["text"])
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(output_folder, f"{name}_{file_hash[:8]}.json")
+    with open(output, "w") as output_file:
+        json.dump({"path": path, "sha256": file_hash, "transcript": transcript["text"], "timeline": timeline,
+                   "summary": summary}, output_file, indent=4)
+
+    record.update(output=output, summary=summary is not None, processing_seconds=time.perf_counter() - started)
+    if _worker["summarize"] and summary is None:
+        return dict(record, status="partial", error="No summary")
+    return dict(record, status="done")
+
+
+class BatchProcessor:
+    def __init__(self, output_folder="./batch_output", manifest_path=None, workers=4, transcribe_concurrency=2,
+                 summary_concurrency=2, chunk_workers=2, engine="openai", patient="archive", summarize=True):
+        """
+        Processes archived recordings through a process pool, skipping files already in the manifest.
+
+        Args:
+            output_folder (str): Folder for the per-recording JSON results.
+            manifest_path (str): Manifest of finished recordings (defaults to manifest.jsonl in output_folder).
+            workers (int): Pool processes.
+            transcribe_concurrency (int): Recordings transcribed at the same time across the pool.
+            summary_concurrency (int): Summaries requested at the same time across the pool.
+            chunk_workers (int): Chunks of one long recording transcribed at the same time.
+            engine (str): Transcription engine ('openai', 'local' or 'stub').
+            patient (str): Patient name used in summary prompts.
+            summarize (bool): Request a summary for each recording.
+        """
+        self.output_folder = output_folder
+        self.manifest = Manifest(manifest_path or os.path.join(output_folder, "manifest.jsonl"))
+        self.workers = workers
+        self.transcribe_concurrency = transcribe_concurrency
+        self.summary_concurrency = summary_concurrency
+        self.chunk_workers = chunk_workers
+        self.engine = engine
+        self.patient = patient
+        self.summarize = summarize
+
+    def find_recordings(self, folder, extension=".wav"):
+        """
+        Return every recording under a folder, sorted by path.
+        """
+        recordings = []
+        for root, _, files in os.walk(folder):
+            recordings.extend(os.path.join(root, name) for name in files if name.lower().endswith(extension))
+        return sorted(recordings)
+
+    def run(self, folder):
+        """
+        Process every unfinished recording under a folder.
+
+        Returns:
+            dict: Counts of processed, partial (summary failed), skipped and failed files and the
+                  throughput figures.
+        """
+        if not os.path.exists(self.output_folder):
+            os.makedirs(self.output_folder)
+
+        pending = []
+        skipped = 0
+        for path in self.find_recordings(folder):
+            file_hash = file_sha256(path)
+            if self.manifest.is_complete(file_hash, self.summarize):
+                skipped += 1
+            else:
+                pending.append((path, file_hash))
+        print(f"{len(pending)} recordings to process, {skipped} already done.")
+
+        # Semaphores shared by the pool processes bound the concurrency of each stage
+        transcribe_slots = multiprocessing.BoundedSemaphore(self.transcribe_concurrency)
+        summary_slots = multiprocessing.BoundedSemaphore(self.summary_concurrency)
+        started = time.perf_counter()
+        processed, partial, failed, audio_total = 0, 0, 0, 0.0
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.engine, self.patient, self.workers, transcribe_slots, summary_slots,
+                      self.summarize, self.chunk_workers)
+        ) as executor:
+            futures = {executor.submit(process_recording, path, file_hash, self.output_folder): path
+                       for path, file_hash in pending}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"path": futures[future], "status": "failed", "error": str(e)}
+                if record["status"] in ("done", "partial"):
+                    # Partial records are kept for their output but processed again on the next run
+                    record["finished_at"] = time.time()
+                    self.manifest.add(record)
+                    audio_total += record["audio_seconds"]
+                    if record["status"] == "done":
+                        processed += 1
+                    else:
+                        partial += 1
+                        print(f"Partial: {record['path']} ({record['error']})")
+                else:
+                    failed += 1
+                    print(f"Failed: {record['path']} ({record.get('error')})")
+                report = self._throughput(processed + partial, audio_total, time.perf_counter() - started)
+                print(f"[{processed + partial + failed}/{len(pending)}] {record['path']} "
+                      f"({report['files_per_minute']:.1f} files/min, "
+                      f"{report['audio_hours_per_hour']:.1f} audio-h/h)")
+
+        report = self._throughput(processed + partial, audio_total, time.perf_counter() - started)
+        report.update({"processed": processed, "partial": partial, "skipped": skipped, "failed": failed})
+        return report
+
+    @staticmethod
+    def _throughput(processed, audio_total, elapsed):
+        return {
+            "elapsed_seconds": elapsed,
+            "audio_hours": audio_total / 3600,
+            "files_per_minute": processed / elapsed * 60 if elapsed else 0.0,
+            # Hours of audio processed per hour of wall-clock time
+            "audio_hours_per_hour": audio_total / elapsed if elapsed else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Transcribe, analyse and summarize archived session recordings.")
+    parser.add_argument("folder", nargs="?", default="./recordings", help="Folder searched for .wav recordings")
+    parser.add_argument("--output", default="./batch_output", help="Folder for results and the manifest")
+    parser.add_argument("--workers", type=int, default=4, help="Pool processes")
+    parser.add_argument("--transcribe-concurrency", type=int, default=2, help="Recordings transcribed at once")
+    parser.add_argument("--summary-concurrency", type=int, default=2, help="Summaries requested at once")
+    parser.add_argument("--chunk-workers", type=int, default=2, help="Chunks of one recording transcribed at once")
+    parser.add_argument("--engine", default=os.getenv("TRANSCRIPTION_ENGINE", "openai"),
+                        help="Transcription engine: openai, local or stub")
+    parser.add_argument("--patient", default="archive", help="Patient name used in summaries")
+    parser.add_argument("--no-summary", action="store_true", help="Skip summaries")
+    args = parser.parse_args()
+
+    processor = BatchProcessor(
+        output_folder=args.output,
+        workers=args.workers,
+        transcribe_concurrency=args.transcribe_concurrency,
+        summary_concurrency=args.summary_concurrency,
+        chunk_workers=args.chunk_workers,
+        engine=args.engine,
+        patient=args.patient,
+        summarize=not args.no_summary
+    )
+    report = processor.run(args.folder)
+    print(f"Processed {report['processed']} recordings ({report['audio_hours']:.2f} h of audio), "
+          f"{report['partial']} without a summary, skipped {report['skipped']}, failed {report['failed']} in {report['elapsed_seconds']:.0f}s: "
+          f"{report['files_per_minute']:.1f} files/min, {report['audio_hours_per_hour']:.1f} audio-hours/hour.")
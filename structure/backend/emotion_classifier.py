@@ -0,0 +1,141 @@
+import re
+
+# Words and phrases per emotion, with their inflections spelled out so unrelated words never match
+EMOTION_LEXICON = {
+    "anxiety": ["anxious", "anxiety", "anxieties", "worry", "worries", "worried", "worrying", "nervous",
+                "nervousness", "panic", "panics", "panicked", "panicking", "panicky", "stress", "stressed",
+                "stressful", "stressing", "afraid", "scared", "scary", "scare", "fear", "fears", "fearful",
+                "frightened", "terrified", "overwhelm", "overwhelmed", "overwhelming", "tense", "tension",
+                "uneasy", "restless", "dread", "dreading", "insecure", "insecurity", "pressure", "pressured",
+                "can't breathe"],
+    "sadness": ["sad", "sadder", "saddest", "sadness", "depressed", "depression", "depressing", "lonely",
+                "loneliness", "alone", "cry", "cries", "cried", "crying", "tears", "tearful", "hopeless",
+                "hopelessness", "empty", "emptiness", "grief", "grieve", "grieving", "grieved", "miss",
+                "misses", "missed", "lost", "hurt", "hurts", "hurting", "unhappy", "miserable", "worthless",
+                "heartbroken", "tired", "exhausted", "exhausting", "exhaustion", "feel down", "feeling down",
+                "felt down"],
+    "anger": ["angry", "angrier", "anger", "furious", "mad", "annoyed", "annoying", "frustrated",
+              "frustrating", "frustration", "hate", "hates", "hated", "hating", "irritated", "irritating",
+              "irritable", "rage", "resent", "resented", "resentful", "resentment", "unfair", "upset"],
+    "joy": ["happy", "happier", "happiest", "happiness", "glad", "joy", "joyful", "excited", "exciting",
+            "excitement", "great", "wonderful", "love", "loved", "loving", "proud", "grateful", "thankful",
+            "hope", "hopeful", "hoping", "motivated", "better", "good", "enjoy", "enjoyed", "enjoying", "fun",
+            "laugh", "laughed", "laughing"],
+    "calm": ["calm", "calmer", "calmed", "relax", "relaxed", "relaxing", "peace", "peaceful", "rested",
+             "restful", "safe", "comfortable", "comforted", "quiet", "content", "okay", "fine", "balanced",
+             "grounded", "at ease"],
+}
+
+# Environment each emotion calls for, using the keys VisualLightAgent understands
+EMOTION_TO_MOOD = {
+    "anxiety": "calm",
+    "anger": "calm",
+    "sadness": "uplifting",
+    "joy": "uplifting",
+    "calm": "calm",
+    "neutral": "neutral",
+}
+
+NEGATIONS = {"not", "no", "never", "don't", "dont", "isn't", "wasn't", "can't", "cannot", "won't", "nothing"}
+INTENSIFIERS = {"very": 1.5, "so": 1.5, "really": 1.5, "extremely": 2.0, "totally": 1.5, "completely": 2.0,
+                "too": 1.3, "always": 1.3, "constantly": 1.5}
+
+# A negated emotion counts as its opposite ("not happy" is sad); negated negative emotions are dropped
+NEGATED_EMOTIONS = {"joy": "sadness", "calm": "anxiety"}
+# Punctuation ending the clause a negation or intensifier applies to
+CLAUSE_BREAKS = {".", ",", ";", ":", "!", "?"}
+
+TOKEN_PATTERN = re.compile(r"[a-z']+|[.,;:!?]")
+
+
+class EmotionClassifier:
+    def __init__(self, lexicon=None, emotion_to_mood=None, negation_window=3, intensity_scale=4.0):
+        """
+        Fast, local lexicon-based emotion classifier for transcript windows.
+
+        Args:
+            lexicon (dict): Maps emotion names to lists of words and phrases (defaults to EMOTION_LEXICON).
+            emotion_to_mood (dict): Maps emotions to environment moods (defaults to EMOTION_TO_MOOD).
+            negation_window (int): Number of tokens after a negation (within its clause) that are negated.
+            intensity_scale (float): Converts the density of emotional words into a 0-1 intensity.
+        """
+        self.emotion_to_mood = emotion_to_mood or EMOTION_TO_MOOD
+        self.negation_window = negation_window
+        self.intensity_scale = intensity_scale
+
+        self._words = {}
+        self._phrases = {}  # First word -> [(words, emotion)], longest first
+        for emotion, entries in (lexicon or EMOTION_LEXICON).items():
+            for entry in entries:
+                words = tuple(TOKEN_PATTERN.findall(entry.lower()))
+                if len(words) == 1:
+                    self._words[words[0]] = emotion
+                else:
+                    self._phrases.setdefault(words[0], []).append((words, emotion))
+        for phrases in self._phrases.values():
+            phrases.sort(key=lambda phrase: -len(phrase[0]))
+
+    def classify(self, text):
+        """
+        Classify the dominant emotion of a piece of text.
+
+        Returns:
+            dict: 'label' (environment mood: calm, uplifting or neutral), 'emotion', 'intensity' (0-1)
+                  and 'score' (share of the emotional evidence behind the winning emotion).
+        """
+        tokens = TOKEN_PATTERN.findall((text or "").lower())
+        scores = {}
+        negated_until = -1
+        weight = 1.0
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in CLAUSE_BREAKS:
+                negated_until, weight = -1, 1.0
+                i += 1
+                continue
+            emotion, length = self._match(tokens, i)
+            if emotion is None and token in NEGATIONS:
+                negated_until = i + self.negation_window
+            elif emotion is None and token in INTENSIFIERS:
+                weight = INTENSIFIERS[token]
+                i += 1
+                continue
+            elif emotion is not None:
+                if i <= negated_until:
+                    emotion = NEGATED_EMOTIONS.get(emotion)
+                if emotion is not None:
+                    scores[emotion] = scores.get(emotion, 0.0) + weight
+            weight = 1.0
+            i += length
+
+        if not scores:
+            return {"label": self.emotion_to_mood["neutral"], "emotion": "neutral", "intensity": 0.0, "score": 1.0}
+
+        emotion = max(scores, key=scores.get)
+        words = sum(token not in CLAUSE_BREAKS for token in tokens)
+        density = scores[emotion] / max(words, 1)
+        return {
+            "label": self.emotion_to_mood.get(emotion, self.emotion_to_mood["neutral"]),
+            "emotion": emotion,
+            "intensity": round(min(1.0, density * self.intensity_scale), 3),
+            "score": round(scores[emotion] / sum(scores.values()), 3),
+        }
+
+    def classify_batch(self, texts):
+        """
+        Classify many windows at once.
+
+        Returns:
+            list: One result dict per text, in order.
+        """
+        return [self.classify(text) for text in texts]
+
+    def _match(self, tokens, i):
+        """
+        Return the emotion of the word or phrase starting at tokens[i] and its length in tokens.
+        """
+        for words, emotion in self._phrases.get(tokens[i], ()):
+            if tuple(tokens[i:i + len(words)]) == words:
+                return emotion, len(words)
+        return self._words.get(tokens[i]), 1
@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, max_pending=1000):
+        """
+        Bounded queue of events for one subscriber; the oldest pending events are dropped when it is full.
+
+        Args:
+            max_pending (int): Events kept until the subscriber drains them.
+        """
+        self.dropped = 0
+        self._events = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+
+    def drain(self):
+        """
+        Return and remove every pending event, oldest first, without blocking.
+        """
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+
+class EventStream:
+    def __init__(self):
+        """
+        In-process publish/subscribe stream of session events (e.g., per-window emotion results).
+
+        Publishing never blocks: each subscriber has its own bounded queue it drains at its own pace.
+        A LiveSession can feed it with `session.listeners.append(stream.publish)`.
+        """
+        self.published = 0
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, max_pending=1000):
+        subscription = Subscription(max_pending)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            self.published += 1
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+class DownsampledSeries:
+    def __init__(self, max_points=240, recent_points=120):
+        """
+        Time series with a fixed memory footprint: recent points keep full resolution and older
+        neighbours are merged (count-weighted averages) whenever the series is full.
+
+        Args:
+            max_points (int): Upper bound on the number of stored points.
+            recent_points (int): Newest points that are never merged.
+        """
+        if not 0 < recent_points < max_points:
+            raise ValueError("recent_points must be positive and smaller than max_points.")
+        self.max_points = max_points
+        self.recent_points = recent_points
+        self.keys = []
+        self._points = []  # [time, {key: value}, count]
+
+    def __len__(self):
+        return len(self._points)
+
+    def append(self, time, values):
+        """
+        Add one point.
+
+        Args:
+            time (float): Seconds into the session.
+            values (dict): Value per series key (e.g., {'anxiety': 0.7}); missing keys count as 0.
+        """
+        for key in values:
+            if key not in self.keys:
+                self.keys.append(key)
+        self._points.append([time, dict(values), 1])
+        if len(self._points) > self.max_points:
+            self._compact()
+
+    def columns(self):
+        """
+        Return the series as {'time': [...], key: [...]} columns, ready for a chart.
+        """
+        data = {"time": [point[0] for point in self._points]}
+        for key in self.keys:
+            data[key] = [point[1].get(key, 0.0) for point in self._points]
+        return data
+
+    def _compact(self):
+        # Merge the neighbours with the smallest combined count, so older points stay evenly spaced
+        older, recent = self._points[:-self.recent_points], self._points[-self.recent_points:]
+        smallest = min(older[i][2] + older[i + 1][2] for i in range(len(older) - 1))
+        merged = []
+        i = 0
+        while i < len(older):
+            if i + 1 < len(older) and older[i][2] + older[i + 1][2] == smallest:
+                merged.append(self._merge(older[i], older[i + 1]))
+                i += 2
+            else:
+                merged.append(older[i])
+                i += 1
+        self._points = merged + recent
+
+    @staticmethod
+    def _merge(point_a, point_b):
+        (time_a, values_a, count_a), (time_b, values_b, count_b) = point_a, point_b
+        count = count_a + count_b
+        return [
+            (time_a * count_a + time_b * count_b) / count,
+            {key: (values_a.get(key, 0.0) * count_a + values_b.get(key, 0.0) * count_b) / count
+             for key in set(values_a) | set(values_b)},
+            count,
+        ]
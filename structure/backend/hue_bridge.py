@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class HueCommandQueue:
+    def __init__(self, bridge, max_commands_per_second=10):
+        """
+        Rate-limited command queue for a Hue bridge, drained by a background thread.
+
+        Commands for the same target are coalesced: if a newer state is submitted before the previous
+        one was sent, only the newer one goes to the bridge.
+
+        Args:
+            bridge: phue.Bridge (or FakeBridge) to send commands to.
+            max_commands_per_second (float): Upper bound on commands sent to the bridge.
+        """
+        self.bridge = bridge
+        self.min_interval = 1.0 / max_commands_per_second
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._pending = OrderedDict()  # (kind, id) -> (params, transitiontime)
+        self._condition = threading.Condition()
+        self._in_flight = False
+        self._closed = False
+        self._last_sent_at = 0.0
+        self._worker = threading.Thread(target=self._run, name="hue-command-queue", daemon=True)
+        self._worker.start()
+
+    def submit(self, target, params, transitiontime=None):
+        """
+        Queue a state change.
+
+        Args:
+            target (tuple): ('group', group_id) or ('light', light_id).
+            params (dict): Hue state parameters (e.g., {'xy': [0.4, 0.5], 'on': True}).
+            transitiontime (int): Fade duration in deciseconds.
+        """
+        with self._condition:
+            if target in self._pending:
+                self.coalesced += 1
+                del self._pending[target]
+            self._pending[target] = (params, transitiontime)
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued command has been sent.
+
+        Returns:
+            bool: True if the queue drained before the timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._in_flight, timeout=timeout)
+
+    def close(self):
+        """
+        Send the remaining commands and stop the worker thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def stats(self):
+        with self._condition:
+            return {"sent": self.sent, "coalesced": self.coalesced, "errors": self.errors,
+                    "pending": len(self._pending)}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                target, (params, transitiontime) = self._pending.popitem(last=False)
+                self._in_flight = True
+
+            wait = self._last_sent_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                kind, target_id = target
+                if kind == "group":
+                    self.bridge.set_group(target_id, dict(params), transitiontime=transitiontime)
+                else:
+                    self.bridge.set_light(target_id, dict(params), transitiontime=transitiontime)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error sending command to Hue bridge: {e}")
+            self._last_sent_at = time.monotonic()
+
+            with self._condition:
+                self._in_flight = False
+                self._condition.notify_all()
+
+
+class FakeLight:
+    def __init__(self, light_id):
+        self.light_id = light_id
+        self.on = True
+        self.xy = [0.33, 0.33]
+        self.brightness = 254
+
+
+class FakeBridge:
+    def __init__(self, light_ids=(1, 2, 3), latency=0.0):
+        """
+        In-memory stand-in for phue.Bridge, for tests and benchmarks without Hue hardware.
+
+        Args:
+            light_ids (iterable): IDs of the simulated lights (all members of group 0).
+            latency (float): Seconds each command takes, to simulate the bridge's HTTP round trip.
+        """
+        self.latency = latency
+        self.light_objects = {light_id: FakeLight(light_id) for light_id in light_ids}
+        self.commands = []  # (timestamp, kind, id, params) for every command received
+
+    @property
+    def lights(self):
+        return list(self.light_objects.values())
+
+    def connect(self):
+        pass
+
+    def set_group(self, group_id, parameter, value=None, transitiontime=None):
+        params = parameter if isinstance(parameter, dict) else {parameter: value}
+        self._record("group", group_id, params, transitiontime)
+        for light in self.light_objects.values():
+            self._apply(light, params)
+
+    def set_light(self, light_id, parameter, value=None, transitiontime=None):
+        params = parameter if isinstance(parameter, dict) else {parameter: value}
+        self._record("light", light_id, params, transitiontime)
+        self._apply(self.light_objects[light_id], params)
+
+    def _record(self, kind, target_id, params, transitiontime):
+        if self.latency:
+            time.sleep(self.latency)
+        params = dict(params)
+        if transitiontime is not None:
+            params["transitiontime"] = transitiontime
+        self.commands.append((time.monotonic(), kind, target_id, params))
+
+    @staticmethod
+    def _apply(light, params):
+        light.xy = params.get("xy", light.xy)
+        light.on = params.get("on", light.on)
+        light.brightness = params.get("bri", light.brightness)
@@ -0,0 +1,199 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.prompt_builder import PromptBuilder
+
+# JSON schema of a session summary, requested through function calling
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overview": {
+            "type": "string",
+            "description": "A concise description of the discussion."
+        },
+        "key_insights": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Specific observations or patterns."
+        },
+        "emotions_or_states": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Noticeable emotional states, in the order they appeared."
+        },
+        "therapeutic_goals": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Actionable therapeutic goals."
+        }
+    },
+    "required": ["overview", "key_insights", "emotions_or_states", "therapeutic_goals"]
+}
+
+SYSTEM_PROMPT = "You are an assistant helping a therapist interpret patient speech."
+
+
+def split_text(text, max_chars):
+    """
+    Split text into pieces of at most max_chars, preferring sentence ends, then spaces.
+
+    Returns:
+        tuple: (complete pieces, remainder shorter than max_chars).
+    """
+    pieces = []
+    while len(text) >= max_chars:
+        cut = max(text.rfind(". ", 0, max_chars), text.rfind("? ", 0, max_chars), text.rfind("! ", 0, max_chars))
+        cut = cut + 1 if cut > 0 else text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].lstrip()
+    return pieces, text
+
+
+class IncrementalSummarizer:
+    def __init__(self, openai_config, patient_data=None, chunk_chars=6000, merge_fanin=4, max_workers=2,
+                 model="gpt-4", max_tokens=400, prompt_builder=None):
+        """
+        Summarizes a session while it is still running.
+
+        Text is buffered into chunks; each completed chunk is summarized in the background, and
+        every `merge_fanin` consecutive summaries are merged into one summary a level up. When the
+        session ends only the few summaries left on each level remain to be merged, so the final
+        summary is ready shortly after, and no request carries more than one chunk or
+        `merge_fanin` summaries.
+
+        Args:
+            openai_config (OpenAIConfig): Client used for every request (responses are cached).
+            patient_data (dict): Patient name, age and history added to every prompt.
+            chunk_chars (int): Transcript characters per chunk (about 1,500 tokens by default).
+            merge_fanin (int): Summaries combined by each merge request.
+            max_workers (int): Requests running at the same time.
+            model (str): Chat model name.
+            max_tokens (int): Output budget of each summary.
+            prompt_builder (PromptBuilder): Compresses each chunk and supplies the prompt prefix shared
+                by every request (built from patient_data if omitted).
+        """
+        if merge_fanin < 2:
+            raise ValueError("merge_fanin must be at least 2.")
+        self.openai_config = openai_config
+        self.patient_data = patient_data or {}
+        self.chunk_chars = chunk_chars
+        self.merge_fanin = merge_fanin
+        self.model = model
+        self.max_tokens = max_tokens
+        self.prompt_builder = prompt_builder or PromptBuilder(SYSTEM_PROMPT, self.patient_data, model=model)
+        self.requests = 0
+        self._buffer = ""
+        self._levels = [[]]  # Pending summary futures per merge level, oldest first
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def add_text(self, text):
+        """
+        Append transcribed text; every completed chunk is submitted for summarization right away.
+        """
+        with self._lock:
+            self._buffer = f"{self._buffer} {text}".strip() if self._buffer else text.strip()
+            chunks, self._buffer = split_text(self._buffer, self.chunk_chars)
+            for chunk in chunks:
+                self._submit_chunk(chunk)
+
+    def finish(self):
+        """
+        Summarize the remaining text and merge everything into the final session summary.
+        The summarizer can't be used after this.
+
+        Returns:
+            dict: 'overview', 'key_insights', 'emotions_or_states' and 'therapeutic_goals', or None on failure.
+        """
+        with self._lock:
+            if self._buffer:
+                self._submit_chunk(self._buffer)
+                self._buffer = ""
+            # Higher levels cover earlier parts of the session
+            pending = [future for level in reversed(self._levels) for future in level]
+            self._levels = [[]]
+
+        try:
+            while len(pending) > 1:
+                pending = [
+                    self._submit(self._merge_futures, pending[i:i + self.merge_fanin])
+                    for i in range(0, len(pending), self.merge_fanin)
+                ]
+            return pending[0].result() if pending else None
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def summarize_chunk(self, text):
+        """
+        Summarize one chunk of the transcript.
+
+        Returns:
+            dict: Summary in SUMMARY_SCHEMA form, or None on failure.
+        """
+        return self._request(self.prompt_builder.build("Summarize this part of a therapy session.", text))
+
+    def merge(self, summaries):
+        """
+        Combine summaries of consecutive parts of a session into one.
+
+        Returns:
+            dict: Summary in SUMMARY_SCHEMA form, or None on failure.
+        """
+        summaries = [summary for summary in summaries if summary]
+        if len(summaries) <= 1:
+            return summaries[0] if summaries else None
+        parts = "\n\n".join(f"Part {i + 1}:\n{json.dumps(summary)}" for i, summary in enumerate(summaries))
+        return self._request(self.prompt_builder.build(
+            "Combine these summaries of consecutive parts of one therapy session into a single summary. "
+            "Keep the most important insights, the emotional arc and the goals; drop repetitions.\n\n"
+            f"{parts}"
+        ))
+
+    def _submit_chunk(self, text):
+        self._add(0, self._submit(self.summarize_chunk, text))
+
+    def _add(self, level, future):
+        # Merge as soon as a level has a full group; FIFO order keeps dependencies ahead of their merges
+        if level == len(self._levels):
+            self._levels.append([])
+        self._levels[level].append(future)
+        if len(self._levels[level]) == self.merge_fanin:
+            group, self._levels[level] = self._levels[level], []
+            self._add(level + 1, self._submit(self._merge_futures, group))
+
+    def _submit(self, func, *args):
+        # Workers run in the caller's context, so their tokens count towards the caller's tracing span
+        return self._executor.submit(contextvars.copy_context().run, func, *args)
+
+    def _merge_futures(self, futures):
+        return self.merge([future.result() for future in futures])
+
+    def _request(self, messages):
+        with self._lock:
+            self.requests += 1
+        response = self.openai_config.create_chat_completion(
+            model=self.model,
+            messages=messages,
+            functions=[{
+                "name": "report_summary",
+                "description": "Report the structured summary of a therapy session.",
+                "parameters": SUMMARY_SCHEMA
+            }],
+            function_call={"name": "report_summary"},
+            max_tokens=self.max_tokens
+        )
+        if response is None:
+            print("Error generating partial summary.")
+            return None
+        try:
+            return json.loads(response["choices"][0]["message"]["function_call"]["arguments"])
+        except (KeyError, ValueError) as e:
+            print(f"Error parsing partial summary: {e}")
+            return None
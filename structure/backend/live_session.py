@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.long_transcription import dedupe_boundary
+from backend.orchestrator import TherapySessionManager
+
+
+class EmotionTimeline:
+    def __init__(self):
+        """
+        In-memory, append-only timeline of per-window emotion results for one session.
+        """
+        self.entries = []
+
+    def append(self, entry):
+        self.entries.append(entry)
+
+    def latest(self):
+        return self.entries[-1] if self.entries else None
+
+    def since(self, timestamp):
+        """
+        Return the entries whose window starts at or after `timestamp` (seconds into the session).
+        """
+        return [entry for entry in self.entries if entry["timestamp"] >= timestamp]
+
+
+class MoodSmoother:
+    def __init__(self, alpha=0.4, switch_margin=0.1, min_weight=0.25, initial_mood="neutral"):
+        """
+        Exponentially smoothed mood with hysteresis, so a single noisy window doesn't flip the room.
+
+        Args:
+            alpha (float): Weight of the newest window in the moving average (0-1).
+            switch_margin (float): Lead a new mood needs over the current one before switching.
+            min_weight (float): Evidence given to a window's label even when its intensity is low.
+            initial_mood (str): Mood before any window has been seen.
+        """
+        self.alpha = alpha
+        self.switch_margin = switch_margin
+        self.min_weight = min_weight
+        self.mood = initial_mood
+        self.scores = {initial_mood: min_weight}
+
+    def update(self, label, intensity):
+        """
+        Feed one window's label and intensity.
+
+        Returns:
+            str: The smoothed mood after this window.
+        """
+        weight = max(intensity, self.min_weight)
+        for mood in set(self.scores) | {label}:
+            target = weight if mood == label else 0.0
+            self.scores[mood] = (1 - self.alpha) * self.scores.get(mood, 0.0) + self.alpha * target
+
+        best = max(self.scores, key=self.scores.get)
+        if best != self.mood and self.scores[best] > self.scores.get(self.mood, 0.0) + self.switch_margin:
+            self.mood = best
+        return self.mood
+
+
+class LiveSession:
+    def __init__(self, session_manager, duration=50 * 60, window_seconds=10, overlap_seconds=2,
+                 smoother=None, recordings_folder="./recordings/live", data_manager=None,
+                 summarizer=None):
+        """
+        Long-running session that processes overlapping audio windows as they are captured.
+
+        Each window is transcribed and classified locally into the emotion timeline. Music and lighting
+        are only updated when the smoothed mood changes.
+
+        Args:
+            session_manager (TherapySessionManager): Provides the audio, music and visual agents.
+            duration (float): Session length in seconds (50 minutes by default).
+            window_seconds (float): Length of each analysed window.
+            overlap_seconds (float): Audio shared between consecutive windows.
+            smoother (MoodSmoother): Mood smoothing policy (defaults to MoodSmoother()).
+            recordings_folder (str): Folder for the temporary window files.
+            data_manager (DataManager): Session store the timeline is written to as it grows.
+            summarizer (IncrementalSummarizer): Summarizes the transcript chunk by chunk during the session;
+                its final summary is kept in `summary` when the session ends.
+        """
+        self.session_manager = session_manager
+        self.duration = duration
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.smoother = smoother or MoodSmoother()
+        self.recordings_folder = recordings_folder
+        self.timeline = EmotionTimeline()
+        self.listeners = []
+        self.data_manager = data_manager
+        self.session_id = None
+        self.summarizer = summarizer
+        self.summary = None
+        # Session transcript without the words repeated by overlapping windows
+        self.transcript_parts = []
+        self._previous_text = None
+        self._previous_end = None
+
+        self.current_mood = None
+        self.mood_changes = 0
+        self.windows_processed = 0
+        self.processing_seconds = 0.0
+        self.backlog_seconds = 0.0
+        self.max_backlog_seconds = 0.0
+        self._started_at = None
+        # Environment updates run off the window loop, one at a time
+        self._push_executor = ThreadPoolExecutor(max_workers=1)
+
+    def run(self, windows=None):
+        """
+        Process windows until the session ends.
+
+        Args:
+            windows (iterable): Window dicts as yielded by AudioAgent.stream_audio (defaults to live capture).
+
+        Returns:
+            EmotionTimeline: The session's emotion timeline.
+        """
+        if windows is None:
+            windows = self.session_manager.audio_agent.stream_audio(
+                duration=self.duration, window_seconds=self.window_seconds, overlap_seconds=self.overlap_seconds
+            )
+        self.start()
+        try:
+            for window in windows:
+                self.process_window(window)
+        finally:
+            self.finish()
+        return self.timeline
+
+    def start(self):
+        """
+        Start the session clock and the stored session, for callers that feed windows themselves.
+        """
+        self._started_at = time.perf_counter()
+        if self.data_manager is not None:
+            patient = self.session_manager.audio_agent.patient_data.get("name", "anonymous")
+            self.session_id = self.data_manager.start_session(patient)
+
+    def finish(self):
+        """
+        Wait for pending environment updates, then finalize the summary and the stored session.
+        """
+        self._push_executor.shutdown(wait=True)
+        if self.summarizer is not None:
+            self.summary = self.summarizer.finish()
+        if self.session_id is not None:
+            self.data_manager.end_session(self.session_id, transcript=self.transcript,
+                                          emotion=self.current_mood)
+
+    @property
+    def transcript(self):
+        return " ".join(self.transcript_parts)
+
+    def process_window(self, window):
+        """
+        Transcribe and classify one window, append it to the timeline and update the room if needed.
+
+        Returns:
+            dict: The timeline entry for the window, or None if it was silent or nothing was transcribed.
+        """
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        started = time.perf_counter()
+        audio_agent = self.session_manager.audio_agent
+
+        # Silent windows come back empty without reaching the transcription engine
+        text = audio_agent.transcribe_window(window, output_folder=self.recordings_folder,
+                                             file_name="live_window.wav")
+
+        entry = None
+        if text:
+            sentiment = audio_agent.analyze_sentiment(text)[0]
+            entry = {
+                "timestamp": window["start"],
+                "end": window["end"],
+                "label": sentiment["label"],
+                "emotion": sentiment["emotion"],
+                "intensity": sentiment["intensity"],
+                "text": text,
+            }
+            self.timeline.append(entry)
+            if self.session_id is not None:
+                self.data_manager.add_timeline_entries(self.session_id, [entry])
+            new_text = self._new_text(window, text)
+            if new_text:
+                self.transcript_parts.append(new_text)
+                if self.summarizer is not None:
+                    self.summarizer.add_text(new_text)
+            for listener in self.listeners:
+                listener(entry)
+
+            mood = self.smoother.update(sentiment["label"], sentiment["intensity"])
+            if mood != self.current_mood:
+                self.current_mood = mood
+                self.mood_changes += 1
+                self._push_executor.submit(self._push_mood, mood, sentiment["intensity"])
+
+        self.windows_processed += 1
+        self.processing_seconds += time.perf_counter() - started
+        # How far processing lags behind the audio being captured
+        self.backlog_seconds = max(0.0, (time.perf_counter() - self._started_at) - window["end"])
+        self.max_backlog_seconds = max(self.max_backlog_seconds, self.backlog_seconds)
+        return entry
+
+    def _new_text(self, window, text):
+        # A window overlapping the previous transcribed one starts with words already in the transcript
+        overlaps = self._previous_end is not None and window["start"] < self._previous_end
+        new_text = dedupe_boundary(self._previous_text, text) if overlaps else text
+        self._previous_text, self._previous_end = text, window["end"]
+        return new_text
+
+    def stats(self):
+        """
+        Return throughput and backlog metrics for the session so far.
+
+        'realtime_factor' is processing time per second of new audio; above 1.0 the session
+        falls behind real time and 'backlog_seconds' grows.
+        """
+        step = self.window_seconds - self.overlap_seconds
+        mean_processing = self.processing_seconds / self.windows_processed if self.windows_processed else 0.0
+        return {
+            "windows_processed": self.windows_processed,
+            "mean_processing_seconds": mean_processing,
+            "realtime_factor": mean_processing / step if step else 0.0,
+            "backlog_seconds": self.backlog_seconds,
+            "max_backlog_seconds": self.max_backlog_seconds,
+            "current_mood": self.current_mood,
+            "mood_changes": self.mood_changes,
+            "vad": self.session_manager.audio_agent.vad.stats(),
+            "prompt": self.session_manager.audio_agent.prompt_builder.stats(),
+        }
+
+    def _push_mood(self, mood, intensity):
+        print(f"Mood changed to '{mood}', updating music and lighting...")
+        try:
+            self.session_manager.music_agent.curate_music(mood, intensity)
+        except Exception as e:
+            print(f"Error updating music: {e}")
+        try:
+            self.session_manager.visual_agent.adjust_lighting(mood)
+        except Exception as e:
+            print(f"Error updating lighting: {e}")
+
+
+if __name__ == "__main__":
+    from backend.audio_agent import AudioAgent
+    from backend.music_agent import MusicAgent
+    from backend.startup import warm_up_in_background
+    from backend.transcription import create_transcription_engine
+    from backend.visual_environment_agent import VisualLightAgent
+    from integrations.openai_config import OpenAIConfig
+    from integrations.tracing import MetricsServer
+
+    load_dotenv()
+    if os.getenv("METRICS_PORT"):
+        print(f"Serving metrics at {MetricsServer(port=int(os.getenv('METRICS_PORT'))).start().url}")
+    openai_config = OpenAIConfig()
+
+    audio_agent = AudioAgent(
+        openai_api_key=openai_config.api_key,
+        patient_data={"name": "John Doe", "age": 32, "history": "Anxiety and mild depression."},
+        transcription_engine=create_transcription_engine(os.getenv("TRANSCRIPTION_ENGINE", "local")),
+        openai_config=openai_config
+    )
+    music_agent = MusicAgent(
+        spotify_client_id=os.getenv("SPOTIFY_CLIENT_ID"),
+        spotify_client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
+        redirect_uri=os.getenv("REDIRECT_URI"),
+        openai_api_key=openai_config.api_key,
+        openai_config=openai_config
+    )
+    visual_agent = VisualLightAgent(os.getenv("HUE_BRIDGE_IP"))
+    # Models and device connections load while the microphone starts
+    warm_up_in_background([audio_agent, music_agent, visual_agent],
+                          on_ready=lambda timings: print(f"Warm-up finished: {timings}"))
+
+    session = LiveSession(TherapySessionManager(openai_config, music_agent, visual_agent, audio_agent))
+    session.listeners.append(
+        lambda entry: print(f"[{entry['timestamp']:7.1f}s] {entry['emotion']} ({entry['intensity']:.2f}) "
+                            f"backlog={session.backlog_seconds:.1f}s")
+    )
+    session.run()
+    print(session.stats())
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def frame_energies(audio_file, frame_seconds=0.05):
+    """
+    Compute the RMS energy of consecutive frames of a 16-bit WAV file, reading it block by block.
+
+    Returns:
+        numpy.ndarray: One RMS value per frame.
+    """
+    with wave.open(audio_file, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV files are supported.")
+        channels = wf.getnchannels()
+        frame_length = max(1, int(wf.getframerate() * frame_seconds))
+        energies = []
+        block_frames = frame_length * 1200  # About a minute of audio per read at the default frame size
+        while True:
+            data = wf.readframes(block_frames)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            usable = len(samples) // frame_length * frame_length
+            if usable:
+                frames = samples[:usable].reshape(-1, frame_length)
+                energies.append(np.sqrt(np.mean(frames ** 2, axis=1)))
+            if usable < len(samples):
+                energies.append(np.array([np.sqrt(np.mean(samples[usable:] ** 2))], dtype=np.float32))
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def find_silence_cuts(energies, frame_seconds, chunk_seconds, search_seconds):
+    """
+    Choose cut points (in seconds) no more than chunk_seconds apart, each at the quietest frame
+    of the search_seconds leading up to the chunk limit.
+    """
+    total_seconds = len(energies) * frame_seconds
+    cuts = []
+    position = 0.0
+    while total_seconds - position > chunk_seconds:
+        window_end = position + chunk_seconds
+        window_start = max(position + chunk_seconds / 2, window_end - search_seconds)
+        first, last = int(window_start / frame_seconds), int(window_end / frame_seconds)
+        quietest = first + int(np.argmin(energies[first:last]))
+        position = quietest * frame_seconds
+        cuts.append(position)
+    return cuts
+
+
+def dedupe_boundary(previous_text, next_text, max_words=20):
+    """
+    Drop words at the start of next_text that repeat the end of previous_text, as happens when
+    overlapping audio is transcribed twice.
+    """
+    def normalize(words):
+        return [word.strip(".,!?;:\"'").lower() for word in words]
+
+    previous_words = normalize(previous_text.split())
+    next_words = next_text.split()
+    normalized_next = normalize(next_words)
+    for size in range(min(max_words, len(previous_words), len(next_words)), 0, -1):
+        if previous_words[-size:] == normalized_next[:size]:
+            return " ".join(next_words[size:])
+    return next_text
+
+
+class LongAudioTranscriber:
+    def __init__(self, transcription_engine, max_workers=4, chunk_seconds=240, overlap_seconds=5,
+                 search_seconds=30, frame_seconds=0.05):
+        """
+        Transcribes long recordings by splitting them at silences into overlapping chunks, transcribing
+        the chunks concurrently and stitching the results into one timed transcript.
+
+        Args:
+            transcription_engine (TranscriptionEngine): Engine used for every chunk.
+            max_workers (int): Maximum number of chunks transcribed at the same time.
+            chunk_seconds (float): Maximum chunk length. At 44.1 kHz 16-bit mono, 240 s is about 21 MB,
+                under the 25 MB Whisper upload limit.
+            overlap_seconds (float): Audio shared by consecutive chunks, so words at a cut aren't lost.
+            search_seconds (float): How far before the chunk limit to look for the quietest cut point.
+            frame_seconds (float): Frame size used to measure energy.
+        """
+        self.transcription_engine = transcription_engine
+        self.max_workers = max_workers
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.search_seconds = search_seconds
+        self.frame_seconds = frame_seconds
+
+    def plan_chunks(self, audio_file):
+        """
+        Split a recording into overlapping chunks at silence boundaries.
+
+        Returns:
+            list: Dicts with 'start' and 'end' (seconds, including overlap) and 'cut' (the boundary
+                  the chunk shares with the previous one, or 0 for the first chunk).
+        """
+        energies = frame_energies(audio_file, self.frame_seconds)
+        total_seconds = len(energies) * self.frame_seconds
+        cuts = find_silence_cuts(energies, self.frame_seconds, self.chunk_seconds - self.overlap_seconds,
+                                 self.search_seconds)
+        boundaries = [0.0] + cuts + [total_seconds]
+        return [
+            {"start": max(0.0, start - self.overlap_seconds if i else 0.0), "end": end, "cut": start}
+            for i, (start, end) in enumerate(zip(boundaries[:-1], boundaries[1:]))
+        ]
+
+    def transcribe(self, audio_file):
+        """
+        Transcribe a long recording.
+
+        Returns:
+            dict: 'text', 'segments' (with 'start' and 'end' relative to the whole recording) and 'chunks'.
+        """
+        chunks = self.plan_chunks(audio_file)
+        print(f"Transcribing {len(chunks)} chunks with up to {self.max_workers} workers...")
+        with tempfile.TemporaryDirectory() as folder:
+            paths = [self._write_chunk(audio_file, chunk, os.path.join(folder, f"chunk_{i:04d}.wav"))
+                     for i, chunk in enumerate(chunks)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self.transcription_engine.transcribe_segments, paths))
+
+        segments = self._stitch(chunks, results)
+        return {
+            "text": " ".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "chunks": chunks,
+        }
+
+    def _stitch(self, chunks, results):
+        stitched = []
+        for i, (chunk, chunk_segments) in enumerate(zip(chunks, results)):
+            # Each overlap belongs to the earlier chunk up to its midpoint and to the later one after it
+            keep_from = chunk["cut"] - self.overlap_seconds / 2 if i else float("-inf")
+            keep_until = (chunks[i + 1]["cut"] - self.overlap_seconds / 2) if i + 1 < len(chunks) else float("inf")
+            first_in_chunk = True
+            for segment in chunk_segments:
+                start = chunk["start"] + (segment["start"] or 0.0)
+                timed = segment["end"] is not None
+                end = chunk["start"] + segment["end"] if timed else chunk["end"]
+                # Untimed segments cover the whole chunk; only the word-level de-duplication applies
+                if timed and not keep_from <= start < keep_until:
+                    continue
+                text = segment["text"]
+                if first_in_chunk and stitched:
+                    text = dedupe_boundary(stitched[-1]["text"], text)
+                first_in_chunk = False
+                if text:
+                    stitched.append({"start": start, "end": end, "text": text})
+        return stitched
+
+    @staticmethod
+    def _write_chunk(audio_file, chunk, path):
+        with wave.open(audio_file, 'rb') as source:
+            rate = source.getframerate()
+            source.setpos(int(chunk["start"] * rate))
+            frames = source.readframes(int((chunk["end"] - chunk["start"]) * rate))
+            with wave.open(path, 'wb') as target:
+                target.setnchannels(source.getnchannels())
+                target.setsampwidth(source.getsampwidth())
+                target.setframerate(rate)
+                target.writeframes(frames)
+        return path
@@ -1,12 +1,20 @@
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
-import openai
-import os 
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.playlist_index import PlaylistIndex, intensity_band
+from backend.spotify_client import build_spotify_client, has_cached_token
+from integrations.openai_config import OpenAIConfig, local_chat_response
+from integrations.response_cache import ResponseCache
+from integrations.tracing import get_tracer
 
 
 class MusicAgent:
-    def __init__(self, spotify_client_id, spotify_client_secret, redirect_uri, openai_api_key):
+    def __init__(self, spotify_client_id, spotify_client_secret, redirect_uri, openai_api_key, openai_config=None,
+                 sp=None, search_cache=None, search_ttl=7 * 24 * 3600, playlist_index=None, tracer=None,
+                 device_name=None):
         """
         Initialize the MusicAgent with Spotify and OpenAI credentials.
 
@@ -15,17 +23,54 @@ class MusicAgent:
             spotify_client_secret (str): Spotify Client Secret.
             redirect_uri (str): Redirect URI for Spotify OAuth.
             openai_api_key (str): OpenAI API key.
+            openai_config (OpenAIConfig): Shared OpenAI client (built from openai_api_key if omitted).
+            sp: Spotify client (e.g., FakeSpotify for tests); a pooled spotipy client is built on first
+                use if omitted.
+            search_cache (ResponseCache): Cache of resolved search queries (defaults to the SQLite
+                file in SPOTIFY_CACHE_PATH).
+            search_ttl (float): Seconds a resolved query stays valid.
+            playlist_index (PlaylistIndex): Precomputed emotion-to-tracks index (defaults to the file
+                in PLAYLIST_INDEX_PATH, empty if it hasn't been built yet).
+            tracer (Tracer): Records a span for every query generation and playback (defaults to the
+                process-wide tracer).
+            device_name (str): Name or ID of the Spotify device to play on, e.g. one room's speaker
+                (defaults to the active device).
         """
-        # Spotify Initialization
-        self.sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-            client_id=spotify_client_id,
-            client_secret=spotify_client_secret,
-            redirect_uri=redirect_uri,
-            scope="user-read-playback-state user-modify-playback-state"
-        ))
+        # Spotify Initialization (the client and its OAuth manager are built on first use)
+        self._sp = sp
+        self._spotify_credentials = (spotify_client_id, spotify_client_secret, redirect_uri)
+        self._sp_lock = threading.Lock()
+        self.search_cache = search_cache if search_cache is not None else ResponseCache(
+            db_path=os.environ.get("SPOTIFY_CACHE_PATH", "./cache/spotify_search.db"), ttl=search_ttl
+        )
+        self.device_name = device_name
+        self._device = None  # Active device, reused until playback on it fails
+        self.playlist_index = playlist_index if playlist_index is not None else PlaylistIndex.load(
+            os.environ.get("PLAYLIST_INDEX_PATH", "./cache/playlist_index.json")
+        )
 
         # OpenAI Initialization
-        openai.api_key = openai_api_key
+        self.openai_config = openai_config or OpenAIConfig(api_key=openai_api_key)
+        self.tracer = tracer or get_tracer()
+
+    @property
+    def sp(self):
+        with self._sp_lock:
+            if self._sp is None:
+                self._sp = build_spotify_client(*self._spotify_credentials)
+            return self._sp
+
+    def warm_up(self):
+        """
+        Build the Spotify client and look up the playback device ahead of the first mood change.
+
+        Skipped until the user has signed in to Spotify, since the sign-in flow prompts on the
+        console and can't run on a background thread.
+        """
+        if self._sp is None and not has_cached_token(*self._spotify_credentials):
+            print("Spotify isn't signed in yet; connecting on the first mood change instead.")
+            return
+        self.get_active_device()
 
     def generate_music_query(self, emotion_or_state):
         """
@@ -37,77 +82,181 @@ class MusicAgent:
         Returns:
             str: Spotify search query (e.g., a song, artist, genre, or mood).
         """
-        try:
-            messages = [
-                {"role": "system", "content": "You are an assistant that helps recommend Spotify music based on emotional states."},
-                {"role": "user", "content": f"The detected emotion is: {emotion_or_state}. Suggest a query Spotify can use to play relevant music. Provide a detailed suggestion, such as 'uplifting pop playlist' or 'relaxing piano instrumental'."}
-            ]
-            response = openai.ChatCompletion.create(
+        messages = [
+            {"role": "system", "content": "You are an assistant that helps recommend Spotify music based on emotional states."},
+            {"role": "user", "content": f"The detected emotion is: {emotion_or_state}. Suggest a query Spotify can use to play relevant music. Provide a detailed suggestion, such as 'uplifting pop playlist' or 'relaxing piano instrumental'."}
+        ]
+        with self.tracer.span("generate_music_query", emotion=emotion_or_state) as span:
+            response = self.openai_config.create_chat_completion(
                 model="gpt-3.5-turbo",
                 messages=messages,
-                max_tokens=100
+                max_tokens=100,
+                # Without the API, search for the emotion itself
+                fallback=lambda: local_chat_response(f"{emotion_or_state} mood playlist")
             )
-            query = response.choices[0].message["content"].strip()
+            if response is None:
+                print("Error generating music query.")
+                span.fail("no response")
+                return None
+            span.attributes["fallback"] = bool(response.get("fallback"))
+            query = response["choices"][0]["message"]["content"].strip()
             print(f"OpenAI Generated Query: {query}")
             return query
-        except Exception as e:
-            print(f"Error generating music query: {e}")
-            return None
 
-    def play_music_on_spotify(self, search_query):
+    def resolve_search_query(self, search_query):
         """
-        Search Spotify for music and play it on an active device.
+        Resolve a search query to the best matching Spotify URI, using the local cache when possible.
 
         Args:
             search_query (str): Spotify search query.
+
+        Returns:
+            dict: 'uri' and 'description' of the best result, or None if nothing matched.
         """
-        try:
-            print(f"Searching Spotify for: {search_query}...")
-            # Search Spotify for relevant content
-            results = self.sp.search(q=search_query, limit=1, type='track,playlist,album')
-
-            # Determine the URI of the best result
-            uri = None
-            if results['tracks']['items']:
-                track = results['tracks']['items'][0]
-                uri = track['uri']
-                print(f"Playing track: {track['name']} by {track['artists'][0]['name']}")
-            elif results['playlists']['items']:
-                playlist = results['playlists']['items'][0]
-                uri = playlist['uri']
-                print(f"Playing playlist: {playlist['name']}")
-            elif results['albums']['items']:
-                album = results['albums']['items'][0]
-                uri = album['uri']
-                print(f"Playing album: {album['name']} by {album['artists'][0]['name']}")
-            else:
-                print("No relevant content found on Spotify.")
-                return
-
-            # Get active Spotify devices
-            devices = self.sp.devices()
-            if devices['devices']:
-                device_id = devices['devices'][0]['id']
-                print(f"Playing on device: {devices['devices'][0]['name']}")
-                self.sp.start_playback(device_id=device_id, context_uri=uri)
+        key = ResponseCache.make_key(endpoint="spotify_search", q=search_query.strip().lower())
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+
+        print(f"Searching Spotify for: {search_query}...")
+        # Search Spotify for relevant content
+        results = self.sp.search(q=search_query, limit=1, type='track,playlist,album')
+
+        # Determine the URI of the best result
+        if results['tracks']['items']:
+            track = results['tracks']['items'][0]
+            resolved = {"uri": track['uri'], "description": f"track: {track['name']} by {track['artists'][0]['name']}"}
+        elif results['playlists']['items']:
+            playlist = results['playlists']['items'][0]
+            resolved = {"uri": playlist['uri'], "description": f"playlist: {playlist['name']}"}
+        elif results['albums']['items']:
+            album = results['albums']['items'][0]
+            resolved = {"uri": album['uri'], "description": f"album: {album['name']} by {album['artists'][0]['name']}"}
+        else:
+            return None
+
+        self.search_cache.set(key, resolved)
+        return resolved
+
+    def get_active_device(self, refresh=False):
+        """
+        Return the cached playback device, looking it up only on first use or when refreshed.
+
+        Returns:
+            dict: Spotify device ('id' and 'name'), or None if no device is available.
+        """
+        if self._device is None or refresh:
+            devices = self.sp.devices()['devices']
+            if self.device_name:
+                self._device = next((d for d in devices if self.device_name in (d.get('name'), d.get('id'))), None)
             else:
+                self._device = next((d for d in devices if d.get('is_active')), devices[0] if devices else None)
+        return self._device
+
+    def play_uri(self, uri, is_current=None):
+        """
+        Start playback of a Spotify URI on the cached device, refreshing the device once if playback fails.
+
+        Args:
+            uri (str): Track, album or playlist URI.
+            is_current (callable): Returns False once the mood this playback was chosen for is stale,
+                in which case nothing is played.
+
+        Returns:
+            bool: True if playback started.
+        """
+        if is_current is not None and not is_current():
+            print("Skipping playback for a superseded mood.")
+            return False
+        # Tracks are played as a list of URIs; albums and playlists as a context
+        playback = {"uris": [uri]} if uri.startswith("spotify:track:") else {"context_uri": uri}
+        for refresh in (False, True):
+            device = self.get_active_device(refresh=refresh)
+            if device is None:
                 print("No active Spotify devices found. Please start Spotify on a device.")
-        except Exception as e:
-            print(f"Error playing music on Spotify: {e}")
+                return False
+            try:
+                self.sp.start_playback(device_id=device['id'], **playback)
+                print(f"Playing on device: {device['name']}")
+                return True
+            except Exception as e:
+                if refresh:
+                    raise
+                print(f"Playback on cached device failed ({e}), refreshing devices...")
+                self._device = None
+        return False
+
+    def play_music_on_spotify(self, search_query, is_current=None):
+        """
+        Search Spotify for music and play it on an active device.
+
+        Args:
+            search_query (str): Spotify search query.
+            is_current (callable): Checked right before playback starts (see play_uri).
 
-    def play_music_based_on_emotion(self, emotion_or_state):
+        Returns:
+            str: URI that started playing, or None.
+        """
+        with self.tracer.span("play_music_on_spotify") as span:
+            span.add("bytes", len(search_query.encode("utf-8")))
+            try:
+                resolved = self.resolve_search_query(search_query)
+                if resolved is None:
+                    print("No relevant content found on Spotify.")
+                    return None
+                print(f"Playing {resolved['description']}")
+                if self.play_uri(resolved['uri'], is_current):
+                    return resolved['uri']
+            except Exception as e:
+                print(f"Error playing music on Spotify: {e}")
+                span.fail(e)
+            return None
+
+    def play_music_based_on_emotion(self, emotion_or_state, intensity=None, is_current=None):
         """
         End-to-end function to generate a recommendation, search Spotify, and play the music.
 
+        Tracks come from the playlist index when it has an entry for the emotion. On a miss the
+        LLM and Spotify search are used, and the index entry is built in the background.
+
         Args:
             emotion_or_state (str): Detected emotion or state (e.g., "happy", "stressed").
+            intensity (float): Emotion intensity from 0 to 1, if known.
+            is_current (callable): Checked right before playback starts (see play_uri).
         """
+        track = self.playlist_index.next_track(emotion_or_state, intensity)
+        if track is not None:
+            print(f"Playing indexed {track['description']}")
+            try:
+                if self.play_uri(track['uri'], is_current):
+                    return
+            except Exception as e:
+                print(f"Error playing music on Spotify: {e}")
+            return
+        self.refresh_index_in_background(emotion_or_state, intensity)
+
         # Generate a music query using OpenAI
         search_query = self.generate_music_query(emotion_or_state)
         if search_query:
             # Play music on Spotify
-            self.play_music_on_spotify(search_query)
+            self.play_music_on_spotify(search_query, is_current)
 
+    def refresh_index_in_background(self, emotion_or_state, intensity=None):
+        """
+        Build the playlist index entry for an emotion and intensity band in a background thread.
+        """
+        self.playlist_index.refresh_in_background(self, emotion_or_state, intensity_band(intensity))
+
+    def curate_music(self, mood, intensity=None, is_current=None):
+        """
+        Play music for an environment mood (calm, uplifting or neutral), as used by TherapySessionManager.
+
+        Args:
+            mood (str): Environment mood detected for the session.
+            intensity (float): Emotion intensity from 0 to 1, if known.
+            is_current (callable): Checked right before playback starts (see play_uri).
+        """
+        self.play_music_based_on_emotion(mood, intensity, is_current)
 
 if __name__ == "__main__":
     load_dotenv()
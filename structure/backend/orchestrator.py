@@ -1,21 +1,161 @@
+import asyncio
+import time
+from functools import partial
+
+# Default per-stage timeouts in seconds for the concurrent pipeline
+DEFAULT_STAGE_TIMEOUTS = {
+    "transcribe": 120,
+    "sentiment": 5,
+    "music": 20,
+    "lighting": 5,
+    "visual": 5,
+    "summary": 90,
+}
+
+# Stages that depend on the mood and become stale when a newer mood arrives
+MOOD_STAGES = ("music", "lighting", "visual")
+
+
 class TherapySessionManager:
-    def __init__(self, openai_config, music_agent, visual_agent, audio_agent):
+    def __init__(self, openai_config, music_agent, visual_agent, audio_agent, stage_timeouts=None):
         self.openai_config = openai_config
         self.music_agent = music_agent
         self.visual_agent = visual_agent
         self.audio_agent = audio_agent
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {}))
+        self._mood_tasks = []
+        self._mood_generation = 0
 
     def process_audio(self, audio_file):
         transcript = self.audio_agent.transcribe_audio(audio_file)
         if not transcript:
             return "Error processing audio."
-        
+
         sentiment = self.audio_agent.analyze_sentiment(transcript)
         mood = sentiment[0]['label'].lower()
-        
+
         self.music_agent.curate_music(mood)
         self.visual_agent.adjust_lighting(mood)
         self.visual_agent.generate_visual(mood)
 
         session_structure = self.audio_agent.generate_session_structure(transcript)
         return session_structure
+
+    async def process_audio_async(self, audio_file):
+        """
+        Concurrent version of process_audio.
+
+        Transcription and sentiment run first; once the mood is known, music, lighting, visual and
+        summary stages run concurrently, each with its own timeout.
+
+        Returns:
+            dict: 'transcript', 'mood', 'sentiment', 'session_structure', 'stages' (per-stage
+                  'status' and 'duration' in seconds) and 'total_duration'.
+        """
+        started = time.perf_counter()
+        stages = {}
+
+        stages["transcribe"], transcript = await self._run_stage(
+            "transcribe", self.audio_agent.transcribe_audio, audio_file
+        )
+        if not transcript:
+            return {"error": "Error processing audio.", "stages": stages,
+                    "total_duration": time.perf_counter() - started}
+
+        stages["sentiment"], sentiment = await self._run_stage(
+            "sentiment", self.audio_agent.analyze_sentiment, transcript
+        )
+        mood = sentiment[0]['label'].lower() if sentiment else "neutral"
+
+        fan_out = await self.apply_mood_async(mood, transcript)
+        stages.update(fan_out["stages"])
+
+        return {
+            "transcript": transcript,
+            "mood": mood,
+            "sentiment": sentiment,
+            "session_structure": fan_out.get("session_structure"),
+            "stages": stages,
+            "total_duration": time.perf_counter() - started,
+        }
+
+    async def apply_mood_async(self, mood, transcript=None):
+        """
+        Run the music, lighting and visual stages for a mood concurrently, plus the session summary
+        when a transcript is given.
+
+        Mood stages still running from a previous call are abandoned, since their mood is stale: this
+        stops waiting for them, but a blocking agent call keeps running in its worker thread. Each call
+        therefore carries the generation of its mood and skips its side effect (starting playback,
+        sending a light command, showing a visual) once a newer mood has arrived.
+
+        Returns:
+            dict: 'mood', 'stages' and, with a transcript, 'session_structure'.
+        """
+        for task in self._mood_tasks:
+            task.cancel()
+        self._mood_generation += 1
+        generation = self._mood_generation
+
+        def is_current():
+            return self._mood_generation == generation
+
+        curate_music = partial(self.music_agent.curate_music, mood, is_current=is_current)
+        mood_tasks = [
+            asyncio.ensure_future(self._run_stage("music", self._if_current, is_current, curate_music)),
+            asyncio.ensure_future(self._run_stage(
+                "lighting", self._if_current, is_current, self.visual_agent.adjust_lighting, mood
+            )),
+            asyncio.ensure_future(self._run_stage(
+                "visual", self._if_current, is_current, self.visual_agent.generate_visual, mood
+            )),
+        ]
+        self._mood_tasks = mood_tasks
+        tasks = list(mood_tasks)
+        if transcript:
+            tasks.append(asyncio.ensure_future(
+                self._run_stage("summary", self.audio_agent.generate_session_structure, transcript)
+            ))
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        result = {"mood": mood, "stages": {}}
+        for name, outcome in zip(MOOD_STAGES + ("summary",), outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                outcome = ({"status": "cancelled", "duration": time.perf_counter() - started}, None)
+            stage, value = outcome
+            result["stages"][name] = stage
+            if name == "summary":
+                result["session_structure"] = value
+        return result
+
+    @staticmethod
+    def _if_current(is_current, func, *args):
+        # Checked in the worker thread, so a stage that only starts after a newer mood arrived does nothing
+        if not is_current():
+            return None
+        return func(*args)
+
+    async def _run_stage(self, name, func, *args):
+        """
+        Run a blocking agent call in a worker thread with the stage's timeout.
+
+        Returns:
+            tuple: (stage info dict with 'status' and 'duration', result or None)
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        result = None
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(None, func, *args), timeout=self.stage_timeouts.get(name)
+            )
+            status = "ok"
+        except asyncio.TimeoutError:
+            print(f"Stage '{name}' timed out.")
+            status = "timeout"
+        except Exception as e:
+            print(f"Error in stage '{name}': {e}")
+            status = "error"
+        return {"status": status, "duration": time.perf_counter() - started}, result
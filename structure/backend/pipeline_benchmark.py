@@ -0,0 +1,546 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import wave
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.audio_agent import AudioAgent
+from backend.audio_profile import StreamingResampler
+from backend.audio_stream import AudioRingBuffer, write_wav
+from backend.hue_bridge import FakeBridge
+from backend.live_session import MoodSmoother
+from backend.music_agent import MusicAgent
+from backend.playlist_index import PlaylistIndex
+from backend.spotify_client import FakeSpotify
+from backend.transcription import OpenAIWhisperEngine, StubTranscriptionEngine, create_transcription_engine
+from backend.visual_environment_agent import VisualLightAgent
+from integrations.mock_openai_server import MockOpenAIServer
+from integrations.openai_config import OpenAIConfig
+from integrations.response_cache import ResponseCache
+
+STAGES = ("capture", "vad", "transcription", "emotion", "music", "lighting")
+REPORT_VERSION = 1
+
+# Utterances spoken in the synthetic fixtures, grouped so the mood shifts every few windows
+FIXTURE_PHASES = (
+    ["I have been so worried about work, I can't stop feeling anxious.",
+     "Every morning I feel this pressure and I get really nervous.",
+     "Sometimes the panic is overwhelming and I feel tense all day."],
+    ["Honestly I feel very lonely and tired most evenings.",
+     "I cried a lot last week and everything felt empty.",
+     "I miss my friends and I feel down when I am alone."],
+    ["This weekend was actually great, I enjoyed the hike.",
+     "I am proud that I went out and I feel hopeful.",
+     "We laughed a lot and I felt really happy and grateful."],
+    ["Right now I feel calm and safe in this room.",
+     "The breathing exercise helped me relax and feel grounded.",
+     "I am okay, things feel quiet and balanced today."],
+)
+
+
+def generate_fixtures(folder, count=4, seconds=90, rate=44100, seed=0):
+    """
+    Write synthetic session recordings with known speech timing and transcripts.
+
+    Speech is approximated by harmonic tones with a syllable-rate envelope, separated by pauses and
+    occasional long silences, so VAD, resampling and windowing see realistic audio. The transcript
+    of each utterance is stored in fixtures.json next to the recordings.
+
+    Args:
+        folder (str): Output folder.
+        count (int): Number of recordings.
+        seconds (float): Length of each recording.
+        rate (int): Sample rate, as captured from the device.
+        seed (int): Random seed, so the same fixtures are produced every time.
+
+    Returns:
+        list: One dict per recording with 'file', 'rate', 'seconds' and 'utterances'
+              ('start', 'end' and 'text').
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for number in range(count):
+        chunks, utterances = [], []
+        position, phase = 0.0, int(rng.integers(len(FIXTURE_PHASES)))
+        while position < seconds:
+            # A pause, now and then long enough to leave a whole window silent
+            pause = rng.uniform(8.0, 12.0) if rng.random() < 0.1 else rng.uniform(0.4, 2.0)
+            pause = min(pause, seconds - position)
+            chunks.append(rng.normal(0, 30, int(pause * rate)))
+            position += pause
+            length = min(rng.uniform(1.5, 4.5), seconds - position)
+            if length < 0.5:
+                break
+
+            t = np.arange(int(length * rate)) / rate
+            f0 = rng.uniform(100, 220)
+            voice = sum(np.sin(2 * np.pi * harmonic * f0 * t) / harmonic for harmonic in range(1, 5))
+            envelope = 0.35 + 0.65 * np.abs(np.sin(np.pi * rng.uniform(3.0, 5.0) * t))
+            chunks.append(5000 * voice * envelope + rng.normal(0, 200, len(t)))
+            if rng.random() < 0.25:
+                phase = (phase + 1) % len(FIXTURE_PHASES)
+            text = FIXTURE_PHASES[phase][int(rng.integers(len(FIXTURE_PHASES[phase])))]
+            utterances.append({"start": position, "end": position + length, "text": text})
+            position += length
+
+        samples = np.clip(np.concatenate(chunks), -32768, 32767).astype(np.int16)
+        name = f"session_{number + 1:02d}.wav"
+        write_wav(os.path.join(folder, name), samples.tobytes(), rate)
+        fixtures.append({"file": name, "rate": rate, "seconds": len(samples) / rate, "utterances": utterances})
+
+    with open(os.path.join(folder, "fixtures.json"), "w") as manifest_file:
+        json.dump(fixtures, manifest_file, indent=4)
+    return fixtures
+
+
+def load_fixtures(folder):
+    """
+    List the recordings in a fixture folder.
+
+    Recordings described in fixtures.json carry their transcripts; any other WAV file (e.g., a real
+    recorded session) is replayed with the mock services' default transcript.
+
+    Returns:
+        list: Fixture dicts with 'path', 'file' and 'utterances'.
+    """
+    manifest_path = os.path.join(folder, "fixtures.json")
+    described = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            described = {fixture["file"]: fixture for fixture in json.load(manifest_file)}
+    fixtures = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(".wav"):
+            fixture = dict(described.get(name, {"file": name, "utterances": []}))
+            fixture["path"] = os.path.join(folder, name)
+            fixtures.append(fixture)
+    return fixtures
+
+
+def replay_windows(path, target_rate, window_seconds=10, overlap_seconds=2, chunk_size=1024):
+    """
+    Replay a recording through the same resampler and ring buffer as live capture, as fast as possible.
+
+    Yields:
+        tuple: (window dict as yielded by AudioAgent.stream_audio, seconds spent capturing it)
+    """
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: fixtures must be 16-bit mono WAV.")
+        source_rate = wf.getframerate()
+        window_bytes = int(window_seconds * target_rate) * 2
+        step_bytes = int((window_seconds - overlap_seconds) * target_rate) * 2
+        ring = AudioRingBuffer(window_bytes * 2)
+        resampler = StreamingResampler(source_rate, target_rate)
+        written, index, finished = 0, 0, False
+        while True:
+            started = time.perf_counter()
+            # Feed device-sized chunks until the next window is complete
+            while not finished and written < index * step_bytes + window_bytes:
+                data = wf.readframes(chunk_size)
+                if not data:
+                    ring.close()
+                    finished = True
+                    break
+                resampled = resampler.process(data)
+                ring.write(resampled)
+                written += len(resampled)
+            window = ring.read_window(window_bytes, step_bytes, timeout=0)
+            capture_seconds = time.perf_counter() - started
+            if window is None:
+                return
+            start, data = window
+            start_seconds = start / (target_rate * 2)
+            yield {
+                "index": index,
+                "start": start_seconds,
+                "end": start_seconds + len(data) / (target_rate * 2),
+                "frames": data,
+                "rate": target_rate,
+                "source_rate": source_rate,
+                "channels": 1,
+                "sample_width": 2,
+            }, capture_seconds
+            index += 1
+
+
+def latency_summary(samples):
+    """
+    Summarize latency samples (seconds) as count, mean, p50, p95, p99 and max in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+    }
+
+
+def peak_rss_bytes():
+    """
+    Peak resident memory of this process, or None where the resource module isn't available.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_reports(baseline, current, tolerance=0.10, min_delta_ms=1.0):
+    """
+    Find latency percentiles that got worse between two benchmark reports.
+
+    Args:
+        baseline (dict): Earlier report.
+        current (dict): New report.
+        tolerance (float): Allowed relative increase (0.10 is 10%).
+        min_delta_ms (float): Increases smaller than this are treated as noise.
+
+    Returns:
+        list: Dicts with 'metric', 'percentile', 'baseline_ms', 'current_ms' and 'change'.
+    """
+    regressions = []
+    metrics = [(f"stages.{stage}", baseline["stages"].get(stage, {}), current["stages"].get(stage, {}))
+               for stage in STAGES]
+    metrics.append(("end_to_end", baseline["end_to_end"], current["end_to_end"]))
+    for metric, before, after in metrics:
+        for percentile in ("p50_ms", "p95_ms", "p99_ms"):
+            if percentile not in before or percentile not in after:
+                continue
+            delta = after[percentile] - before[percentile]
+            if delta > min_delta_ms and after[percentile] > before[percentile] * (1 + tolerance):
+                regressions.append({
+                    "metric": metric,
+                    "percentile": percentile[:-3],
+                    "baseline_ms": before[percentile],
+                    "current_ms": after[percentile],
+                    "change": delta / before[percentile] if before[percentile] else None,
+                })
+    return regressions
+
+
+class PipelineBenchmark:
+    def __init__(self, fixtures_folder, transcription="mock", openai_latency=0.25, transcription_latency=0.4,
+                 spotify_latency=0.08, bridge_latency=0.03, window_seconds=10, overlap_seconds=2,
+                 push="every", cold_index=False, trace_memory=False):
+        """
+        Replays recorded sessions through capture, VAD, transcription, emotion, music and lighting,
+        with local stand-ins for OpenAI, Spotify and the Hue bridge, and reports per-stage latency.
+
+        Args:
+            fixtures_folder (str): Folder of 16-bit mono WAV recordings (see generate_fixtures).
+            transcription (str): 'mock' (Whisper API calls to the mock server), 'stub' (in-process
+                engine with the same latency) or 'local' (faster-whisper on the CPU).
+            openai_latency (float): Seconds added to each mock chat and completion response.
+            transcription_latency (float): Seconds added to each mock transcription.
+            spotify_latency (float): Seconds each FakeSpotify call takes.
+            bridge_latency (float): Seconds each FakeBridge command takes.
+            window_seconds (float): Length of each analysed window.
+            overlap_seconds (float): Audio shared between consecutive windows.
+            push (str): 'every' updates music and lighting for every speech window; 'change' only when
+                the smoothed mood changes, as LiveSession does.
+            cold_index (bool): Start with an empty playlist index, so music takes the LLM and search path.
+            trace_memory (bool): Track Python allocations with tracemalloc (slows every stage down).
+        """
+        if push not in ("every", "change"):
+            raise ValueError("push must be 'every' or 'change'.")
+        self.fixtures_folder = fixtures_folder
+        self.transcription = transcription
+        self.openai_latency = openai_latency
+        self.transcription_latency = transcription_latency
+        self.spotify_latency = spotify_latency
+        self.bridge_latency = bridge_latency
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.push = push
+        self.cold_index = cold_index
+        self.trace_memory = trace_memory
+        self._transcripts = {}
+
+    def config(self):
+        return {
+            "fixtures_folder": self.fixtures_folder,
+            "transcription": self.transcription,
+            "openai_latency": self.openai_latency,
+            "transcription_latency": self.transcription_latency,
+            "spotify_latency": self.spotify_latency,
+            "bridge_latency": self.bridge_latency,
+            "window_seconds": self.window_seconds,
+            "overlap_seconds": self.overlap_seconds,
+            "push": self.push,
+            "cold_index": self.cold_index,
+            "trace_memory": self.trace_memory,
+        }
+
+    def _respond(self, endpoint, body):
+        if endpoint == "transcription":
+            return self._transcripts.get(body.get("file_name"), "I am not sure how I feel today.")
+        if body.get("function_call"):
+            return {}
+        return "calm ambient piano"
+
+    def run(self):
+        """
+        Replay every fixture and return the benchmark report.
+
+        Returns:
+            dict: Machine-readable report with 'config', 'fixtures', 'stages' and 'end_to_end'
+                  latency summaries, 'throughput', 'memory' and 'services' call counts.
+        """
+        fixtures = load_fixtures(self.fixtures_folder)
+        if not fixtures:
+            raise ValueError(f"No WAV fixtures found in {self.fixtures_folder}.")
+
+        with tempfile.TemporaryDirectory() as scratch:
+            server = MockOpenAIServer(
+                latency={"chat": self.openai_latency, "completion": self.openai_latency,
+                         "transcription": self.transcription_latency},
+                responder=self._respond
+            ).start()
+            try:
+                return self._run(fixtures, server, scratch)
+            finally:
+                server.stop()
+
+    def _run(self, fixtures, server, scratch):
+        openai_config = OpenAIConfig(api_key="benchmark", api_base=server.url, cache=ResponseCache())
+        if self.transcription == "mock":
+            engine = OpenAIWhisperEngine(api_key="benchmark", api_base=server.url)
+        elif self.transcription == "stub":
+            engine = StubTranscriptionEngine(transcripts=self._transcripts, latency=self.transcription_latency)
+        else:
+            engine = create_transcription_engine(self.transcription)
+
+        audio_agent = AudioAgent(openai_api_key="benchmark", patient_data={"name": "Benchmark"},
+                                 transcription_engine=engine, openai_config=openai_config)
+        spotify = FakeSpotify(latency=self.spotify_latency)
+        music_agent = MusicAgent(None, None, None, "benchmark", openai_config=openai_config, sp=spotify,
+                                 search_cache=ResponseCache(),
+                                 playlist_index=PlaylistIndex(os.path.join(scratch, "playlist_index.json")))
+        bridge = FakeBridge(latency=self.bridge_latency)
+        # Every requested change goes out, so lighting latency isn't hidden by the hold time
+        visual_agent = VisualLightAgent(None, bridge=bridge, min_hold_seconds=0, confirm_updates=1)
+
+        started = time.perf_counter()
+        for component in (audio_agent, music_agent, visual_agent):
+            component.warm_up()
+        if not self.cold_index:
+            music_agent.playlist_index.build(music_agent, emotions=["calm", "uplifting", "neutral"])
+        setup_seconds = time.perf_counter() - started
+        threads_before = threading.active_count()
+        requests_before = len(server.requests)
+        spotify_before = dict(spotify.calls)
+        commands_before = len(bridge.commands)
+
+        if self.trace_memory:
+            tracemalloc.start()
+        samples = {stage: [] for stage in STAGES}
+        end_to_end = []
+        counts = {"windows": 0, "speech_windows": 0, "silent_windows": 0, "failed_windows": 0, "mood_changes": 0}
+        audio_seconds, processing_seconds = 0.0, 0.0
+
+        recordings = os.path.join(scratch, "recordings")
+        for fixture in fixtures:
+            stem = os.path.splitext(fixture["file"])[0]
+            smoother, current_mood, fixture_seconds = MoodSmoother(), None, 0.0
+            fixture_started = time.perf_counter()
+            for window, capture_seconds in replay_windows(fixture["path"], audio_agent.capture_profile.rate,
+                                                          self.window_seconds, self.overlap_seconds):
+                window_started = time.perf_counter()
+                counts["windows"] += 1
+                fixture_seconds = window["end"]
+                samples["capture"].append(capture_seconds)
+
+                started = time.perf_counter()
+                segments = audio_agent.detect_speech(window)
+                samples["vad"].append(time.perf_counter() - started)
+                if not segments:
+                    counts["silent_windows"] += 1
+                    continue
+
+                file_name = f"{stem}_{window['index']:04d}.wav"
+                self._transcripts[file_name] = " ".join(
+                    utterance["text"] for utterance in fixture["utterances"]
+                    if utterance["end"] > window["start"] and utterance["start"] < window["end"]
+                ) or "I am not sure how I feel today."
+                started = time.perf_counter()
+                speech_window = dict(window, frames=b"".join(segment["frames"] for segment in segments),
+                                     start=segments[0]["start"], end=segments[-1]["end"])
+                text = audio_agent.transcribe_audio(audio_agent.save_window_to_wav(speech_window, recordings, file_name))
+                samples["transcription"].append(time.perf_counter() - started)
+                if not text:
+                    counts["failed_windows"] += 1
+                    continue
+                counts["speech_windows"] += 1
+
+                started = time.perf_counter()
+                sentiment = audio_agent.analyze_sentiment(text)[0]
+                mood = smoother.update(sentiment["label"], sentiment["intensity"])
+                samples["emotion"].append(time.perf_counter() - started)
+
+                if mood != current_mood:
+                    counts["mood_changes"] += 1
+                if self.push == "every" or mood != current_mood:
+                    current_mood = mood
+                    started = time.perf_counter()
+                    music_agent.curate_music(mood, sentiment["intensity"])
+                    samples["music"].append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    # Lighting counts once the bridge has acknowledged the command
+                    if visual_agent.adjust_lighting(mood):
+                        visual_agent.command_queue.flush()
+                        samples["lighting"].append(time.perf_counter() - started)
+                end_to_end.append(capture_seconds + time.perf_counter() - window_started)
+            processing_seconds += time.perf_counter() - fixture_started
+            audio_seconds += fixture_seconds
+
+        traced_peak = None
+        if self.trace_memory:
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        # Let background playlist refreshes finish before the mock services go away
+        deadline = time.monotonic() + 30
+        while threading.active_count() > threads_before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        visual_agent.command_queue.close()
+
+        endpoints = {}
+        for request in server.requests[requests_before:]:
+            endpoints[request["endpoint"]] = endpoints.get(request["endpoint"], 0) + 1
+        openai_metrics = openai_config.metrics()
+        return {
+            "benchmark": "pipeline",
+            "version": REPORT_VERSION,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": self.config(),
+            "fixtures": dict(counts, recordings=len(fixtures), audio_seconds=audio_seconds),
+            "stages": {stage: latency_summary(samples[stage]) for stage in STAGES},
+            "end_to_end": latency_summary(end_to_end),
+            "throughput": {
+                "processing_seconds": processing_seconds,
+                "windows_per_second": counts["windows"] / processing_seconds if processing_seconds else 0.0,
+                # Seconds of audio processed per second of wall-clock time
+                "realtime_speedup": audio_seconds / processing_seconds if processing_seconds else 0.0,
+            },
+            "memory": {"peak_rss_bytes": peak_rss_bytes(), "traced_peak_bytes": traced_peak},
+            "services": {
+                "setup_seconds": setup_seconds,
+                "openai_requests": endpoints,
+                "openai_retries": openai_metrics["retries"],
+                "openai_cache_hits": openai_metrics["cache"]["hits"],
+                "spotify_calls": {name: count - spotify_before.get(name, 0) for name, count in spotify.calls.items()},
+                "bridge_commands": len(bridge.commands) - commands_before,
+                "vad": audio_agent.vad.stats(),
+            },
+        }
+
+
+def print_report(report):
+    fixtures = report["fixtures"]
+    print(f"{fixtures['recordings']} recordings, {fixtures['audio_seconds']:.0f}s of audio, "
+          f"{fixtures['windows']} windows ({fixtures['speech_windows']} speech, "
+          f"{fixtures['silent_windows']} silent, {fixtures['failed_windows']} failed)")
+    print(f"{'Stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, summary in list(report["stages"].items()) + [("end to end", report["end_to_end"])]:
+        if not summary["count"]:
+            print(f"{name:<16}{0:>7}")
+            continue
+        print(f"{name:<16}{summary['count']:>7}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+              f"{summary['p99_ms']:>10.1f}{summary['max_ms']:>10.1f}")
+    throughput, memory = report["throughput"], report["memory"]
+    print(f"Throughput: {throughput['windows_per_second']:.2f} windows/s, "
+          f"{throughput['realtime_speedup']:.1f}x real time")
+    if memory["peak_rss_bytes"]:
+        print(f"Peak RSS: {memory['peak_rss_bytes'] / 2 ** 20:.1f} MiB")
+    if memory["traced_peak_bytes"]:
+        print(f"Peak traced Python allocations: {memory['traced_peak_bytes'] / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the speech-to-room pipeline against local stand-in services.")
+    parser.add_argument("--fixtures", default="./benchmarks/fixtures", help="Folder of WAV fixtures")
+    parser.add_argument("--generate", type=int, default=4,
+                        help="Synthetic recordings to generate when the fixture folder has none")
+    parser.add_argument("--transcription", default="mock", help="mock, stub or local")
+    parser.add_argument("--openai-latency", type=float, default=0.25, help="Seconds per mock chat/completion")
+    parser.add_argument("--transcription-latency", type=float, default=0.4, help="Seconds per mock transcription")
+    parser.add_argument("--spotify-latency", type=float, default=0.08, help="Seconds per FakeSpotify call")
+    parser.add_argument("--bridge-latency", type=float, default=0.03, help="Seconds per FakeBridge command")
+    parser.add_argument("--window", type=float, default=10, help="Window length in seconds")
+    parser.add_argument("--overlap", type=float, default=2, help="Window overlap in seconds")
+    parser.add_argument("--push", default="every", help="every or change: when music and lighting update")
+    parser.add_argument("--cold-index", action="store_true", help="Start with an empty playlist index")
+    parser.add_argument("--trace-memory", action="store_true", help="Track Python allocations (slower)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to check for latency regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative latency increase")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.fixtures) or not load_fixtures(args.fixtures):
+        print(f"Generating {args.generate} synthetic recordings in {args.fixtures}...")
+        generate_fixtures(args.fixtures, count=args.generate)
+
+    benchmark = PipelineBenchmark(
+        args.fixtures,
+        transcription=args.transcription,
+        openai_latency=args.openai_latency,
+        transcription_latency=args.transcription_latency,
+        spotify_latency=args.spotify_latency,
+        bridge_latency=args.bridge_latency,
+        window_seconds=args.window,
+        overlap_seconds=args.overlap,
+        push=args.push,
+        cold_index=args.cold_index,
+        trace_memory=args.trace_memory
+    )
+    report = benchmark.run()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=4)
+        print(f"Report saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["config"] != report["config"]:
+            print("Warning: the baseline was run with different settings; latencies may not be comparable.")
+        regressions = compare_reports(baseline, report, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression['metric']} {regression['percentile']} "
+                  f"{regression['baseline_ms']:.1f} -> {regression['current_ms']:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No latency regressions against the baseline.")
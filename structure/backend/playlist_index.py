@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.emotion_classifier import EMOTION_TO_MOOD
+
+# Intensity bands as (name, lower bound inclusive, upper bound exclusive)
+INTENSITY_BANDS = (("low", 0.0, 0.34), ("medium", 0.34, 0.67), ("high", 0.67, 1.01))
+
+# Target audio features per environment mood, used to rank search results
+MOOD_PROFILES = {
+    "calm": {"valence": 0.45, "energy": 0.25, "tempo": 75},
+    "uplifting": {"valence": 0.8, "energy": 0.6, "tempo": 115},
+    "neutral": {"valence": 0.5, "energy": 0.45, "tempo": 100},
+}
+
+# Stronger emotions get gentler music
+BAND_ENERGY_SHIFT = {"low": 0.1, "medium": 0.0, "high": -0.1}
+
+
+def intensity_band(intensity):
+    """
+    Map a 0-1 intensity to its band name ('medium' when the intensity is unknown).
+    """
+    if intensity is None:
+        return "medium"
+    for name, lower, upper in INTENSITY_BANDS:
+        if lower <= intensity < upper:
+            return name
+    return "high"
+
+
+class PlaylistIndex:
+    def __init__(self, path="./cache/playlist_index.json", entries=None):
+        """
+        Offline-built index mapping (emotion, intensity band) to ranked, pre-resolved Spotify tracks.
+
+        Args:
+            path (str): JSON file the index is loaded from and saved to.
+            entries (dict): Maps 'emotion/band' keys to ranked lists of track dicts
+                ('uri', 'description', 'valence', 'energy', 'tempo').
+        """
+        self.path = path
+        self.entries = entries or {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._refreshes = {}  # (emotion, band) -> thread building that entry
+
+    @classmethod
+    def load(cls, path="./cache/playlist_index.json"):
+        """
+        Load an index from disk, or return an empty one if the file doesn't exist yet.
+        """
+        entries = {}
+        if os.path.exists(path):
+            with open(path) as index_file:
+                entries = json.load(index_file)
+        return cls(path, entries)
+
+    def save(self):
+        """
+        Write the index atomically. Concurrent saves (e.g., background refreshes of different
+        entries) run one at a time, each through its own temporary file, so the last snapshot wins.
+        """
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                payload = json.dumps(self.entries, indent=2)
+            with tempfile.NamedTemporaryFile("w", dir=folder or ".", prefix=".playlist_index.",
+                                             suffix=".tmp", delete=False) as index_file:
+                index_file.write(payload)
+            try:
+                os.replace(index_file.name, self.path)
+            except OSError:
+                os.remove(index_file.name)
+                raise
+
+    def lookup(self, emotion, intensity=None):
+        """
+        Return the ranked tracks for an emotion and intensity, falling back to the emotion's other bands.
+
+        Returns:
+            list: Ranked track dicts (empty on a miss).
+        """
+        emotion = emotion.strip().lower()
+        band = intensity_band(intensity)
+        with self._lock:
+            tracks = self.entries.get(f"{emotion}/{band}")
+            if not tracks:
+                tracks = next((self.entries[f"{emotion}/{name}"] for name, _, _ in INTENSITY_BANDS
+                               if self.entries.get(f"{emotion}/{name}")), [])
+            return list(tracks)
+
+    def next_track(self, emotion, intensity=None):
+        """
+        Return the next track for an emotion, rotating through its ranked list so the room
+        doesn't hear the same song every time.
+
+        Returns:
+            dict: Track dict, or None on a miss.
+        """
+        tracks = self.lookup(emotion, intensity)
+        if not tracks:
+            return None
+        key = (emotion.strip().lower(), intensity_band(intensity))
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        return tracks[position % len(tracks)]
+
+    def set_tracks(self, emotion, band, tracks):
+        with self._lock:
+            self.entries[f"{emotion.strip().lower()}/{band}"] = tracks
+
+    def build_entry(self, music_agent, emotion, band, tracks_per_entry=10):
+        """
+        Resolve and rank tracks for one emotion and intensity band through the LLM and Spotify search.
+
+        Returns:
+            list: The ranked track dicts stored in the index.
+        """
+        query = music_agent.generate_music_query(f"{emotion} ({band} intensity)")
+        if not query:
+            return []
+        results = music_agent.sp.search(q=query, limit=tracks_per_entry, type='track')
+        tracks = [
+            {"uri": track['uri'], "description": f"track: {track['name']} by {track['artists'][0]['name']}"}
+            for track in results['tracks']['items']
+        ]
+        if not tracks:
+            return []
+
+        try:
+            features = music_agent.sp.audio_features([track['uri'] for track in tracks])
+        except Exception as e:
+            print(f"Audio features unavailable, keeping search order: {e}")
+            features = []
+        for track, feature in zip(tracks, features):
+            if feature:
+                track.update({name: feature.get(name) for name in ("valence", "energy", "tempo")})
+
+        profile = dict(MOOD_PROFILES[EMOTION_TO_MOOD.get(emotion, emotion if emotion in MOOD_PROFILES else "neutral")])
+        profile["energy"] += BAND_ENERGY_SHIFT[band]
+        tracks.sort(key=lambda track: self._distance(track, profile))
+
+        self.set_tracks(emotion, band, tracks)
+        return tracks
+
+    def refresh_in_background(self, music_agent, emotion, band):
+        """
+        Build and save one entry in a background thread, unless it is already being built. The
+        check covers every agent sharing this index (e.g., one per room).
+
+        Returns:
+            threading.Thread: The refresh thread, or None if the entry was already being built.
+        """
+        key = (emotion.strip().lower(), band)
+        with self._lock:
+            if key in self._refreshes:
+                return None
+            thread = threading.Thread(target=self._refresh, args=(music_agent, key), daemon=True)
+            self._refreshes[key] = thread
+        thread.start()
+        return thread
+
+    def wait_for_refreshes(self, timeout=None):
+        """
+        Wait for the background refreshes in progress, e.g. before closing the clients they use.
+        """
+        with self._lock:
+            threads = list(self._refreshes.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def _refresh(self, music_agent, key):
+        try:
+            if self.build_entry(music_agent, *key):
+                self.save()
+        except Exception as e:
+            print(f"Error refreshing playlist index: {e}")
+        finally:
+            with self._lock:
+                self._refreshes.pop(key, None)
+
+    def build(self, music_agent, emotions=None, tracks_per_entry=10):
+        """
+        Build the full index for every emotion and intensity band, then save it.
+        """
+        emotions = emotions or sorted(set(EMOTION_TO_MOOD) | set(MOOD_PROFILES))
+        for emotion in emotions:
+            for band, _, _ in INTENSITY_BANDS:
+                tracks = self.build_entry(music_agent, emotion, band, tracks_per_entry)
+                print(f"Indexed {len(tracks)} tracks for {emotion}/{band}.")
+        self.save()
+
+    @staticmethod
+    def _distance(track, profile):
+        # Tracks without audio features keep their search order, after tracks that have them
+        if track.get("valence") is None:
+            return float("inf")
+        return (abs(track["valence"] - profile["valence"])
+                + abs(track["energy"] - profile["energy"])
+                + abs(track["tempo"] - profile["tempo"]) / 100)
+
+
+if __name__ == "__main__":
+    from backend.music_agent import MusicAgent
+
+    load_dotenv()
+    music_agent = MusicAgent(
+        spotify_client_id=os.getenv("SPOTIFY_CLIENT_ID"),
+        spotify_client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
+        redirect_uri=os.getenv("REDIRECT_URI"),
+        openai_api_key=os.getenv("OPENAI_API_KEY")
+    )
+    index = PlaylistIndex(os.getenv("PLAYLIST_INDEX_PATH", "./cache/playlist_index.json"))
+    index.build(music_agent)
+    print(f"Playlist index saved to {index.path}")
@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.emotion_classifier import EmotionClassifier
+from integrations.tracing import record
+
+# Hesitation sounds that carry no content (hyphenated ones first, or "uh" would match inside "uh-huh")
+FILLER_PATTERN = re.compile(r"\b(?:uh-huh|mm-hmm|u+m+|u+h+|e+r+m+|hm+|m+h?m+)\b[,.]?\s*", re.IGNORECASE)
+# Discourse markers, removed only when set off by commas (so "I like dogs" keeps its verb)
+DISCOURSE_PATTERN = re.compile(r"(^|[,.!?]\s*)(?:you know|i mean|like|basically|literally)\s*,\s*", re.IGNORECASE)
+# Stutters and restarts: a word or short phrase repeated right after itself
+REPEAT_PATTERN = re.compile(r"\b((?:[\w']+\s+){0,3}[\w']+)(?:[\s,]+\1\b)+", re.IGNORECASE)
+# Words that are doubled in grammatical speech ("I had had enough", "I know that that hurt")
+VALID_REPEATS = {"had", "that"}
+# Sentences that are only acknowledgements
+BACKCHANNELS = {"yeah", "yes", "yep", "okay", "ok", "right", "sure", "mhm", "uh huh", "i see", "alright"}
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+GAP_MARKER = "[...]"
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def count_tokens(text, model="gpt-4"):
+    """
+    Count the tokens of a piece of text with the model's tiktoken encoding.
+
+    Falls back to about four characters per token (like estimate_tokens) when tiktoken or its
+    encoding files aren't available, e.g. offline.
+    """
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"Counting tokens approximately ({e}).")
+                _encodings[model] = None
+        encoding = _encodings[model]
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def compress_transcript(text):
+    """
+    Remove filler words, stutters, bare acknowledgements and repeated sentences from a transcript.
+
+    Returns:
+        str: The compressed transcript, with sentences in their original order.
+    """
+    text = FILLER_PATTERN.sub("", text or "")
+    # A marker inside a sentence takes its commas with it; one opening a sentence keeps the full stop before it
+    text = DISCOURSE_PATTERN.sub(lambda match: " " if match.group(1).startswith(",") else match.group(1), text)
+    text = REPEAT_PATTERN.sub(
+        lambda match: match.group(0) if match.group(1).lower() in VALID_REPEATS else match.group(1), text
+    )
+
+    sentences, seen = [], set()
+    for sentence in SENTENCE_PATTERN.split(text):
+        sentence = re.sub(r"\s+", " ", sentence).strip(" ,")
+        normalized = re.sub(r"[^\w\s']", "", sentence.lower()).strip()
+        if not normalized or normalized in BACKCHANNELS or normalized in seen:
+            continue
+        seen.add(normalized)
+        sentences.append(sentence[0].upper() + sentence[1:])
+    return " ".join(sentences)
+
+
+class PromptBuilder:
+    def __init__(self, system_prompt, patient_data=None, budget_tokens=3000, history_tokens=300,
+                 segment_tokens=80, model="gpt-4", emotion_classifier=None):
+        """
+        Builds chat prompts that fit a token budget behind a stable prefix.
+
+        The system message (instructions plus patient context) is built once and is byte-identical
+        in every request of a session; only the transcript that follows changes. That lets the
+        provider's automatic prompt caching reuse it, but only once the prefix is long enough to
+        qualify (1,024 tokens for OpenAI), which a short system prompt and trimmed history usually
+        aren't. The local response cache keys on the whole request, so it doesn't benefit.
+        Transcripts are compressed, and if they still exceed the budget only their most
+        emotionally salient segments are kept.
+
+        Args:
+            system_prompt (str): Role and standing instructions that open every prompt.
+            patient_data (dict): Patient name, age and history added to the prefix.
+            budget_tokens (int): Most transcript tokens sent in one request.
+            history_tokens (int): Most tokens of patient history kept in the prefix.
+            segment_tokens (int): Approximate size of the segments kept or dropped as a whole.
+            model (str): Model whose tokenizer is used for counting.
+            emotion_classifier (EmotionClassifier): Scores the salience of each segment.
+        """
+        self.system_prompt = system_prompt
+        self.patient_data = patient_data
+        self.budget_tokens = budget_tokens
+        self.history_tokens = history_tokens
+        self.segment_tokens = segment_tokens
+        self.model = model
+        self.emotion_classifier = emotion_classifier or EmotionClassifier()
+        self._prefix = None
+        self._full_prefix_tokens = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "original_tokens": 0, "prompt_tokens": 0, "tokens_saved": 0}
+        self.last_report = None
+
+    @property
+    def prefix(self):
+        """
+        The system message shared by every request built by this builder.
+        """
+        if self._prefix is None:
+            self._full_prefix_tokens = self.count(self._build_prefix(trim=False))
+            self._prefix = self._build_prefix(trim=True)
+        return self._prefix
+
+    def count(self, text):
+        return count_tokens(text, self.model)
+
+    def fit(self, transcript, budget_tokens=None):
+        """
+        Compress a transcript and, if it is still over budget, keep only its most salient segments.
+
+        Dropped stretches are marked with '[...]' so the model knows the text isn't continuous.
+        Segments shrink with small budgets, and if not even one fits, the start of the most salient
+        one is kept, so the transcript is never replaced by the marker alone.
+
+        Args:
+            transcript (str): Transcript text.
+            budget_tokens (int): Overrides the builder's budget for this call.
+
+        Returns:
+            str: Transcript that fits the budget.
+        """
+        budget = budget_tokens or self.budget_tokens
+        text = compress_transcript(transcript)
+        if self.count(text) <= budget:
+            return text
+
+        # At least two segments fit any budget, so a small one doesn't drop everything
+        segments = self._segments(text, max(1, min(self.segment_tokens, budget // 2)))
+        gap_tokens = self.count(f" {GAP_MARKER} ")
+        # Most salient first; ties keep the earlier segment
+        ranked = sorted(range(len(segments)), key=lambda i: (-self._salience(segments[i][0]), i))
+        kept, used = set(), 0
+        for i in ranked:
+            cost = segments[i][1] + gap_tokens
+            if used + cost <= budget:
+                kept.add(i)
+                used += cost
+        if not kept:
+            return self._truncate(segments[ranked[0]][0], budget)
+
+        parts = []
+        for i, (segment, _) in enumerate(segments):
+            if i in kept:
+                parts.append(segment)
+            elif not parts or parts[-1] != GAP_MARKER:
+                parts.append(GAP_MARKER)
+        return " ".join(parts)
+
+    def build(self, instructions, transcript=None, budget_tokens=None):
+        """
+        Build the messages of one request: the stable prefix, then the instructions and the fitted transcript.
+
+        Args:
+            instructions (str): Request-specific instructions (or content that isn't compressed).
+            transcript (str): Transcript to compress and fit to the budget.
+            budget_tokens (int): Overrides the builder's budget for this call.
+
+        Returns:
+            list: Chat messages. The saving is added to stats() and to the current tracing span.
+        """
+        prefix = self.prefix
+        content = instructions
+        original_tokens = self._full_prefix_tokens + self.count(instructions)
+        if transcript is not None:
+            content = f"{instructions}\n\nTranscript:\n{self.fit(transcript, budget_tokens)}"
+            original_tokens += self.count(f"\n\nTranscript:\n{transcript}")
+
+        prompt_tokens = self.count(prefix) + self.count(content)
+        saved = max(0, original_tokens - prompt_tokens)
+        report = {"original_tokens": original_tokens, "prompt_tokens": prompt_tokens, "tokens_saved": saved}
+        with self._lock:
+            self._stats["requests"] += 1
+            for key, value in report.items():
+                self._stats[key] += value
+            self.last_report = report
+        record("tokens_saved", saved)
+        return [
+            {"role": "system", "content": prefix},
+            {"role": "user", "content": content},
+        ]
+
+    def stats(self):
+        """
+        Return the requests built, their original and actual prompt tokens, the tokens saved and
+        the size of the shared prefix.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["prefix_tokens"] = self.count(self.prefix)
+        return stats
+
+    def _build_prefix(self, trim):
+        if self.patient_data is None:
+            return self.system_prompt
+        history = self.patient_data.get('history') or 'No history provided'
+        if trim:
+            history = self.fit(history, self.history_tokens)
+        return (
+            f"{self.system_prompt}\n\n"
+            f"Context: Patient Name: {self.patient_data.get('name', 'Unknown')}, "
+            f"Age: {self.patient_data.get('age', 'Unknown')}, "
+            f"History: {history}"
+        )
+
+    def _segments(self, text, segment_tokens):
+        """
+        Group sentences into (segment, tokens) pairs of about segment_tokens; longer sentences are
+        split on spaces.
+        """
+        segments, current, current_tokens = [], [], 0
+        for sentence in SENTENCE_PATTERN.split(text):
+            for piece in self._split_sentence(sentence, segment_tokens):
+                tokens = self.count(piece)
+                if current and current_tokens + tokens > segment_tokens:
+                    segments.append((" ".join(current), current_tokens))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += tokens
+        if current:
+            segments.append((" ".join(current), current_tokens))
+        return segments
+
+    @staticmethod
+    def _split_sentence(sentence, segment_tokens):
+        words = sentence.split()
+        # About four tokens for every three words of conversational English
+        step = max(1, segment_tokens * 3 // 4)
+        return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+    def _truncate(self, text, budget):
+        """
+        Keep the words at the start of text that fit within budget tokens.
+        """
+        words = text.split()
+        kept = 0
+        while kept < len(words) and self.count(" ".join(words[:kept + 1])) <= budget:
+            kept += 1
+        return " ".join(words[:kept])
+
+    def _salience(self, segment):
+        result = self.emotion_classifier.classify(segment)
+        return 0.0 if result["emotion"] == "neutral" else result["intensity"]
@@ -0,0 +1,570 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.audio_agent import AudioAgent
+from backend.audio_profile import StreamingResampler
+from backend.emotion_classifier import EmotionClassifier
+from backend.hue_bridge import HueCommandQueue
+from backend.live_session import LiveSession
+from backend.music_agent import MusicAgent
+from backend.orchestrator import TherapySessionManager
+from backend.playlist_index import PlaylistIndex
+from backend.spotify_client import build_spotify_client
+from backend.transcription import create_transcription_engine
+from backend.visual_environment_agent import VisualLightAgent
+from integrations.openai_config import OpenAIConfig
+from integrations.response_cache import ResponseCache
+from integrations.tracing import percentile
+
+
+class SharedResources:
+    def __init__(self, openai_config=None, transcription_engine=None, emotion_classifier=None, spotify=None,
+                 search_cache=None, playlist_index=None, bridge_factory=None, data_manager=None, workers=None):
+        """
+        Clients and models shared by every room hosted by a SessionServer.
+
+        Args:
+            openai_config (OpenAIConfig): One client for every room, so rate limits, retries and the
+                response cache are shared (defaults to one allowing 16 requests in flight).
+            transcription_engine (TranscriptionEngine): One warm engine for every room (defaults to the
+                TRANSCRIPTION_ENGINE environment variable; the local model gets one worker per two cores).
+            emotion_classifier (EmotionClassifier): Stateless classifier shared by every room.
+            spotify: Spotify client shared by every room (a pooled spotipy client is built on first use).
+            search_cache (ResponseCache): Resolved Spotify searches (defaults to SPOTIFY_CACHE_PATH).
+            playlist_index (PlaylistIndex): Emotion-to-tracks index (defaults to PLAYLIST_INDEX_PATH).
+            bridge_factory (callable): Maps a bridge IP to a connected bridge (defaults to phue).
+            data_manager (DataManager): Session store every room writes its timeline to.
+            workers (int): Threads processing windows for all rooms. Most of a window's time is spent
+                waiting on the API or the shared model, so the default is 32 or twice the core count.
+        """
+        cores = os.cpu_count() or 4
+        self.openai_config = openai_config or OpenAIConfig(max_concurrency=16)
+        if transcription_engine is None:
+            name = os.getenv("TRANSCRIPTION_ENGINE", "local")
+            options = {"num_workers": max(1, cores // 2), "cpu_threads": 2} if name == "local" else {}
+            transcription_engine = create_transcription_engine(name, **options)
+        self.transcription_engine = transcription_engine
+        self.emotion_classifier = emotion_classifier or EmotionClassifier()
+        self.search_cache = search_cache if search_cache is not None else ResponseCache(
+            db_path=os.environ.get("SPOTIFY_CACHE_PATH", "./cache/spotify_search.db"), ttl=7 * 24 * 3600
+        )
+        self.playlist_index = playlist_index if playlist_index is not None else PlaylistIndex.load(
+            os.environ.get("PLAYLIST_INDEX_PATH", "./cache/playlist_index.json")
+        )
+        self.bridge_factory = bridge_factory or self._connect_bridge
+        self.data_manager = data_manager
+        self.workers = workers or max(32, cores * 2)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="room-worker")
+        self._spotify = spotify
+        self._command_queues = {}  # Bridge IP -> HueCommandQueue
+        self._lock = threading.Lock()
+
+    @property
+    def spotify(self):
+        with self._lock:
+            if self._spotify is None:
+                self._spotify = build_spotify_client(
+                    os.getenv("SPOTIFY_CLIENT_ID"), os.getenv("SPOTIFY_CLIENT_SECRET"), os.getenv("REDIRECT_URI"),
+                    pool_size=32
+                )
+            return self._spotify
+
+    def command_queue(self, bridge_ip):
+        """
+        Return the command queue of a Hue bridge, connecting to it the first time a room uses it.
+        A failed connection isn't remembered, so the next room tries again.
+        """
+        with self._lock:
+            if bridge_ip not in self._command_queues:
+                self._command_queues[bridge_ip] = HueCommandQueue(self.bridge_factory(bridge_ip))
+            return self._command_queues[bridge_ip]
+
+    @staticmethod
+    def _connect_bridge(bridge_ip):
+        from phue import Bridge
+
+        bridge = Bridge(bridge_ip)
+        bridge.connect()
+        return bridge
+
+    def warm_up(self):
+        """
+        Load the transcription model and the OpenAI client before the first room connects.
+        """
+        self.transcription_engine.warm_up()
+        self.openai_config.warm_up()
+
+    def stats(self):
+        with self._lock:
+            queues = dict(self._command_queues)
+        return {
+            "workers": self.workers,
+            "bridges": {bridge_ip: queue.stats() for bridge_ip, queue in queues.items()},
+            "openai": self.openai_config.metrics(),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        # Playlist refreshes use the shared clients, so they finish before the clients go away
+        self.playlist_index.wait_for_refreshes()
+        with self._lock:
+            queues, self._command_queues = list(self._command_queues.values()), {}
+        for queue in queues:
+            queue.close()
+
+
+class Room:
+    def __init__(self, name, session):
+        """
+        One therapy room connected to a SessionServer: its own session, agents and window queue.
+
+        Args:
+            name (str): Room name, unique among the connected rooms.
+            session (LiveSession): The room's session; it is only ever used by one window at a time.
+        """
+        self.name = name
+        self.session = session
+        self.windows = asyncio.Queue()
+        self.dropped_windows = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=512)
+
+    def stats(self):
+        """
+        Return the session's stats plus dropped windows, errors and window latency (seconds from a
+        window being received to its result being sent).
+        """
+        latencies = list(self.latencies)
+        stats = self.session.stats()
+        stats.update({
+            "room": self.name,
+            "queued_windows": self.windows.qsize(),
+            "dropped_windows": self.dropped_windows,
+            "errors": self.errors,
+            "latency_p50_seconds": percentile(latencies, 0.5),
+            "latency_p95_seconds": percentile(latencies, 0.95),
+        })
+        return stats
+
+
+class SessionServer:
+    def __init__(self, shared=None, host="0.0.0.0", port=8765, window_seconds=10, overlap_seconds=2,
+                 max_queued_windows=3, recordings_folder="./recordings/rooms"):
+        """
+        Asyncio server hosting many concurrent therapy rooms in one process.
+
+        Every room keeps its own session state (timeline, mood smoothing, VAD counters, summary,
+        Spotify device and light group) while the transcription model, emotion classifier, OpenAI
+        and Spotify clients and each bridge's command queue are shared.
+
+        Protocol: a room client connects over TCP and sends one JSON line with 'room' and optionally
+        'patient', 'rate' (default 16000), 'duration', 'bridge_ip', 'group_id', 'spotify_device' and
+        'summarize', then streams 16-bit mono PCM. The server answers with JSON lines: a 'window'
+        message per analysed window and a final 'summary' message once the client closes its side.
+        A client that sends {"type": "stats"} receives the server stats instead.
+
+        Args:
+            shared (SharedResources): Models and clients shared by every room.
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 picks a free one).
+            window_seconds (float): Length of each analysed window.
+            overlap_seconds (float): Audio shared between consecutive windows.
+            max_queued_windows (int): Windows a room may have waiting; beyond it the oldest is dropped so
+                a slow room catches up with live audio instead of falling further behind.
+            recordings_folder (str): Parent folder of each room's temporary window files.
+
+        Raises:
+            ValueError: If the overlap isn't shorter than the window.
+        """
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError("overlap_seconds must be smaller than window_seconds.")
+        self.shared = shared or SharedResources()
+        self.host = host
+        self.port = port
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_queued_windows = max_queued_windows
+        self.recordings_folder = recordings_folder
+        self.rooms = {}
+        self.rooms_served = 0
+        self.window_latencies = deque(maxlen=10000)
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Session server listening on {self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def stats(self):
+        latencies = list(self.window_latencies)
+        return {
+            "rooms": {name: room.stats() for name, room in list(self.rooms.items())},
+            "rooms_served": self.rooms_served,
+            "latency_p50_seconds": percentile(latencies, 0.5),
+            "latency_p95_seconds": percentile(latencies, 0.95),
+            "shared": self.shared.stats(),
+        }
+
+    def create_room(self, header):
+        """
+        Build a room's agents and session around the shared resources.
+
+        A room whose Hue bridge is missing or unreachable runs without lighting.
+
+        Raises:
+            ValueError: If the header has no room name or the room is already connected.
+        """
+        name = header.get("room")
+        if not name:
+            raise ValueError("The header must name the room.")
+        if name in self.rooms:
+            raise ValueError(f"Room '{name}' is already connected.")
+        shared = self.shared
+        patient = header.get("patient") or {"name": name}
+
+        audio_agent = AudioAgent(
+            openai_api_key=shared.openai_config.api_key,
+            patient_data=patient,
+            transcription_engine=shared.transcription_engine,
+            openai_config=shared.openai_config,
+            emotion_classifier=shared.emotion_classifier,
+            data_manager=shared.data_manager
+        )
+        music_agent = MusicAgent(
+            None, None, None, shared.openai_config.api_key,
+            openai_config=shared.openai_config,
+            sp=shared.spotify,
+            search_cache=shared.search_cache,
+            playlist_index=shared.playlist_index,
+            device_name=header.get("spotify_device")
+        )
+        # Lighting is optional: a room whose bridge can't be reached still streams and gets music
+        bridge_ip = header.get("bridge_ip") or os.getenv("HUE_BRIDGE_IP")
+        command_queue = None
+        if not bridge_ip:
+            print(f"Room '{name}' has no Hue bridge; running without lighting.")
+        else:
+            try:
+                command_queue = shared.command_queue(bridge_ip)
+            except Exception as e:
+                print(f"Room '{name}' can't reach the Hue bridge at {bridge_ip} ({e}); running without lighting.")
+        visual_agent = VisualLightAgent(bridge_ip if command_queue is not None else None,
+                                        group_id=header.get("group_id", 0), command_queue=command_queue)
+        session = LiveSession(
+            TherapySessionManager(shared.openai_config, music_agent, visual_agent, audio_agent),
+            duration=header.get("duration", 50 * 60),
+            window_seconds=self.window_seconds,
+            overlap_seconds=self.overlap_seconds,
+            recordings_folder=os.path.join(self.recordings_folder, re.sub(r"[^\w-]", "_", name)),
+            data_manager=shared.data_manager,
+            summarizer=audio_agent.incremental_summarizer(max_workers=1) if header.get("summarize", True) else None
+        )
+        return Room(name, session)
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            header = json.loads(await reader.readline() or b"{}")
+        except ValueError:
+            header = {}
+        if header.get("type") == "stats":
+            await self._send(writer, dict(self.stats(), type="stats"))
+            writer.close()
+            return
+
+        try:
+            # Connecting to a bridge or building clients may block, so it runs on a worker
+            room = await loop.run_in_executor(self.shared.executor, self.create_room, header)
+            if room.name in self.rooms:
+                raise ValueError(f"Room '{room.name}' is already connected.")
+        except Exception as e:
+            print(f"Rejected room {header.get('room')!r}: {e}")
+            await self._send(writer, {"type": "error", "error": str(e)})
+            writer.close()
+            return
+
+        self.rooms[room.name] = room
+        self.rooms_served += 1
+        print(f"Room '{room.name}' connected ({len(self.rooms)} active).")
+        room.session.start()
+        processor = asyncio.ensure_future(self._process(room, writer))
+        try:
+            await self._receive(room, reader, header)
+        except ConnectionError as e:
+            print(f"Room '{room.name}' disconnected: {e}")
+        finally:
+            try:
+                room.windows.put_nowait(None)
+                await processor
+                await loop.run_in_executor(self.shared.executor, room.session.finish)
+                await self._send(writer, {"type": "summary", "room": room.name, "summary": room.session.summary,
+                                          "stats": room.stats()})
+            except Exception as e:
+                print(f"Room '{room.name}': error closing the session: {e}")
+            finally:
+                # The room is released even if finishing it failed, so it can reconnect
+                del self.rooms[room.name]
+                writer.close()
+                print(f"Room '{room.name}' closed ({len(self.rooms)} active).")
+
+    async def _receive(self, room, reader, header):
+        """
+        Read the room's PCM stream, resample it and queue overlapping windows.
+        """
+        out_rate = room.session.session_manager.audio_agent.capture_profile.rate
+        resampler = StreamingResampler(int(header.get("rate", 16000)), out_rate)
+        window_bytes = int(self.window_seconds * out_rate) * 2
+        step_bytes = int((self.window_seconds - self.overlap_seconds) * out_rate) * 2
+        duration_bytes = int(header.get("duration", 50 * 60) * out_rate) * 2
+        buffer, carry = bytearray(), b""
+        offset, index = 0, 0
+
+        while offset < duration_bytes:
+            data = await reader.read(65536)
+            if not data:
+                break
+            # Reads may split a 16-bit sample; the odd byte waits for the next read
+            data = carry + data
+            carry = data[len(data) - len(data) % 2:]
+            buffer.extend(resampler.process(data[:len(data) - len(carry)]))
+            while len(buffer) >= window_bytes and offset < duration_bytes:
+                self._enqueue(room, bytes(buffer[:window_bytes]), offset, index, out_rate)
+                del buffer[:step_bytes]
+                offset += step_bytes
+                index += 1
+
+        # Flush the tail, but only if it holds audio not covered by the previous window
+        if offset < duration_bytes and len(buffer) > window_bytes - step_bytes:
+            self._enqueue(room, bytes(buffer), offset, index, out_rate)
+
+    def _enqueue(self, room, frames, offset, index, rate):
+        if room.windows.qsize() >= self.max_queued_windows:
+            room.windows.get_nowait()
+            room.dropped_windows += 1
+        start = offset / (rate * 2)
+        room.windows.put_nowait({
+            "index": index,
+            "start": start,
+            "end": start + len(frames) / (rate * 2),
+            "frames": frames,
+            "rate": rate,
+            "channels": 1,
+            "sample_width": 2,
+            "received_at": time.perf_counter(),
+        })
+
+    async def _process(self, room, writer):
+        """
+        Process the room's windows in order on the shared workers and send each result back.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            window = await room.windows.get()
+            if window is None:
+                return
+            try:
+                entry = await loop.run_in_executor(self.shared.executor, room.session.process_window, window)
+            except Exception as e:
+                room.errors += 1
+                print(f"Room '{room.name}': error processing window {window['index']}: {e}")
+                continue
+            latency = time.perf_counter() - window["received_at"]
+            room.latencies.append(latency)
+            self.window_latencies.append(latency)
+            if entry is not None:
+                await self._send(writer, dict(entry, type="window", room=room.name, mood=room.session.current_mood))
+
+    @staticmethod
+    async def _send(writer, message):
+        try:
+            writer.write((json.dumps(message, default=str) + "\n").encode("utf-8"))
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def stream_recording(path, host="127.0.0.1", port=8765, room="room-1", speedup=1.0, chunk_seconds=0.5,
+                           **options):
+    """
+    Stream a 16-bit mono WAV recording to a SessionServer the way a room client would.
+
+    Args:
+        path (str): Recording to stream.
+        host (str): Server address.
+        port (int): Server port.
+        room (str): Room name.
+        speedup (float): Playback speed relative to real time (0 sends as fast as possible).
+        chunk_seconds (float): Audio sent per write.
+        **options: Other header fields (e.g., patient, bridge_ip, group_id, spotify_device).
+
+    Returns:
+        list: Every JSON message the server sent back.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    messages = []
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            messages.append(json.loads(line))
+
+    receiver = asyncio.ensure_future(receive())
+    with wave.open(path, 'rb') as wf:
+        rate = wf.getframerate()
+        writer.write((json.dumps(dict(options, room=room, rate=rate)) + "\n").encode("utf-8"))
+        chunk_frames = int(rate * chunk_seconds)
+        try:
+            while not receiver.done():
+                data = wf.readframes(chunk_frames)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+                if speedup:
+                    await asyncio.sleep(chunk_seconds / speedup)
+            writer.write_eof()
+        except ConnectionError:
+            # The server closed the connection early (e.g., it rejected the room)
+            pass
+    try:
+        await receiver
+    except ConnectionError:
+        pass
+    writer.close()
+    return messages
+
+
+async def simulate(rooms=20, fixtures_folder="./benchmarks/fixtures", speedup=4.0, workers=None,
+                   openai_latency=0.25, transcription_latency=0.4):
+    """
+    Host `rooms` simultaneous rooms streaming fixture recordings against local stand-ins for OpenAI,
+    Spotify and the Hue bridges, and report how well the server keeps up.
+
+    Returns:
+        dict: Rooms, windows, dropped windows, errors, window latency percentiles, the worst
+              backlog and the elapsed time.
+    """
+    from backend.hue_bridge import FakeBridge
+    from backend.pipeline_benchmark import generate_fixtures, load_fixtures
+    from backend.spotify_client import FakeSpotify
+    from backend.transcription import StubTranscriptionEngine
+    from integrations.mock_openai_server import MockOpenAIServer
+
+    if not os.path.isdir(fixtures_folder) or not load_fixtures(fixtures_folder):
+        generate_fixtures(fixtures_folder)
+    fixtures = load_fixtures(fixtures_folder)
+    mock = MockOpenAIServer(latency=openai_latency).start()
+    devices = [{"id": f"speaker-{i + 1}", "name": f"Room {i + 1} Speaker", "is_active": True} for i in range(rooms)]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        shared = SharedResources(
+            openai_config=OpenAIConfig(api_key="simulation", api_base=mock.url, cache=ResponseCache(),
+                                       max_concurrency=16),
+            transcription_engine=StubTranscriptionEngine(latency=transcription_latency),
+            spotify=FakeSpotify(latency=0.05, devices=devices),
+            search_cache=ResponseCache(),
+            playlist_index=PlaylistIndex(os.path.join(scratch, "playlist_index.json")),
+            bridge_factory=lambda bridge_ip: FakeBridge(latency=0.03),
+            workers=workers
+        )
+        server = await SessionServer(shared, host="127.0.0.1", port=0,
+                                     recordings_folder=os.path.join(scratch, "rooms")).start()
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(
+                stream_recording(fixtures[i % len(fixtures)]["path"], port=server.port, room=f"room-{i + 1}",
+                                 speedup=speedup, bridge_ip=f"10.0.0.{i // 10 + 1}", group_id=i % 10 + 1,
+                                 spotify_device=f"Room {i + 1} Speaker", patient={"name": f"Patient {i + 1}"})
+                for i in range(rooms)
+            ))
+            elapsed = time.perf_counter() - started
+            latencies = list(server.window_latencies)
+        finally:
+            await server.stop()
+            shared.close()
+            mock.stop()
+
+    room_stats = [message["stats"] for messages in results for message in messages if message["type"] == "summary"]
+    return {
+        "rooms": rooms,
+        "completed_rooms": len(room_stats),
+        "windows": sum(stats["windows_processed"] for stats in room_stats),
+        "dropped_windows": sum(stats["dropped_windows"] for stats in room_stats),
+        "errors": sum(stats["errors"] for stats in room_stats),
+        "latency_p50_seconds": percentile(latencies, 0.5),
+        "latency_p95_seconds": percentile(latencies, 0.95),
+        "max_backlog_seconds": max((stats["max_backlog_seconds"] for stats in room_stats), default=0.0),
+        "elapsed_seconds": elapsed,
+    }
+
+
+async def serve(args):
+    data_manager = None
+    if args.store:
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+        from modules.data_manager import DataManager
+
+        data_manager = DataManager()
+    shared = SharedResources(data_manager=data_manager, workers=args.workers)
+    # Load the shared model once, before the first room connects
+    await asyncio.get_running_loop().run_in_executor(shared.executor, shared.warm_up)
+    server = await SessionServer(shared, host=args.host, port=args.port, window_seconds=args.window,
+                                 overlap_seconds=args.overlap).start()
+    try:
+        await server.serve_forever()
+    finally:
+        shared.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Host many therapy rooms in one process.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subcommands.add_parser("serve", help="Accept room connections")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--workers", type=int, help="Window-processing threads (default: 32)")
+    serve_parser.add_argument("--window", type=float, default=10, help="Window length in seconds")
+    serve_parser.add_argument("--overlap", type=float, default=2, help="Window overlap in seconds")
+    serve_parser.add_argument("--store", action="store_true", help="Save sessions with DataManager")
+    simulate_parser = subcommands.add_parser("simulate", help="Load-test with simulated rooms and local stand-ins")
+    simulate_parser.add_argument("--rooms", type=int, default=20)
+    simulate_parser.add_argument("--fixtures", default="./benchmarks/fixtures", help="Folder of WAV fixtures")
+    simulate_parser.add_argument("--speedup", type=float, default=4.0, help="Playback speed relative to real time")
+    simulate_parser.add_argument("--workers", type=int, help="Window-processing threads (default: 32)")
+    simulate_parser.add_argument("--transcription-latency", type=float, default=0.4)
+    simulate_parser.add_argument("--openai-latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            print("Session server stopped.")
+    else:
+        report = asyncio.run(simulate(args.rooms, args.fixtures, args.speedup, args.workers,
+                                      args.openai_latency, args.transcription_latency))
+        print(json.dumps(report, indent=4))
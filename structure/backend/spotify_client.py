@@ -0,0 +1,113 @@
+import hashlib
+import time
+
+SPOTIFY_SCOPE = "user-read-playback-state user-modify-playback-state"
+
+
+def build_spotify_client(client_id, client_secret, redirect_uri, pool_size=10):
+    """
+    Build a spotipy client that reuses one pooled, keep-alive HTTP session for every request.
+
+    Args:
+        client_id (str): Spotify Client ID.
+        client_secret (str): Spotify Client Secret.
+        redirect_uri (str): Redirect URI for Spotify OAuth.
+        pool_size (int): Maximum number of pooled connections to the Spotify API.
+
+    Returns:
+        spotipy.Spotify: The configured client.
+    """
+    import requests
+    import spotipy
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return spotipy.Spotify(
+        auth_manager=_auth_manager(client_id, client_secret, redirect_uri),
+        requests_session=session
+    )
+
+
+def has_cached_token(client_id, client_secret, redirect_uri):
+    """
+    Whether a Spotify token is already cached, so the client can be used without the interactive
+    OAuth sign-in. Only the token cache is read; nothing is sent to Spotify.
+    """
+    return _auth_manager(client_id, client_secret, redirect_uri).cache_handler.get_cached_token() is not None
+
+
+def _auth_manager(client_id, client_secret, redirect_uri):
+    from spotipy.oauth2 import SpotifyOAuth
+
+    return SpotifyOAuth(
+        client_id=client_id,
+        client_secret=client_secret,
+        redirect_uri=redirect_uri,
+        scope=SPOTIFY_SCOPE
+    )
+
+
+class FakeSpotify:
+    def __init__(self, latency=0.0, devices=None):
+        """
+        Local stand-in for spotipy.Spotify, for tests and benchmarks without a Spotify account.
+
+        Search results are derived from a hash of the query, so the same query always resolves to
+        the same track.
+
+        Args:
+            latency (float): Seconds each call takes, to simulate an HTTP round trip.
+            devices (list): Device dicts returned by devices() (defaults to one active speaker).
+        """
+        self.latency = latency
+        self.device_list = devices if devices is not None else [
+            {"id": "fake-device", "name": "Therapy Room Speaker", "is_active": True}
+        ]
+        self.calls = {"search": 0, "devices": 0, "start_playback": 0, "audio_features": 0}
+        self.playing = None
+
+    def search(self, q, limit=10, type="track", **kwargs):
+        self._call("search")
+        items = []
+        for i in range(limit):
+            track_id = hashlib.sha1(f"{q}:{i}".encode("utf-8")).hexdigest()[:22]
+            items.append({
+                "id": track_id,
+                "uri": f"spotify:track:{track_id}",
+                "name": f"{q.title()} #{i + 1}",
+                "artists": [{"name": "MoodSync Test Artist"}],
+            })
+        empty = {"items": []}
+        return {"tracks": {"items": items}, "playlists": empty, "albums": empty}
+
+    def devices(self):
+        self._call("devices")
+        return {"devices": list(self.device_list)}
+
+    def start_playback(self, device_id=None, context_uri=None, uris=None, **kwargs):
+        self._call("start_playback")
+        if device_id not in {device["id"] for device in self.device_list}:
+            from spotipy import SpotifyException
+
+            raise SpotifyException(404, -1, "Device not found")
+        self.playing = {"device_id": device_id, "context_uri": context_uri, "uris": uris}
+
+    def audio_features(self, tracks):
+        self._call("audio_features")
+        features = []
+        for track in tracks:
+            digest = hashlib.sha1(track.encode("utf-8")).digest()
+            features.append({
+                "uri": track if track.startswith("spotify:") else f"spotify:track:{track}",
+                "valence": digest[0] / 255,
+                "energy": digest[1] / 255,
+                "tempo": 60 + digest[2] / 255 * 100,
+            })
+        return features
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+STRUCTURE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.dirname(STRUCTURE_DIR)
+
+# Third-party packages whose import cost the agents defer until first use
+HEAVY_DEPENDENCIES = (
+    "numpy", "openai", "pyaudio", "spotipy", "phue", "matplotlib.pyplot", "streamlit",
+    "faster_whisper", "soundfile", "webrtcvad",
+)
+
+# (name, import statement, construction statement) for each component
+COMPONENTS = (
+    ("OpenAIConfig", "from integrations.openai_config import OpenAIConfig",
+     "OpenAIConfig()"),
+    ("AudioAgent", "from backend.audio_agent import AudioAgent",
+     "AudioAgent(openai_api_key='benchmark', patient_data={})"),
+    ("MusicAgent", "from backend.music_agent import MusicAgent",
+     "MusicAgent('id', 'secret', 'http://localhost:8888/callback', 'benchmark')"),
+    ("VisualLightAgent", "from backend.visual_environment_agent import VisualLightAgent",
+     "VisualLightAgent('192.0.2.1')"),
+    ("LiveSession", "from backend.live_session import LiveSession", None),
+    ("NLPProcessor", "from modules.nlp_processing import NLPProcessor",
+     "NLPProcessor(api_key='benchmark')"),
+)
+
+_MEASURE = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+started = time.perf_counter()
+{import_statement}
+imported = time.perf_counter()
+{construct}
+constructed = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"import_seconds": imported - started, "init_seconds": constructed - imported, "loaded": heavy}}))
+"""
+
+
+def warm_up_in_background(components, on_ready=None):
+    """
+    Call warm_up() on each component in a background thread, so models, clients and device
+    connections are ready by the time they are first needed without delaying startup.
+
+    Args:
+        components (list): Objects with a warm_up() method (e.g., AudioAgent, MusicAgent, VisualLightAgent).
+        on_ready (callable): Called with {component class name: seconds, or the error message} when done.
+
+    Returns:
+        threading.Thread: The warm-up thread.
+    """
+    def run():
+        timings = {}
+        for component in components:
+            name = type(component).__name__
+            started = time.perf_counter()
+            try:
+                component.warm_up()
+                timings[name] = time.perf_counter() - started
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+                timings[name] = str(e)
+        if on_ready is not None:
+            on_ready(timings)
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def measure(import_statement, construct=None, env=None, cwd=None):
+    """
+    Import (and optionally construct) a component in a fresh interpreter, so nothing is cached.
+
+    Returns:
+        dict: 'import_seconds', 'init_seconds' and 'loaded' (heavy dependencies pulled in), or
+              'error' if the import or construction failed.
+    """
+    code = _MEASURE.format(paths=[STRUCTURE_DIR, REPO_DIR], import_statement=import_statement,
+                           construct=construct or "pass", heavy=list(HEAVY_DEPENDENCIES))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=cwd)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"error": (result.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(lines[-1])
+
+
+def run_benchmark():
+    """
+    Measure the cold import cost of each heavy dependency and the import and init cost of each component.
+
+    Returns:
+        dict: 'dependencies' and 'components', each mapping names to measure() results.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        # Caches and indexes go to a scratch folder; the key is a placeholder since nothing is sent
+        env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"),
+                   OPENAI_CACHE_PATH=os.path.join(folder, "openai.db"),
+                   SPOTIFY_CACHE_PATH=os.path.join(folder, "spotify.db"),
+                   PLAYLIST_INDEX_PATH=os.path.join(folder, "playlist_index.json"))
+        dependencies = {name: measure(f"import {name}", env=env, cwd=folder) for name in HEAVY_DEPENDENCIES}
+        components = {name: measure(statement, construct, env=env, cwd=folder)
+                      for name, statement, construct in COMPONENTS}
+    return {"dependencies": dependencies, "components": components}
+
+
+def print_report(report):
+    print(f"{'Dependency':<22}{'import (ms)':>12}")
+    for name, result in report["dependencies"].items():
+        value = "not installed" if "error" in result else f"{result['import_seconds'] * 1000:.1f}"
+        print(f"{name:<22}{value:>12}")
+    print()
+    print(f"{'Component':<22}{'import (ms)':>12}{'init (ms)':>12}  heavy dependencies loaded")
+    for name, result in report["components"].items():
+        if "error" in result:
+            print(f"{name:<22}{'failed':>12}{'':>12}  {result['error']}")
+            continue
+        print(f"{name:<22}{result['import_seconds'] * 1000:>12.1f}{result['init_seconds'] * 1000:>12.1f}  "
+              f"{', '.join(result['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    report = run_benchmark()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from integrations.resilience import RetryPolicy
+
+
+class TranscriptionEngine:
+    """
+    Interface for speech-to-text backends used by AudioAgent and AudioTranscriber.
+    """
+
+    def transcribe(self, audio_file):
+        """
+        Transcribe an audio file.
+
+        Args:
+            audio_file (str): Path to the audio file.
+
+        Returns:
+            str: Transcribed text.
+        """
+        raise NotImplementedError
+
+    def transcribe_segments(self, audio_file):
+        """
+        Transcribe an audio file into timed segments.
+
+        Engines that can't time their output return the whole text as one segment.
+
+        Returns:
+            list: Dicts with 'start' and 'end' (seconds from the start of the file) and 'text'.
+        """
+        return [{"start": 0.0, "end": None, "text": self.transcribe(audio_file)}]
+
+    def warm_up(self):
+        """
+        Load anything the engine needs ahead of the first call. No-op by default.
+        """
+
+
+class OpenAIWhisperEngine(TranscriptionEngine):
+    def __init__(self, model="whisper-1", retry_policy=None, api_key=None, api_base=None):
+        """
+        Transcribe through OpenAI's hosted Whisper API (one upload per call).
+
+        Args:
+            model (str): Hosted model name.
+            retry_policy (RetryPolicy): Backoff for rate limits and transient errors.
+            api_key (str): OpenAI API key (defaults to the OPENAI_API_KEY environment variable).
+            api_base (str): API base URL, e.g. a local stand-in server (defaults to OPENAI_API_BASE).
+        """
+        self.model = model
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.api_base = api_base or os.environ.get("OPENAI_API_BASE")
+
+    def warm_up(self):
+        import openai
+
+        if self.api_key:
+            openai.api_key = self.api_key
+
+    def transcribe(self, audio_file):
+        response = self._request(audio_file)
+        return response.get("text", "")
+
+    def transcribe_segments(self, audio_file):
+        response = self._request(audio_file, response_format="verbose_json")
+        return [
+            {"start": segment["start"], "end": segment["end"], "text": segment["text"].strip()}
+            for segment in response.get("segments", [])
+        ]
+
+    def _request(self, audio_file, **kwargs):
+        import openai
+
+        if self.api_key:
+            openai.api_key = self.api_key
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+
+        # The file is reopened for every attempt, since a failed upload consumes it
+        def upload():
+            with open(audio_file, "rb") as file:
+                return openai.Audio.transcribe(model=self.model, file=file, **kwargs)
+        return self.retry_policy.call(upload)
+
+
+class LocalWhisperEngine(TranscriptionEngine):
+    # Loaded models are shared by every engine in the process, keyed by their settings
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_size="base", compute_type="int8", cpu_threads=0, language=None, beam_size=1,
+                 num_workers=1):
+        """
+        Transcribe on the CPU with a quantized Whisper model through faster-whisper (CTranslate2).
+
+        The model is loaded once and kept warm for every later call, so no network access is needed.
+
+        Args:
+            model_size (str): Model name or path (e.g., 'tiny', 'base', 'small').
+            compute_type (str): CTranslate2 quantization (e.g., 'int8', 'int8_float32').
+            cpu_threads (int): Threads used by CTranslate2 (0 lets it decide).
+            language (str): Language code, or None to auto-detect.
+            beam_size (int): Beam width; 1 is greedy decoding, the fastest option.
+            num_workers (int): Transcriptions the shared model runs in parallel when called from
+                several threads (each uses cpu_threads threads).
+        """
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.beam_size = beam_size
+        self.num_workers = num_workers
+
+    @property
+    def model(self):
+        key = (self.model_size, self.compute_type, self.cpu_threads, self.num_workers)
+        with self._models_lock:
+            if key not in self._models:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError as e:
+                    raise ImportError("LocalWhisperEngine requires faster-whisper: pip install faster-whisper") from e
+                print(f"Loading local Whisper model '{self.model_size}' ({self.compute_type})...")
+                self._models[key] = WhisperModel(
+                    self.model_size, device="cpu", compute_type=self.compute_type, cpu_threads=self.cpu_threads,
+                    num_workers=self.num_workers
+                )
+            return self._models[key]
+
+    def warm_up(self):
+        self.model
+
+    def transcribe(self, audio_file):
+        return " ".join(segment["text"] for segment in self.transcribe_segments(audio_file))
+
+    def transcribe_segments(self, audio_file):
+        segments, _ = self.model.transcribe(audio_file, language=self.language, beam_size=self.beam_size)
+        return [{"start": segment.start, "end": segment.end, "text": segment.text.strip()} for segment in segments]
+
+
+class StubTranscriptionEngine(TranscriptionEngine):
+    def __init__(self, transcripts=None, default_text="I have been feeling a bit anxious this week.", latency=0.0):
+        """
+        Deterministic engine for tests: returns canned text without touching audio or the network.
+
+        Args:
+            transcripts (dict): Maps audio file names (basename) to the text to return.
+            default_text (str): Text returned for files not in `transcripts`.
+            latency (float): Seconds each call takes, to simulate a transcription backend.
+        """
+        self.transcripts = transcripts or {}
+        self.default_text = default_text
+        self.latency = latency
+        self.calls = []
+
+    def transcribe(self, audio_file):
+        self.calls.append(audio_file)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.transcripts.get(os.path.basename(audio_file), self.default_text)
+
+
+ENGINES = {
+    "openai": OpenAIWhisperEngine,
+    "local": LocalWhisperEngine,
+    "stub": StubTranscriptionEngine,
+}
+
+
+def create_transcription_engine(name="openai", **kwargs):
+    """
+    Build a transcription engine by name ('openai', 'local' or 'stub').
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown transcription engine '{name}'. Choose one of: {', '.join(ENGINES)}.")
+    return ENGINES[name](**kwargs)
@@ -0,0 +1,182 @@
+import numpy as np
+
+
+class VoiceActivityDetector:
+    def __init__(self, frame_seconds=0.03, energy_threshold=None, zcr_range=(0.02, 0.35),
+                 min_speech_seconds=0.25, merge_gap_seconds=0.6, padding_seconds=0.2, backend="energy",
+                 webrtc_aggressiveness=2, noise_margin=3.0, min_dynamic_range=2.0, noise_adaptation=0.1):
+        """
+        Voice-activity detection that keeps only the speech in captured audio.
+
+        The default backend classifies frames by RMS energy and zero-crossing rate with NumPy; the
+        'webrtc' backend uses webrtcvad (8/16/32/48 kHz, 10/20/30 ms frames).
+
+        Args:
+            frame_seconds (float): Analysis frame length.
+            energy_threshold (float): RMS level above which a frame may be speech, or None to adapt it
+                to the noise floor tracked across buffers.
+            zcr_range (tuple): Zero-crossing rates (crossings per sample) typical of voiced speech.
+            min_speech_seconds (float): Shorter bursts are treated as noise.
+            merge_gap_seconds (float): Speech segments separated by less silence than this are merged.
+            padding_seconds (float): Audio kept on each side of a segment so words aren't clipped.
+            backend (str): 'energy' or 'webrtc'.
+            webrtc_aggressiveness (int): webrtcvad mode from 0 (least) to 3 (most aggressive).
+            noise_margin (float): How many times louder than the noise floor speech frames must be.
+            min_dynamic_range (float): Buffers whose loud frames are less than this many times louder
+                than their quiet ones are steady noise (e.g., hum or ventilation), not speech.
+            noise_adaptation (float): Fraction of the way the noise floor rises towards a louder
+                buffer's quiet level; it falls to a quieter level at once.
+        """
+        self.frame_seconds = frame_seconds
+        self.energy_threshold = energy_threshold
+        self.zcr_range = zcr_range
+        self.min_speech_seconds = min_speech_seconds
+        self.merge_gap_seconds = merge_gap_seconds
+        self.padding_seconds = padding_seconds
+        self.backend = backend
+        self.noise_margin = noise_margin
+        self.min_dynamic_range = min_dynamic_range
+        self.noise_adaptation = noise_adaptation
+        self.noise_floor = None  # RMS of the background noise, tracked across buffers
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        # End of the audio already counted, so the overlap of consecutive windows is counted once
+        self._counted_until = None
+        self._last_offset = None
+        self._webrtc = None
+        if backend == "webrtc":
+            try:
+                import webrtcvad
+            except ImportError as e:
+                raise ImportError("The 'webrtc' backend requires webrtcvad: pip install webrtcvad") from e
+            self._webrtc = webrtcvad.Vad(webrtc_aggressiveness)
+        elif backend != "energy":
+            raise ValueError("backend must be 'energy' or 'webrtc'.")
+
+    def speech_frames(self, samples, rate, update_noise_floor=True):
+        """
+        Classify each frame of 16-bit mono samples as speech or not.
+
+        Args:
+            samples (numpy.ndarray): 16-bit mono samples.
+            rate (int): Sample rate in Hz.
+            update_noise_floor (bool): Fold this buffer into the tracked noise floor.
+
+        Returns:
+            numpy.ndarray: One boolean per frame.
+        """
+        frame_length = max(1, int(rate * self.frame_seconds))
+        count = len(samples) // frame_length
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:count * frame_length].reshape(count, frame_length)
+
+        if self._webrtc is not None:
+            return np.array([self._webrtc.is_speech(frame.tobytes(), rate) for frame in frames], dtype=bool)
+
+        floats = frames.astype(np.float32)
+        energy = np.sqrt(np.mean(floats ** 2, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        threshold = self.energy_threshold
+        if threshold is None:
+            quiet, loud = np.percentile(energy, [10, 90])
+            stationary = loud < self.min_dynamic_range * quiet
+            floor = self._noise_floor(quiet, stationary)
+            if update_noise_floor:
+                self.noise_floor = floor
+            if stationary:
+                return np.zeros(count, dtype=bool)
+            # Well above the background noise, with a minimum for digital silence
+            threshold = max(self.noise_margin * floor, 300.0)
+        return (energy > threshold) & (zcr >= self.zcr_range[0]) & (zcr <= self.zcr_range[1])
+
+    def _noise_floor(self, quiet, stationary):
+        """
+        Return the noise floor after a buffer whose quietest tenth of frames has RMS `quiet`.
+
+        A steady buffer is all noise, so its level becomes the floor. Otherwise the floor drops to a
+        quieter level at once but rises slowly, since the quiet frames of a buffer full of speech
+        may be speech too.
+        """
+        if self.noise_floor is None or stationary or quiet < self.noise_floor:
+            return float(quiet)
+        return self.noise_floor + self.noise_adaptation * (quiet - self.noise_floor)
+
+    def detect(self, frames, rate, offset=0.0):
+        """
+        Find the speech segments in a buffer of 16-bit mono PCM and update the speech/silence counters.
+
+        Only audio after the end of the previous buffer is counted, so overlapping windows don't
+        count their shared audio twice; a buffer starting before the previous one starts a new stream.
+
+        Args:
+            frames (bytes): Raw PCM audio.
+            rate (int): Sample rate in Hz.
+            offset (float): Time of the buffer's first sample, so segments carry absolute offsets.
+
+        Returns:
+            list: Dicts with 'start' and 'end' (seconds, including offset) and 'frames' (the PCM bytes).
+        """
+        samples = np.frombuffer(frames, dtype=np.int16)
+        duration = len(samples) / rate
+        flags = self.speech_frames(samples, rate)
+
+        # Runs of speech frames as [start, end) frame indices
+        edges = np.diff(np.concatenate([[0], flags.astype(np.int8), [0]]))
+        runs = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+        segments = []
+        for start_frame, end_frame in runs:
+            start = float(start_frame * self.frame_seconds)
+            end = float(end_frame * self.frame_seconds)
+            if segments and start - segments[-1][1] < self.merge_gap_seconds:
+                segments[-1][1] = end
+            else:
+                segments.append([start, end])
+
+        speech = []
+        for start, end in segments:
+            if end - start < self.min_speech_seconds:
+                continue
+            start = max(0.0, start - self.padding_seconds)
+            end = min(duration, end + self.padding_seconds)
+            if speech and start <= speech[-1]["end"] - offset:
+                start = speech[-1]["start"] - offset
+                speech.pop()
+            first, last = int(start * rate), int(end * rate)
+            speech.append({"start": offset + start, "end": offset + end, "frames": samples[first:last].tobytes()})
+
+        self._count(speech, offset, offset + duration)
+        return speech
+
+    def _count(self, speech, start, end):
+        if self._counted_until is None or self._last_offset is None or start < self._last_offset:
+            self._counted_until = start
+        self._last_offset = start
+        new_start = max(start, self._counted_until)
+        if end <= new_start:
+            return
+        speech_seconds = sum(max(0.0, min(end, segment["end"]) - max(new_start, segment["start"]))
+                             for segment in speech)
+        self.speech_seconds += speech_seconds
+        self.silence_seconds += (end - new_start) - speech_seconds
+        self._counted_until = end
+
+    def is_speech(self, frames, rate):
+        """
+        Return True if a buffer contains any speech, without updating the counters or the noise floor.
+        """
+        flags = self.speech_frames(np.frombuffer(frames, dtype=np.int16), rate, update_noise_floor=False)
+        return bool(flags.sum() * self.frame_seconds >= self.min_speech_seconds)
+
+    def stats(self):
+        """
+        Return the speech and silence seconds seen so far and the share of audio skipped.
+        """
+        total = self.speech_seconds + self.silence_seconds
+        return {
+            "speech_seconds": self.speech_seconds,
+            "silence_seconds": self.silence_seconds,
+            "skipped_ratio": self.silence_seconds / total if total else 0.0,
+        }
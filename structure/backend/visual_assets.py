@@ -0,0 +1,141 @@
+import math
+import multiprocessing
+import os
+import queue
+from collections import OrderedDict
+
+# Image shown for each emotional state
+DEFAULT_VISUALS = {
+    "calm": "calm_landscape.jpg",
+    "uplifting": "sunrise.jpg",
+    "neutral": "neutral_background.jpg"
+}
+
+
+class VisualAssetManager:
+    def __init__(self, visuals=None, asset_folder=".", display_size=(1920, 1080), max_entries=8):
+        """
+        Decodes mood images once, pre-scales them to the display and keeps them in a bounded LRU cache.
+
+        Args:
+            visuals (dict): Maps emotional states to image file names (defaults to DEFAULT_VISUALS).
+            asset_folder (str): Folder containing the images.
+            display_size (tuple): (width, height) of the display; larger images are downscaled to fit.
+            max_entries (int): Maximum number of decoded images kept in memory.
+        """
+        self.visuals = visuals or DEFAULT_VISUALS
+        self.asset_folder = asset_folder
+        self.display_size = display_size
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+
+    def preload(self):
+        """
+        Decode every configured image up front so the first mood update doesn't pay for it.
+        """
+        for emotional_state in self.visuals:
+            try:
+                self.get(emotional_state)
+            except Exception as e:
+                print(f"Error preloading visual for '{emotional_state}': {e}")
+
+    def get(self, emotional_state):
+        """
+        Return the decoded, display-sized image for an emotional state (neutral if unknown).
+        """
+        image_path = os.path.join(
+            self.asset_folder, self.visuals.get(emotional_state, self.visuals.get("neutral", "neutral_background.jpg"))
+        )
+        if image_path in self._cache:
+            self._cache.move_to_end(image_path)
+            return self._cache[image_path]
+
+        import matplotlib.pyplot as plt
+
+        image = self._fit_to_display(plt.imread(image_path))
+        self._cache[image_path] = image
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return image
+
+    def _fit_to_display(self, image):
+        # Integer-stride downsampling: cheap, and plenty for a full-screen background
+        width, height = self.display_size
+        factor = math.ceil(max(image.shape[0] / height, image.shape[1] / width))
+        if factor > 1:
+            image = image[::factor, ::factor]
+        return image
+
+
+def _render_loop(commands, visuals, asset_folder, display_size):
+    # matplotlib is only needed in the renderer process
+    import matplotlib.pyplot as plt
+
+    assets = VisualAssetManager(visuals, asset_folder, display_size)
+    assets.preload()
+
+    plt.ion()
+    figure = plt.figure("MoodSync")
+    axes = figure.add_axes([0, 0, 1, 1])
+    axes.axis('off')
+    shown = None
+
+    while True:
+        # Only the most recent request matters; skip any that piled up while drawing
+        emotional_state = None
+        try:
+            emotional_state = commands.get(timeout=0.1)
+            while emotional_state != VisualRenderer.STOP:
+                emotional_state = commands.get_nowait()
+        except queue.Empty:
+            pass
+
+        if emotional_state == VisualRenderer.STOP:
+            break
+        if emotional_state is not None:
+            try:
+                image = assets.get(emotional_state)
+                if shown is None:
+                    shown = axes.imshow(image)
+                else:
+                    shown.set_data(image)
+                figure.canvas.draw_idle()
+            except Exception as e:
+                print(f"Error displaying visual: {e}")
+        plt.pause(0.05)  # Keep the window responsive
+
+    plt.close(figure)
+
+
+class VisualRenderer:
+    STOP = "__stop__"
+
+    def __init__(self, visuals=None, asset_folder=".", display_size=(1920, 1080)):
+        """
+        Displays mood visuals in a separate process, so showing an image never blocks the caller.
+
+        Args:
+            visuals (dict): Maps emotional states to image file names (defaults to DEFAULT_VISUALS).
+            asset_folder (str): Folder containing the images.
+            display_size (tuple): (width, height) of the display.
+        """
+        self._commands = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_render_loop, args=(self._commands, visuals, asset_folder, display_size), daemon=True
+        )
+
+    def start(self):
+        if not self._process.is_alive():
+            self._process.start()
+        return self
+
+    def show(self, emotional_state):
+        """
+        Ask the renderer to display the visual for an emotional state. Returns immediately.
+        """
+        self._commands.put(emotional_state)
+
+    def close(self, timeout=5):
+        if self._process.is_alive():
+            self._commands.put(self.STOP)
+            self._process.join(timeout)
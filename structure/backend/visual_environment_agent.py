@@ -1,38 +1,171 @@
-from phue import Bridge
-import matplotlib.pyplot as plt
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.hue_bridge import HueCommandQueue
+from backend.visual_assets import VisualRenderer
+from integrations.tracing import get_tracer
 
 class VisualLightAgent:
-    def __init__(self, bridge_ip):
-        self.bridge = Bridge(bridge_ip)
-        self.bridge.connect()
+    def __init__(self, bridge_ip, group_id=0, transitiontime=20, min_hold_seconds=15, confirm_updates=1,
+                 max_commands_per_second=10, bridge=None, renderer=None, tracer=None, command_queue=None):
+        """
+        Initialize the VisualLightAgent for a Hue bridge.
+
+        Args:
+            bridge_ip (str): IP address of the Hue bridge (None, without a bridge or command queue,
+                runs without lighting).
+            group_id (int): Hue group updated as a whole (0 is every light on the bridge).
+            transitiontime (int): Fade duration of color changes, in deciseconds.
+            min_hold_seconds (float): Minimum time a color is kept before it can change again; a change
+                requested sooner is applied when the hold expires.
+            confirm_updates (int): Consecutive calls with the same new state required before switching
+                (1 for callers that already smooth the mood, like LiveSession).
+            max_commands_per_second (float): Rate limit for commands sent to the bridge.
+            bridge: Pre-built bridge (e.g., FakeBridge for tests); connects to bridge_ip on first use if omitted.
+            renderer (VisualRenderer): Non-blocking display for visuals (started on first use if omitted).
+            tracer (Tracer): Records a span for every lighting adjustment (defaults to the process-wide tracer).
+            command_queue (HueCommandQueue): Queue shared with other agents on the same bridge (e.g., one
+                per room); built from `bridge` on first use if omitted.
+        """
+        self.bridge_ip = bridge_ip
+        self._bridge = bridge
+        self.group_id = group_id
+        self.transitiontime = transitiontime
+        self.min_hold_seconds = min_hold_seconds
+        self.confirm_updates = confirm_updates
+        self.max_commands_per_second = max_commands_per_second
+        self.renderer = renderer
+        self.tracer = tracer or get_tracer()
+        self._command_queue = command_queue
+        self._connect_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+
+        self._last_color = None
+        self._last_change_at = None
+        self._candidate_color = None
+        self._candidate_count = 0
+        self._pending = None
+        self._pending_timer = None
+        self._state_lock = threading.Lock()
+
+    @property
+    def bridge(self):
+        with self._connect_lock:
+            if self._bridge is None:
+                from phue import Bridge
+
+                bridge = Bridge(self.bridge_ip)
+                bridge.connect()
+                self._bridge = bridge
+            return self._bridge
+
+    @property
+    def command_queue(self):
+        with self._queue_lock:
+            if self._command_queue is None:
+                self._command_queue = HueCommandQueue(self.bridge, max_commands_per_second=self.max_commands_per_second)
+            return self._command_queue
+
+    @property
+    def has_lights(self):
+        return self.bridge_ip is not None or self._bridge is not None or self._command_queue is not None
+
+    def warm_up(self):
+        """
+        Connect to the bridge and start the command queue ahead of the first mood change.
+        """
+        if self.has_lights:
+            self.command_queue
 
     def adjust_lighting(self, emotional_state):
         """
         Adjust lighting based on emotional state.
+
+        The whole group is updated with a single command. No-op changes are skipped, and a new color
+        is only applied once it has been requested `confirm_updates` times in a row. A change requested
+        before the current color has been held for `min_hold_seconds` is kept and applied when the
+        hold expires, unless a newer request replaces it first. A span is recorded for each command
+        sent, not for skipped calls. Without lights (see has_lights) nothing is done.
+
+        Returns:
+            bool: True if a command was queued for the bridge right away.
         """
+        if not self.has_lights:
+            return False
         state_to_color = {
             "calm": [0.4, 0.5],  # Calming blue
             "uplifting": [0.5, 0.4],  # Uplifting yellow
             "neutral": [0.33, 0.33]  # Neutral white
         }
         color = state_to_color.get(emotional_state, [0.33, 0.33])
-        for light in self.bridge.lights:
-            light.xy = color
+
+        with self._state_lock:
+            if color == self._last_color:
+                self._candidate_color, self._candidate_count = None, 0
+                self._cancel_pending()
+                return False
+
+            if color == self._candidate_color:
+                self._candidate_count += 1
+            else:
+                self._candidate_color, self._candidate_count = color, 1
+
+            if self._last_color is not None:
+                if self._candidate_count < self.confirm_updates:
+                    return False
+                hold = self._last_change_at + self.min_hold_seconds - time.monotonic()
+                if hold > 0:
+                    self._schedule(color, emotional_state, hold)
+                    return False
+
+            self._cancel_pending()
+            self._send(color, emotional_state)
+            return True
+
+    def _send(self, color, emotional_state, deferred=False):
+        # Called with _state_lock held. Only changes that reach the bridge get a span, so skipped
+        # and deferred calls don't pull down the adjust_lighting percentiles.
+        with self.tracer.span("adjust_lighting", mood=emotional_state, deferred=deferred) as span:
+            params = {"on": True, "xy": color}
+            self.command_queue.submit(("group", self.group_id), params, transitiontime=self.transitiontime)
+            span.add("bytes", len(json.dumps(params)))
+        self._last_color = color
+        self._last_change_at = time.monotonic()
+        self._candidate_color, self._candidate_count = None, 0
+
+    def _schedule(self, color, emotional_state, delay):
+        self._cancel_pending()
+        self._pending = (color, emotional_state)
+        self._pending_timer = threading.Timer(delay, self._apply_pending)
+        self._pending_timer.daemon = True
+        self._pending_timer.start()
+
+    def _cancel_pending(self):
+        if self._pending_timer is not None:
+            self._pending_timer.cancel()
+        self._pending, self._pending_timer = None, None
+
+    def _apply_pending(self):
+        with self._state_lock:
+            if self._pending is None or self._pending_timer is not threading.current_thread():
+                return
+            (color, emotional_state), self._pending, self._pending_timer = self._pending, None, None
+            self._send(color, emotional_state, deferred=True)
 
     def generate_visual(self, emotional_state):
         """
         Display visual content based on emotional state.
+
+        The image is shown by a renderer process that keeps decoded images cached,
+        so this call returns immediately.
         """
-        visuals = {
-            "calm": "calm_landscape.jpg",
-            "uplifting": "sunrise.jpg",
-            "neutral": "neutral_background.jpg"
-        }
-        image_path = visuals.get(emotional_state, "neutral_background.jpg")
         try:
-            img = plt.imread(image_path)
-            plt.imshow(img)
-            plt.axis('off')
-            plt.show()
+            if self.renderer is None:
+                self.renderer = VisualRenderer().start()
+            self.renderer.show(emotional_state)
         except Exception as e:
             print(f"Error displaying visual: {e}")
@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+from backend.event_stream import EventStream
+
+
+class SessionJob:
+    def __init__(self, audio_agent, duration=60, window_seconds=10, translate=None, summarize=None,
+                 recordings_folder="./recordings/dashboard", event_stream=None,
+                 summarizer=None, data_manager=None):
+        """
+        Records and processes one session on a background thread while the dashboard polls its progress.
+
+        Each captured window is transcribed as soon as it is complete, so the transcript grows while
+        recording continues, and its emotion result is published to the job's event stream.
+        Translation runs once the recording ends; the summary is either built incrementally during
+        the recording (with a summarizer) or requested at the end. With a data manager the job is
+        stored as a session, with its timeline, like a LiveSession.
+
+        Args:
+            audio_agent (AudioAgent): Agent used for capture and transcription.
+            duration (float): Recording length in seconds.
+            window_seconds (float): Length of each transcribed window (windows don't overlap).
+            translate (callable): Maps a transcript to its translation (defaults to audio_agent.translate_text).
+            summarize (callable): Maps a transcript to its summary dict (defaults to audio_agent.summarize_transcript).
+            recordings_folder (str): Folder for the temporary window files.
+            event_stream (EventStream): Stream the per-window emotion entries are published to.
+            summarizer (IncrementalSummarizer): Summarizes each window's text as it arrives; takes
+                precedence over `summarize`.
+            data_manager (DataManager): Session store (defaults to the audio agent's).
+        """
+        self.id = uuid.uuid4().hex[:8]
+        self.audio_agent = audio_agent
+        self.duration = duration
+        self.window_seconds = window_seconds
+        self.translate = translate or audio_agent.translate_text
+        self.summarize = summarize or audio_agent.summarize_transcript
+        self.recordings_folder = recordings_folder
+        self.events = event_stream or EventStream()
+        self.summarizer = summarizer
+        self.data_manager = data_manager if data_manager is not None else audio_agent.data_manager
+
+        self.status = "pending"
+        self.transcript_parts = []
+        self.recorded_seconds = 0.0
+        self.translation = None
+        self.summary = None
+        self.error = None
+        self.session_id = None
+        self.emotions = Counter()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"session-job-{self.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        Stop recording after the current window; text transcribed so far is kept.
+        """
+        self._cancel.set()
+
+    @property
+    def running(self):
+        return self.status not in ("done", "failed", "cancelled")
+
+    def snapshot(self):
+        """
+        Return a consistent copy of the job's progress for rendering.
+        """
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "transcript": " ".join(self.transcript_parts),
+                "recorded_seconds": self.recorded_seconds,
+                "duration": self.duration,
+                "translation": self.translation,
+                "summary": self.summary,
+                "error": self.error,
+                "session_id": self.session_id,
+                "elapsed": (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0,
+            }
+
+    def _run(self, windows=None):
+        self.started_at = time.time()
+        status, error = "failed", None
+        try:
+            if self.data_manager is not None:
+                patient = self.audio_agent.patient_data.get("name", "anonymous")
+                self._set(session_id=self.data_manager.start_session(patient, started_at=self.started_at))
+            self._set(status="recording")
+            if windows is None:
+                windows = self.audio_agent.stream_audio(
+                    duration=self.duration, window_seconds=self.window_seconds, overlap_seconds=0
+                )
+            for window in windows:
+                text = self.audio_agent.transcribe_window(
+                    window, output_folder=self.recordings_folder, file_name=f"window_{self.id}.wav"
+                )
+                with self._lock:
+                    if text:
+                        self.transcript_parts.append(text)
+                    self.recorded_seconds = window["end"]
+                if text and self.summarizer is not None:
+                    self.summarizer.add_text(text)
+                if text:
+                    sentiment = self.audio_agent.analyze_sentiment(text)[0]
+                    entry = {
+                        "timestamp": window["start"],
+                        "end": window["end"],
+                        "label": sentiment["label"],
+                        "emotion": sentiment["emotion"],
+                        "intensity": sentiment["intensity"],
+                        "text": text,
+                    }
+                    self.emotions[sentiment["emotion"]] += 1
+                    if self.session_id is not None:
+                        self.data_manager.add_timeline_entries(self.session_id, [entry])
+                    self.events.publish(entry)
+                if self._cancel.is_set():
+                    break
+
+            transcript = " ".join(self.transcript_parts)
+            if not transcript:
+                error = "No speech was transcribed."
+                return
+
+            self._set(status="summarizing")
+            self._set(translation=self.translate(transcript))
+            if self.summarizer is not None:
+                self._set(summary=self.summarizer.finish())
+            else:
+                self._set(summary=self.summarize(transcript))
+            status = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            print(f"Session job {self.id} failed: {e}")
+            error = str(e)
+        finally:
+            self.finished_at = time.time()
+            # The stored session is complete by the time the dashboard sees the job finish
+            self._end_session()
+            self._set(status=status, error=error)
+
+    def _end_session(self):
+        # Closed even if the job failed, with whatever it produced
+        if self.session_id is None:
+            return
+        transcript = " ".join(self.transcript_parts)
+        try:
+            self.data_manager.end_session(
+                self.session_id,
+                transcript=transcript or None,
+                emotion=self.emotions.most_common(1)[0][0] if self.emotions else None,
+                bullet_points=self.summary.get("key_insights") if self.summary else None,
+                ended_at=self.finished_at
+            )
+        except Exception as e:
+            print(f"Error storing session job {self.id}: {e}")
+
+    def _set(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
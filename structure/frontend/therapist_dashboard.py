@@ -1,18 +1,28 @@
 import streamlit as st
 from datetime import datetime
+import hashlib
 import os
 import sys
 from dotenv import load_dotenv
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from backend.audio_agent import AudioAgent
+from backend.emotion_classifier import EmotionClassifier
+from backend.event_stream import DownsampledSeries
+from backend.transcription import OpenAIWhisperEngine
+from frontend.dashboard_jobs import SessionJob
+from integrations.openai_config import OpenAIConfig
+from integrations.tracing import MetricsServer, get_tracer
+from modules.data_manager import DataManager
 
 # Load environment variables
 load_dotenv()
 
 # Constants
-openai_api_key = os.getenv("OPENAI_API_KEY")
 output_folder = "./saved_outputs"
+style_path = os.path.join(os.path.dirname(__file__), "styles", "style.css")
+poll_seconds = 1.0
 
 # Configure Streamlit app
 st.set_page_config(
@@ -22,9 +32,115 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load custom CSS
-with open("styles/style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+# Expensive objects are built once per server process and shared by every rerun and session
+@st.cache_resource
+def get_openai_config():
+    return OpenAIConfig(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+@st.cache_resource
+def get_data_manager():
+    return DataManager()
+
+
+@st.cache_resource
+def get_transcription_engine():
+    return OpenAIWhisperEngine(api_key=get_openai_config().api_key)
+
+
+@st.cache_resource
+def get_emotion_classifier():
+    return EmotionClassifier()
+
+
+def get_audio_agent(name, age, history):
+    """
+    Return this browser session's AudioAgent, rebuilt when the patient changes.
+
+    The agent's VAD counters, capture stats and prompt prefix belong to one session, so agents
+    aren't shared between browser sessions; the clients and models they use are.
+    """
+    key = (name, age, history)
+    if st.session_state.get("audio_agent_key") != key:
+        st.session_state["audio_agent"] = AudioAgent(
+            openai_api_key=get_openai_config().api_key,
+            patient_data={"name": name, "age": age, "history": history},
+            target_language="en",
+            transcription_engine=get_transcription_engine(),
+            openai_config=get_openai_config(),
+            emotion_classifier=get_emotion_classifier(),
+            data_manager=get_data_manager()
+        )
+        st.session_state["audio_agent_key"] = key
+    return st.session_state["audio_agent"]
+
+
+# Prometheus endpoint for the agents' spans, started once when METRICS_PORT is set
+@st.cache_resource
+def get_metrics_server(port):
+    return MetricsServer(get_tracer(), port=port).start()
+
+
+@st.cache_data
+def load_css(path):
+    with open(path) as f:
+        return f.read()
+
+
+# Translations are keyed by the transcript's hash (the agent and text are excluded from hashing).
+# Failures raise, so they aren't cached and the next attempt calls the API again.
+@st.cache_data(show_spinner=False)
+def cached_translation(transcript_hash, _audio_agent, _transcript):
+    translation = _audio_agent.translate_text(_transcript)
+    if translation is None:
+        raise RuntimeError("Translation failed.")
+    return translation
+
+
+def translate(audio_agent, transcript):
+    try:
+        return cached_translation(transcript_hash(transcript), audio_agent, transcript)
+    except RuntimeError as e:
+        print(f"Error translating transcript: {e}")
+        return None
+
+
+@st.cache_data(ttl=10, show_spinner=False)
+def recent_sessions(patient_name, limit=5):
+    return get_data_manager().recent_sessions(patient_name, limit)
+
+
+def transcript_hash(transcript):
+    return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+
+def metrics_rows(snapshot):
+    def milliseconds(seconds):
+        return round(seconds * 1000, 1) if seconds is not None else None
+
+    return [
+        {
+            "Stage": name,
+            "Calls": stats["count"],
+            "Errors": stats["errors"],
+            "Mean (ms)": milliseconds(stats["mean_seconds"]),
+            "p50 (ms)": milliseconds(stats["p50_seconds"]),
+            "p95 (ms)": milliseconds(stats["p95_seconds"]),
+            "Bytes": stats["bytes"],
+            "Tokens": stats["tokens"],
+            "Tokens saved": stats["tokens_saved"],
+            "Cache hit rate": f"{stats['cache_hit_rate']:.0%}" if stats["cache_hit_rate"] is not None else "-",
+        }
+        for name, stats in sorted(snapshot.items())
+    ]
+
+
+if os.getenv("METRICS_PORT"):
+    get_metrics_server(int(os.getenv("METRICS_PORT")))
+
+
+st.markdown(f"<style>{load_css(style_path)}</style>", unsafe_allow_html=True)
 
 # App title and header
 st.title("🌊 Therapy Session Assistant")
@@ -34,47 +150,77 @@ st.sidebar.header("Patient Information")
 patient_name = st.sidebar.text_input("Patient Name", value="John Doe")
 patient_age = st.sidebar.number_input("Age", value=32, step=1)
 patient_history = st.sidebar.text_area("History", value="Anxiety and mild depression.")
+recording_minutes = st.sidebar.number_input("Recording length (minutes)", min_value=1, max_value=60, value=1)
 
-# Initialize AudioAgent
-audio_agent = AudioAgent(
-    openai_api_key=openai_api_key,
-    patient_data={
-        "name": patient_name,
-        "age": patient_age,
-        "history": patient_history,
-    },
-    target_language="en"
-)
+audio_agent = get_audio_agent(patient_name, patient_age, patient_history)
+
+st.sidebar.markdown("---")
+st.sidebar.subheader("Recent Sessions")
+for session in recent_sessions(patient_name):
+    started = datetime.fromtimestamp(session["started_at"]).strftime('%Y-%m-%d %H:%M')
+    st.sidebar.markdown(f"**{started}** — {session['emotion'] or 'n/a'}")
 
 # Step 1: Record Audio
 st.header("🎙️ Step 1: Record Audio")
-audio_file = None
-if st.button("Start Recording"):
-    with st.spinner("Recording for 60 seconds..."):
-        audio_file = audio_agent.capture_audio(duration=60)
-    st.success("Recording complete! Audio saved as `recorded_audio.wav`.")
-
-# Step 2: Transcription and Translation
-if audio_file:
-    st.header("📝 Step 2: Transcription and Translation")
-    transcription_result = audio_agent.transcribe_audio(audio_file)
-
-    if transcription_result:
-        st.subheader("Transcription")
-        st.text_area("Transcript", transcription_result, height=200)
+job = st.session_state.get("job")
+recording = job is not None and job.running
+start_column, stop_column = st.columns(2)
+if start_column.button("Start Recording", disabled=recording):
+    job = SessionJob(
+        audio_agent,
+        duration=recording_minutes * 60,
+        translate=lambda text: translate(audio_agent, text),
+        summarizer=audio_agent.incremental_summarizer(),
+    )
+    # Subscribe before the job starts so no window is missed; the trend keeps a fixed number of points
+    st.session_state["trend_subscription"] = job.events.subscribe()
+    st.session_state["trend"] = DownsampledSeries()
+    st.session_state["job"] = job.start()
+if stop_column.button("Stop Recording", disabled=not recording):
+    job.cancel()
+
+
+# Only this panel reruns while the job is active; the rest of the page stays idle
+@st.fragment(run_every=poll_seconds if job is not None and job.running else None)
+def job_panel():
+    if job is None:
+        return
+    progress = job.snapshot()
+
+    if progress["status"] == "recording":
+        st.progress(min(progress["recorded_seconds"] / progress["duration"], 1.0),
+                    text=f"Recording... {progress['recorded_seconds']:.0f}s of {progress['duration']}s")
+    elif progress["status"] == "summarizing":
+        st.info("Recording complete. Translating and summarizing...")
+    elif progress["status"] == "failed":
+        st.error(f"Processing failed: {progress['error']}")
 
-        translated_text = audio_agent.translate_text(transcription_result)
-        st.subheader("Translated Text")
-        st.text_area("Translated", translated_text, height=200)
-    else:
-        st.error("Transcription failed. Please try again.")
+    # Live emotional trend: only the windows published since the last refresh are appended
+    trend = st.session_state["trend"]
+    events = st.session_state["trend_subscription"].drain()
+    for event in events:
+        trend.append(event["timestamp"] / 60, {event["emotion"]: event["intensity"]})
+    if events:
+        st.session_state["latest_emotion"] = events[-1]
+    if len(trend):
+        st.header("📈 Emotional Trend")
+        latest = st.session_state["latest_emotion"]
+        st.metric("Current emotion", latest["emotion"], f"intensity {latest['intensity']:.2f}", delta_color="off")
+        st.line_chart(trend.columns(), x="time", x_label="Minutes", y_label="Intensity")
 
-# Step 3: Generate Session Summary
-if audio_file and transcription_result:
-    st.header("📋 Step 3: Generate Session Summary")
-    summary = audio_agent.summarize_transcript(transcription_result)
+    # Step 2: Transcription and Translation
+    if progress["transcript"]:
+        st.header("📝 Step 2: Transcription and Translation")
+        st.subheader("Transcription")
+        st.text_area("Transcript", progress["transcript"], height=200, key=f"transcript_{progress['id']}")
+        if progress["translation"]:
+            st.subheader("Translated Text")
+            st.text_area("Translated", progress["translation"], height=200, key=f"translated_{progress['id']}")
 
+    # Step 3: Generate Session Summary
+    summary = progress["summary"]
     if summary:
+        st.header("📋 Step 3: Generate Session Summary")
         st.subheader("Session Summary")
         st.markdown(f"**Date**: {datetime.today().strftime('%Y-%m-%d')}")
         st.markdown("**Overview**")
@@ -86,13 +232,30 @@ if audio_file and transcription_result:
         st.markdown("**Therapeutic Goals**")
         st.write(summary.get("therapeutic_goals", "N/A"))
 
-        if st.button("Save Summary"):
+        if st.button("Save Summary", key=f"save_{progress['id']}"):
             file_name = f"{patient_name.replace(' ', '_')}_session_summary.json"
-            audio_agent.save_summary_to_json(summary, file_name="session_summary.json")
+            audio_agent.save_summary_to_json(summary, output_folder=output_folder, file_name=file_name,
+                                             session_id=progress["session_id"])
             st.success(f"Summary saved to `{os.path.join(output_folder, file_name)}`.")
-    else:
+    elif progress["status"] == "done":
         st.error("Summary generation failed.")
 
+    # Timings, payload sizes, tokens and cache hits recorded by the agents' spans
+    snapshot = get_tracer().snapshot()
+    if snapshot:
+        with st.expander("⏱️ Pipeline Metrics"):
+            st.dataframe(metrics_rows(snapshot), hide_index=True, use_container_width=True)
+
+    # Stop polling once the job has finished
+    if not job.running and st.session_state.get("rendered_job") != progress["id"]:
+        st.session_state["rendered_job"] = progress["id"]
+        # The finished session appears in the sidebar right away
+        recent_sessions.clear()
+        st.rerun()
+
+
+job_panel()
+
 # Footer
 st.sidebar.markdown("---")
 st.sidebar.markdown("Developed with ❤️ by your Therapy Assistant.")
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, responder=None):
+        """
+        Local stand-in for the OpenAI HTTP API (chat and text completions and audio transcriptions),
+        for tests and benchmarks.
+
+        Point an OpenAIConfig at it with `OpenAIConfig(api_key="test", api_base=server.url)`. Failures
+        can be scripted with fail_next() to exercise retries, rate limiting and the circuit breaker.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 picks a free one).
+            latency (float or dict): Seconds added to every successful response, or seconds per
+                endpoint ('chat', 'completion', 'transcription').
+            responder (callable): Maps (endpoint, request body) to the reply text or, for function
+                calls, a dict of arguments (defaults to a canned reply). Transcription bodies hold the
+                form fields plus 'file_name' and 'file_bytes' of the upload.
+        """
+        self.latency = latency
+        self.responder = responder or self._default_responder
+        self.requests = []
+        self._failures = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, status=429, count=1, retry_after=None):
+        """
+        Answer the next `count` requests with an error status (e.g., 429 or 503).
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _next_failure(self):
+        with self._lock:
+            return self._failures.popleft() if self._failures else None
+
+    def latency_for(self, endpoint):
+        if isinstance(self.latency, dict):
+            return self.latency.get(endpoint, 0.0)
+        return self.latency
+
+    @staticmethod
+    def _default_responder(endpoint, body):
+        if endpoint == "transcription":
+            return "This is a mock transcription."
+        if body.get("function_call"):
+            return {}
+        return "This is a mock response."
+
+    @staticmethod
+    def _parse_upload(content_type, data):
+        # multipart/form-data as sent by openai.Audio.transcribe
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + data
+        )
+        body = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                body["file_name"] = os.path.basename(part.get_filename())
+                body["file_bytes"] = len(payload)
+            else:
+                body[name] = payload.decode("utf-8")
+        return body
+
+    def _reply(self, endpoint, body):
+        result = self.responder(endpoint, body)
+        if endpoint == "transcription":
+            if body.get("response_format") == "verbose_json":
+                return {"text": result, "segments": [{"start": 0.0, "end": None, "text": result}]}
+            return {"text": result}
+        prompt_tokens = len(json.dumps(body.get("messages") or body.get("prompt") or "")) // 4
+        if endpoint == "chat":
+            message = {"role": "assistant", "content": None}
+            if isinstance(result, dict):
+                message["function_call"] = {"name": body["function_call"]["name"], "arguments": json.dumps(result)}
+            else:
+                message["content"] = result
+            choice = {"index": 0, "message": message, "finish_reason": "stop"}
+            completion_text = json.dumps(message)
+        else:
+            choice = {"index": 0, "text": result, "finish_reason": "stop"}
+            completion_text = result
+        completion_tokens = len(completion_text) // 4
+        return {
+            "id": f"mock-{len(self.requests)}",
+            "object": "chat.completion" if endpoint == "chat" else "text_completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [choice],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                endpoints = {"/v1/chat/completions": "chat", "/v1/completions": "completion",
+                             "/v1/audio/transcriptions": "transcription"}
+                endpoint = endpoints.get(self.path)
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("multipart/form-data"):
+                    body = server._parse_upload(content_type, data)
+                else:
+                    body = json.loads(data or b"{}")
+                with server._lock:
+                    server.requests.append({"endpoint": endpoint, "body": body})
+
+                if endpoint is None:
+                    error = {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}
+                    return self._send(404, {"error": error})
+                failure = server._next_failure()
+                if failure is not None:
+                    status, retry_after = failure
+                    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+                    return self._send(status, {"error": {"message": f"Mock error {status}", "type": "server_error"}},
+                                      headers)
+                latency = server.latency_for(endpoint)
+                if latency:
+                    time.sleep(latency)
+                self._send(200, server._reply(endpoint, body))
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import sys
+
+    server = MockOpenAIServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8089).start()
+    print(f"Mock OpenAI API listening on {server.url} (set OPENAI_API_BASE to use it). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
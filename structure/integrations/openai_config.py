@@ -1,44 +1,228 @@
+import json
 import os
-import openai
-from dotenv import load_dotenv 
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from integrations.resilience import CircuitBreaker, RetryPolicy, TokenBucketLimiter, error_status, is_retryable
+from integrations.response_cache import ResponseCache
+from integrations.tracing import record
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def estimate_tokens(params):
+    """
+    Rough token count of a request (about four characters per token) plus its completion budget.
+    """
+    prompt = params.get("messages") or params.get("prompt") or ""
+    characters = len(json.dumps(prompt)) + len(json.dumps(params.get("functions", "")))
+    return characters // 4 + params.get("max_tokens", 256)
+
+
+def local_chat_response(content=None, function_call=None):
+    """
+    Build a response shaped like a chat completion, for fallbacks computed locally.
+    """
+    message = {"role": "assistant", "content": content}
+    if function_call is not None:
+        message["function_call"] = function_call
+    return {"choices": [{"index": 0, "message": message, "finish_reason": "stop"}], "fallback": True}
+
+
 class OpenAIConfig:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, retry_policy=None, limiter=None, max_concurrency=8,
+                 circuit_breaker=None, api_base=None, request_timeout=60):
         """
         Initialize the OpenAI client with the provided API key or an environment variable.
+
+        One instance is meant to be shared by every agent, so retries, rate limits, concurrency and
+        the circuit breaker apply to all of the process's OpenAI traffic.
+
+        Args:
+            api_key (str): OpenAI API key (defaults to the OPENAI_API_KEY environment variable).
+            cache (ResponseCache): Response cache shared by every call made through this config
+                (defaults to an LRU backed by the SQLite file in OPENAI_CACHE_PATH).
+            retry_policy (RetryPolicy): Backoff for rate limits and transient errors.
+            limiter (TokenBucketLimiter): Requests- and tokens-per-minute limiter (defaults to the
+                OPENAI_RPM and OPENAI_TPM environment variables, or 500 and 40,000).
+            max_concurrency (int): Requests in flight at the same time.
+            circuit_breaker (CircuitBreaker): Fails fast to the fallback while the API keeps failing.
+            api_base (str): API base URL, e.g. a local stand-in server (defaults to OPENAI_API_BASE).
+            request_timeout (float): Seconds before a single request times out.
         """
         # Use the provided API key or load from environment variables
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        
+
         # Ensure the API key is available
         if not self.api_key:
             raise ValueError("API key for OpenAI must be provided or set as an environment variable.")
-        
-        # Set the API key for OpenAI
-        openai.api_key = self.api_key
 
-    def create_chat_completion(self, model, messages, **kwargs):
+        self.cache = cache if cache is not None else ResponseCache(
+            db_path=os.environ.get("OPENAI_CACHE_PATH", "./cache/openai_responses.db")
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limiter = limiter or TokenBucketLimiter(
+            requests_per_minute=float(os.environ.get("OPENAI_RPM", 500)),
+            tokens_per_minute=float(os.environ.get("OPENAI_TPM", 40000))
+        )
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # Passed with every request but kept out of the cache key
+        self._request_options = {"request_timeout": request_timeout}
+        api_base = api_base or os.environ.get("OPENAI_API_BASE")
+        if api_base:
+            self._request_options["api_base"] = api_base
+
+        self._client = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "requests": 0, "successes": 0, "failures": 0, "retries": 0, "rate_limited": 0,
+            "fallbacks": 0, "stale_hits": 0, "short_circuited": 0, "in_flight": 0,
+            "latency_seconds": 0.0, "tokens": 0,
+        }
+
+    @property
+    def client(self):
+        """
+        The openai module, imported and given the API key on first use.
+        """
+        if self._client is None:
+            import openai
+
+            # Set the API key for OpenAI
+            openai.api_key = self.api_key
+            self._client = openai
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    def create_chat_completion(self, model, messages, use_cache=True, fallback=None, **kwargs):
         """
         Create a chat completion using the specified model and messages.
-        
+
         Args:
             model (str): The model to use (e.g., 'gpt-4', 'gpt-3.5-turbo').
             messages (list): A list of message dictionaries (role and content).
+            use_cache (bool): Serve identical requests from the response cache.
+            fallback (callable): Called without arguments for a local result when the API can't be
+                reached and nothing is cached (e.g., returning local_chat_response(...)).
             **kwargs: Additional parameters for the completion (e.g., temperature, max_tokens).
-            
+
         Returns:
-            dict: The response from the OpenAI API.
+            dict: The response from the OpenAI API, a cached or fallback response, or None.
         """
+        return self._cached_request(
+            "ChatCompletion", "chat", use_cache, fallback, model=model, messages=messages, **kwargs
+        )
+
+    def create_completion(self, model, prompt, use_cache=True, fallback=None, **kwargs):
+        """
+        Create a text completion using the specified model and prompt.
+
+        Args:
+            model (str): The model to use (e.g., 'text-davinci-003').
+            prompt (str): The prompt to complete.
+            use_cache (bool): Serve identical requests from the response cache.
+            fallback (callable): Called without arguments for a local result when the API can't be reached.
+            **kwargs: Additional parameters for the completion (e.g., max_tokens).
+
+        Returns:
+            dict: The response from the OpenAI API, a cached or fallback response, or None.
+        """
+        return self._cached_request(
+            "Completion", "completion", use_cache, fallback, model=model, prompt=prompt, **kwargs
+        )
+
+    def metrics(self):
+        """
+        Return request, retry, rate-limit and fallback counters, the circuit state and cache stats.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["mean_latency_seconds"] = (metrics["latency_seconds"] / metrics["successes"]
+                                           if metrics["successes"] else 0.0)
+        metrics["throttled_seconds"] = self.limiter.waited_seconds
+        metrics["circuit_state"] = self.circuit_breaker.state
+        metrics["circuit_opens"] = self.circuit_breaker.opens
+        metrics["cache"] = self.cache.stats()
+        return metrics
+
+    def _cached_request(self, resource, endpoint, use_cache, fallback, **params):
+        key = ResponseCache.make_key(endpoint=endpoint, **params)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self.circuit_breaker.allow():
+            self._count("short_circuited")
+            return self._fallback(endpoint, key, fallback, "the circuit breaker is open")
+
+        tokens = estimate_tokens(params)
+
+        def attempt():
+            self.limiter.acquire(tokens)
+            with self._semaphore:
+                self._count("requests")
+                self._count("in_flight")
+                started = time.perf_counter()
+                try:
+                    # Resolved here so cache hits never import openai
+                    return getattr(self.client, resource).create(**params, **self._request_options)
+                finally:
+                    self._count("in_flight", -1)
+                    self._count("latency_seconds", time.perf_counter() - started)
+
         try:
-            response = openai.ChatCompletion.create(  
-                model=model,
-                messages=messages,
-                **kwargs
-            )
-            return response
+            response = self.retry_policy.call(attempt, on_retry=self._on_retry)
         except Exception as e:
-            print(f"Error creating chat completion: {e}")
-            return None  # Return None if an error occurs
+            self._count("failures")
+            if is_retryable(e):
+                self.circuit_breaker.record_failure()
+            else:
+                # The API answered (e.g., a bad request), so it is up
+                self.circuit_breaker.record_success()
+            print(f"Error creating {endpoint} completion: {e}")
+            return self._fallback(endpoint, key, fallback, str(e))
+
+        self.circuit_breaker.record_success()
+        self._count("successes")
+        # Plain dicts look the same whether they come from the API or the cache
+        response = json.loads(json.dumps(response))
+        usage = response.get("usage", {}).get("total_tokens")
+        if usage:
+            self._count("tokens", usage)
+            record("tokens", usage)
+            self.limiter.adjust(usage - tokens)
+        self.cache.set(key, response)
+        return response
+
+    def _fallback(self, endpoint, key, fallback, reason):
+        # An expired cached answer beats no answer; a local fallback comes next. The request's
+        # lookup was already counted, so this one isn't counted again (stale_hits tracks it)
+        stale = self.cache.get(key, allow_expired=True, count=False)
+        if stale is not None:
+            self._count("stale_hits")
+            print(f"Serving a cached {endpoint} response ({reason}).")
+            return stale
+        if fallback is not None:
+            self._count("fallbacks")
+            print(f"Using a local fallback for the {endpoint} request ({reason}).")
+            return fallback()
+        return None
+
+    def _on_retry(self, attempt, error, delay):
+        self._count("retries")
+        if error_status(error) == 429 or type(error).__name__ == "RateLimitError":
+            self._count("rate_limited")
+        print(f"OpenAI request failed ({error}); retry {attempt + 1} in {delay:.1f}s.")
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
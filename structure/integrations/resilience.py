@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+
+# HTTP statuses worth retrying: rate limits and transient server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# openai 0.x exceptions raised without an HTTP status (network errors, timeouts)
+RETRYABLE_ERRORS = {"APIConnectionError", "Timeout", "TryAgain", "ServiceUnavailableError", "RateLimitError"}
+
+
+def error_status(error):
+    """
+    Return the HTTP status carried by an API error, or None.
+    """
+    return getattr(error, "http_status", None) or getattr(error, "status_code", None)
+
+
+def is_retryable(error):
+    """
+    Return True for rate limits, transient server errors and network failures.
+    """
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after(error):
+    """
+    Return the server's Retry-After delay in seconds, if the error carries one.
+    """
+    headers = getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=5, base_delay=0.5, max_delay=30.0, sleep=time.sleep):
+        """
+        Exponential backoff with full jitter, honouring the server's Retry-After when present.
+
+        Args:
+            max_retries (int): Retries after the first attempt.
+            base_delay (float): Upper bound of the first delay in seconds; it doubles every retry.
+            max_delay (float): Cap on any single delay.
+            sleep (callable): Sleep function (injectable so tests don't wait).
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def delay(self, attempt, error=None):
+        """
+        Seconds to wait before retry number `attempt` (starting at 0).
+        """
+        hinted = retry_after(error) if error is not None else None
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func, on_retry=None):
+        """
+        Call func(), retrying retryable errors; the last error is raised once retries run out.
+
+        Args:
+            func (callable): Function to call without arguments.
+            on_retry (callable): Called with (attempt, error, delay) before each retry.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                wait = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(attempt, e, wait)
+                self.sleep(wait)
+                attempt += 1
+
+
+class TokenBucketLimiter:
+    def __init__(self, requests_per_minute=500, tokens_per_minute=40000, clock=time.monotonic, sleep=time.sleep):
+        """
+        Client-side limiter for the API's requests-per-minute and tokens-per-minute quotas.
+
+        Both buckets start full and refill continuously; a request waits until both can cover it.
+
+        Args:
+            requests_per_minute (float): Request quota (None for no limit).
+            tokens_per_minute (float): Token quota, prompt plus completion (None for no limit).
+            clock (callable): Monotonic clock in seconds.
+            sleep (callable): Sleep function.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self.waited_seconds = 0.0
+        self._requests = requests_per_minute or 0.0
+        self._tokens = tokens_per_minute or 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        """
+        Block until one request and `tokens` tokens are available, then take them.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                tokens_needed = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+                wait = max(self._shortfall(self._requests, 1, self.requests_per_minute),
+                           self._shortfall(self._tokens, tokens_needed, self.tokens_per_minute))
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens_needed
+                    self.waited_seconds += waited
+                    return waited
+            self.sleep(wait)
+            waited += wait
+
+    def adjust(self, tokens):
+        """
+        Correct the token bucket once a response reports its actual usage (positive tokens take more).
+        """
+        if self.tokens_per_minute:
+            with self._lock:
+                self._tokens -= tokens
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    @staticmethod
+    def _shortfall(available, needed, per_minute):
+        if not per_minute or available >= needed:
+            return 0.0
+        return (needed - available) * 60 / per_minute
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_seconds=30.0, clock=time.monotonic):
+        """
+        Stops calling a failing API for a while so requests fail fast to a fallback.
+
+        After `failure_threshold` consecutive failures the circuit opens. Once `reset_seconds` have
+        passed, one trial request is let through (half-open): success closes the circuit and
+        failure opens it again.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_seconds (float): Time the circuit stays open before a trial request.
+            clock (callable): Monotonic clock in seconds.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Return True if a request may be sent now.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.clock() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self._opened_at = self.clock()
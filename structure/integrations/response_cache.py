@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from integrations.tracing import record
+
+
+class ResponseCache:
+    def __init__(self, max_memory_entries=256, db_path=None, max_disk_entries=10000, ttl=24 * 3600):
+        """
+        Two-tier cache for JSON-serializable API responses: an in-memory LRU backed by SQLite.
+
+        Args:
+            max_memory_entries (int): Entries kept in the in-memory LRU tier.
+            db_path (str): SQLite file for the on-disk tier, or None to keep the cache in memory only.
+            max_disk_entries (int): Entries kept on disk; the least recently used are evicted first.
+            ttl (float): Default time-to-live in seconds (None for entries that never expire).
+        """
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            folder = os.path.dirname(db_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(**params):
+        """
+        Build a content-addressed key from request parameters (e.g., model, messages, temperature).
+        """
+        payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, allow_expired=False, count=True):
+        """
+        Return the cached value for a key, or None on a miss or an expired entry.
+
+        Expired entries are kept until they are evicted or replaced, so they can still be served
+        with allow_expired=True (e.g., as a fallback while the API is unavailable). Pass count=False
+        for a second lookup of a request already counted, so it isn't counted again.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if allow_expired or expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                        self.memory_hits += 1
+                        record("cache_hits")
+                    return value
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if allow_expired or expires_at is None or expires_at > now:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, expires_at, value)
+                        if count:
+                            self.hits += 1
+                            self.disk_hits += 1
+                            record("cache_hits")
+                        return value
+
+            if count:
+                self.misses += 1
+                record("cache_misses")
+            return None
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a JSON-serializable value in both tiers.
+
+        Args:
+            key (str): Cache key, usually from make_key().
+            value: Value to store.
+            ttl (float): Time-to-live in seconds, overriding the default.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.max_disk_entries:
+                    overflow = count - self.max_disk_entries
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)", (overflow,)
+                    )
+                    self.disk_evictions += overflow
+                self._db.commit()
+
+    def clear(self):
+        """
+        Remove every entry from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current size of each tier.
+        """
+        with self._lock:
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
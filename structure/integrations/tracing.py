@@ -0,0 +1,306 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds of the duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Counters every span carries; nested spans add theirs to the parent when they finish
+COUNTERS = ("bytes", "tokens", "tokens_saved", "cache_hits", "cache_misses")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def record(name, amount=1):
+    """
+    Add to a counter of the span running in the current context; does nothing outside a span.
+
+    Lets shared code (e.g., ResponseCache or OpenAIConfig) report cache hits and tokens to whichever
+    agent call is running without being passed the span.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.add(name, amount)
+
+
+def get_tracer():
+    """
+    Return the process-wide tracer, creating it on first use.
+
+    Finished spans are also appended to the JSON-lines file in TRACE_JSONL_PATH when it is set.
+    """
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            path = os.environ.get("TRACE_JSONL_PATH")
+            _default_tracer = Tracer(exporters=[JsonLinesExporter(path)] if path else None)
+        return _default_tracer
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers (fraction from 0 to 1), or None if it is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class Span:
+    def __init__(self, name, parent=None, attributes=None):
+        """
+        One timed call of an instrumented stage.
+
+        Args:
+            name (str): Stage name (e.g., 'transcribe_audio').
+            parent (Span): Span that was running when this one started.
+            attributes (dict): Extra details exported with the span (e.g., the emotion).
+        """
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.status = "ok"
+        self.error = None
+        self.started_at = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def fail(self, error):
+        """
+        Mark the span as failed, for calls that handle their own errors instead of raising.
+        """
+        self.status = "error"
+        self.error = str(error)
+
+    def to_dict(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(
+            counters,
+            name=self.name,
+            parent=self.parent.name if self.parent is not None else None,
+            started_at=self.started_at,
+            duration_seconds=self.duration,
+            status=self.status,
+            error=self.error,
+            attributes=self.attributes,
+        )
+
+
+class Tracer:
+    def __init__(self, exporters=None, recent_samples=512):
+        """
+        Times instrumented stages and aggregates their metrics per stage name.
+
+        Args:
+            exporters (list): Objects with an export(span) method, called for every finished span
+                (e.g., JsonLinesExporter).
+            recent_samples (int): Durations kept per stage for the percentiles in snapshot().
+        """
+        self.exporters = list(exporters or [])
+        self.recent_samples = recent_samples
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a block of code as one span of the named stage.
+
+        Usage:
+            with tracer.span("transcribe_audio") as span:
+                span.add("bytes", os.path.getsize(audio_file))
+        """
+        parent = _current_span.get()
+        span = Span(name, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span._started
+            if parent is not None:
+                for counter, amount in span.counters.items():
+                    parent.add(counter, amount)
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = {
+                    "count": 0, "errors": 0, "duration_seconds": 0.0,
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "recent": deque(maxlen=self.recent_samples),
+                    **dict.fromkeys(COUNTERS, 0),
+                }
+            stats["count"] += 1
+            stats["errors"] += span.status != "ok"
+            stats["duration_seconds"] += span.duration
+            stats["recent"].append(span.duration)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stats["buckets"][i] += 1
+            for counter, amount in span.counters.items():
+                stats[counter] = stats.get(counter, 0) + amount
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"Error exporting span '{span.name}': {e}")
+
+    def snapshot(self):
+        """
+        Return the aggregated metrics of every stage seen so far.
+
+        Returns:
+            dict: Maps stage names to 'count', 'errors', 'mean_seconds', 'p50_seconds' and
+                  'p95_seconds' (over the recent spans), the counter totals and 'cache_hit_rate'.
+        """
+        with self._lock:
+            stats = {name: dict(values, recent=list(values["recent"])) for name, values in self._stats.items()}
+        snapshot = {}
+        for name, values in stats.items():
+            lookups = values["cache_hits"] + values["cache_misses"]
+            snapshot[name] = {
+                "count": values["count"],
+                "errors": values["errors"],
+                "mean_seconds": values["duration_seconds"] / values["count"],
+                "p50_seconds": percentile(values["recent"], 0.5),
+                "p95_seconds": percentile(values["recent"], 0.95),
+                **{counter: values[counter] for counter in COUNTERS},
+                "cache_hit_rate": values["cache_hits"] / lookups if lookups else None,
+            }
+        return snapshot
+
+    def render_prometheus(self, prefix="moodsync"):
+        """
+        Render the aggregated metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            stats = {name: dict(values, buckets=list(values["buckets"])) for name, values in self._stats.items()}
+
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of instrumented pipeline stages.",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        for name, values in sorted(stats.items()):
+            for bound, count in zip(DURATION_BUCKETS, values["buckets"]):
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {values["count"]}')
+            lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {values["duration_seconds"]}')
+            lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {values["count"]}')
+
+        descriptions = {
+            "errors": "Spans that ended in an error.",
+            "bytes": "Payload bytes handled by each stage.",
+            "tokens": "OpenAI tokens used by each stage.",
+            "tokens_saved": "Prompt tokens saved by transcript compression in each stage.",
+            "cache_hits": "Cache hits inside each stage.",
+            "cache_misses": "Cache misses inside each stage.",
+        }
+        for counter, description in descriptions.items():
+            metric = f"{prefix}_span_{counter}_total"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, values in sorted(stats.items()):
+                lines.append(f'{metric}{{span="{name}"}} {values[counter]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class JsonLinesExporter:
+    def __init__(self, path):
+        """
+        Appends every finished span to a JSON-lines file.
+
+        Args:
+            path (str): Output file; its folder is created if needed.
+        """
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class MetricsServer:
+    def __init__(self, tracer=None, host="127.0.0.1", port=9464):
+        """
+        Serves the tracer's metrics at /metrics in the Prometheus text format.
+
+        Args:
+            tracer (Tracer): Tracer whose metrics are served (defaults to get_tracer()).
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 picks a free one).
+        """
+        self.tracer = tracer or get_tracer()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                data = server.tracer.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
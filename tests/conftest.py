@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Same import roots the modules use: structure/ for backend and integrations, the repo root for modules
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [os.path.join(REPO_DIR, "structure"), REPO_DIR]
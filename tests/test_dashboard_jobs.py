@@ -0,0 +1,66 @@
+from frontend.dashboard_jobs import SessionJob
+from modules.data_manager import DataManager
+
+
+class FakeAudioAgent:
+    def __init__(self, data_manager, texts):
+        self.data_manager = data_manager
+        self.patient_data = {"name": "Jane"}
+        self.texts = texts
+
+    def transcribe_window(self, window, output_folder=None, file_name=None):
+        return self.texts[window["index"]]
+
+    def analyze_sentiment(self, text):
+        emotion = "anxiety" if "worried" in text else "joy"
+        return [{"label": "negative" if emotion == "anxiety" else "positive", "emotion": emotion,
+                 "intensity": 0.5}]
+
+    def translate_text(self, text):
+        return text
+
+
+def windows(count):
+    return [{"index": i, "start": i * 10.0, "end": (i + 1) * 10.0} for i in range(count)]
+
+
+def run(job, count):
+    job._run(windows(count))
+    return job
+
+
+def test_job_is_stored_as_a_session():
+    data_manager = DataManager(":memory:")
+    agent = FakeAudioAgent(data_manager, ["I was worried.", "Still worried.", "Better now."])
+    summary = {"overview": "Talked about worries.", "key_insights": ["Worries at work"]}
+    job = run(SessionJob(agent, summarize=lambda text: summary), 3)
+
+    assert job.status == "done"
+    sessions = data_manager.recent_sessions("Jane")
+    assert len(sessions) == 1
+    session = sessions[0]
+    assert session["id"] == job.snapshot()["session_id"]
+    assert session["transcript"] == "I was worried. Still worried. Better now."
+    assert session["emotion"] == "anxiety"
+    assert session["bullet_points"] == ["Worries at work"]
+    assert session["ended_at"] is not None
+
+
+def test_failed_job_still_closes_its_session():
+    data_manager = DataManager(":memory:")
+    agent = FakeAudioAgent(data_manager, ["", ""])
+    job = run(SessionJob(agent, summarize=lambda text: None), 2)
+
+    assert job.status == "failed"
+    assert job.error == "No speech was transcribed."
+    session = data_manager.recent_sessions("Jane")[0]
+    assert session["ended_at"] is not None
+    assert session["transcript"] is None
+
+
+def test_job_without_data_manager_stores_nothing():
+    agent = FakeAudioAgent(None, ["Hello."])
+    job = run(SessionJob(agent, summarize=lambda text: {}), 1)
+
+    assert job.status == "done"
+    assert job.session_id is None
@@ -0,0 +1,178 @@
+import time
+
+import pytest
+
+from integrations.mock_openai_server import MockOpenAIServer
+from integrations.openai_config import OpenAIConfig, local_chat_response
+from integrations.resilience import CircuitBreaker, RetryPolicy, TokenBucketLimiter
+from integrations.response_cache import ResponseCache
+
+MOCK_REPLY = "This is a mock response."
+
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when something sleeps, so backoff and throttling don't slow tests down.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def server():
+    server = MockOpenAIServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_config(server, clock, max_retries=3, **kwargs):
+    options = {
+        "cache": ResponseCache(),
+        "retry_policy": RetryPolicy(max_retries=max_retries, base_delay=0.5, sleep=clock.sleep),
+        "limiter": TokenBucketLimiter(requests_per_minute=None, tokens_per_minute=None, clock=clock, sleep=clock.sleep),
+        "circuit_breaker": CircuitBreaker(clock=clock),
+    }
+    options.update(kwargs)
+    return OpenAIConfig(api_key="test", api_base=server.url, request_timeout=5, **options)
+
+
+def chat(config, text="Hello", **kwargs):
+    return config.create_chat_completion(model="gpt-4", messages=[{"role": "user", "content": text}], **kwargs)
+
+
+def content(response):
+    return response["choices"][0]["message"]["content"]
+
+
+def test_success_reports_tokens_and_is_cached(server, clock):
+    config = make_config(server, clock)
+
+    assert content(chat(config)) == MOCK_REPLY
+    assert content(chat(config)) == MOCK_REPLY
+
+    metrics = config.metrics()
+    assert len(server.requests) == 1
+    assert metrics["successes"] == 1
+    assert metrics["tokens"] > 0
+    assert metrics["cache"]["hits"] == 1
+    assert metrics["cache"]["misses"] == 1
+
+
+def test_transient_errors_are_retried(server, clock):
+    config = make_config(server, clock)
+    server.fail_next(503, count=2)
+
+    assert content(chat(config)) == MOCK_REPLY
+
+    metrics = config.metrics()
+    assert len(server.requests) == 3
+    assert metrics["retries"] == 2
+    assert metrics["failures"] == 0
+    assert len(clock.sleeps) == 2
+
+
+def test_rate_limit_honours_retry_after(server, clock):
+    config = make_config(server, clock)
+    server.fail_next(429, retry_after=7)
+
+    assert content(chat(config)) == MOCK_REPLY
+
+    metrics = config.metrics()
+    assert metrics["rate_limited"] == 1
+    assert clock.sleeps == [7.0]
+
+
+def test_client_errors_are_not_retried(server, clock):
+    config = make_config(server, clock)
+    server.fail_next(400)
+
+    assert chat(config) is None
+
+    metrics = config.metrics()
+    assert len(server.requests) == 1
+    assert metrics["retries"] == 0
+    assert metrics["failures"] == 1
+    # The API answered, so it counts as up
+    assert metrics["circuit_state"] == "closed"
+
+
+def test_fallback_after_retries_run_out(server, clock):
+    config = make_config(server, clock, max_retries=2)
+    server.fail_next(503, count=3)
+
+    response = chat(config, fallback=lambda: local_chat_response("local"))
+
+    assert response["fallback"] is True
+    assert content(response) == "local"
+    metrics = config.metrics()
+    assert len(server.requests) == 3
+    assert metrics["fallbacks"] == 1
+    # The fallback isn't cached, so the next call tries the API again
+    assert content(chat(config)) == MOCK_REPLY
+    assert len(server.requests) == 4
+
+
+def test_client_side_limiter_throttles_requests(server, clock):
+    limiter = TokenBucketLimiter(requests_per_minute=2, tokens_per_minute=None, clock=clock, sleep=clock.sleep)
+    config = make_config(server, clock, limiter=limiter)
+
+    for i in range(3):
+        assert content(chat(config, f"Message {i}")) == MOCK_REPLY
+
+    # Two requests fit in the bucket; the third waits for one to refill (30 seconds at 2 per minute)
+    assert clock.sleeps == [pytest.approx(30.0)]
+    assert config.metrics()["throttled_seconds"] == pytest.approx(30.0)
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers(server, clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60, clock=clock)
+    config = make_config(server, clock, max_retries=0, circuit_breaker=breaker)
+    fallback = lambda: local_chat_response("local")
+    server.fail_next(503, count=2)
+
+    chat(config, "First", fallback=fallback)
+    chat(config, "Second", fallback=fallback)
+    assert breaker.state == "open"
+
+    # While open, requests go straight to the fallback without reaching the API
+    response = chat(config, "Third", fallback=fallback)
+    assert content(response) == "local"
+    assert len(server.requests) == 2
+    assert config.metrics()["short_circuited"] == 1
+
+    # After the reset time one trial request goes through and closes the circuit
+    clock.now += 60
+    assert content(chat(config, "Fourth")) == MOCK_REPLY
+    assert breaker.state == "closed"
+    assert len(server.requests) == 3
+
+
+def test_expired_response_is_served_while_api_is_down(server, clock):
+    cache = ResponseCache(ttl=0.05)
+    config = make_config(server, clock, max_retries=0, cache=cache)
+    assert content(chat(config)) == MOCK_REPLY
+    time.sleep(0.1)
+
+    server.fail_next(503, count=5)
+    assert content(chat(config, fallback=lambda: local_chat_response("local"))) == MOCK_REPLY
+
+    metrics = config.metrics()
+    assert metrics["stale_hits"] == 1
+    assert metrics["fallbacks"] == 0
+    # One miss per request: the stale lookup behind the fallback isn't counted again
+    assert metrics["cache"]["misses"] == 2
+    assert metrics["cache"]["hits"] == 0
@@ -0,0 +1,81 @@
+from backend.prompt_builder import GAP_MARKER, PromptBuilder, compress_transcript, count_tokens
+
+NEUTRAL = " ".join(f"We went to the store on day {i} and bought some bread." for i in range(30))
+SALIENT = "I feel so scared and hopeless about everything."
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("Hello there.") < count_tokens("Hello there. " * 20)
+
+
+def test_compress_removes_fillers_stutters_and_repeats():
+    text = "Um, I, I, I feel really anxious. Yeah. Okay. Uh-huh. I feel really anxious. Mm-hmm, it was hard."
+
+    assert compress_transcript(text) == "I feel really anxious. It was hard."
+
+
+def test_compress_keeps_grammatical_repeats():
+    assert compress_transcript("I had had enough.") == "I had had enough."
+
+
+def test_short_transcript_is_only_compressed():
+    builder = PromptBuilder("sys")
+
+    assert builder.fit("Um, I feel calm today.") == "I feel calm today."
+
+
+def test_fit_keeps_salient_segment_and_marks_gaps():
+    builder = PromptBuilder("sys", segment_tokens=20)
+    later = " ".join(f"On day {i} we cooked pasta at home." for i in range(30))
+
+    fitted = builder.fit(f"{NEUTRAL} {SALIENT} {later}", budget_tokens=40)
+
+    assert SALIENT in fitted
+    # Dropped stretches on both sides of the kept segments become single markers
+    assert fitted.endswith(GAP_MARKER)
+    assert f"{GAP_MARKER} {GAP_MARKER}" not in fitted
+    assert builder.count(fitted) <= 40
+
+
+def test_small_budget_keeps_part_of_the_transcript():
+    builder = PromptBuilder("sys")
+    one_long_sentence = " ".join(["we talked about the week"] * 60) + "."
+
+    for transcript in (NEUTRAL, one_long_sentence):
+        fitted = builder.fit(transcript, budget_tokens=10)
+        assert fitted.replace(GAP_MARKER, "").strip()
+        assert builder.count(fitted) <= 10
+
+
+def test_small_history_budget_keeps_history():
+    builder = PromptBuilder("sys", patient_data={"name": "Jane", "history": NEUTRAL}, history_tokens=8)
+
+    history = builder.prefix.split("History: ", 1)[1]
+    assert history.replace(GAP_MARKER, "").strip()
+
+
+def test_prefix_is_identical_across_builds():
+    builder = PromptBuilder("sys", patient_data={"name": "Jane", "age": 30, "history": "Anxiety."})
+
+    first = builder.build("Summarize.", "I feel calm.")
+    second = builder.build("Summarize.", SALIENT)
+
+    assert first[0] == second[0]
+    assert first[0]["content"] == builder.prefix
+    assert first[1] != second[1]
+
+
+def test_tokens_saved_accounting():
+    builder = PromptBuilder("sys", budget_tokens=60)
+
+    builder.build("Summarize.", f"{NEUTRAL} {SALIENT}")
+    report = builder.last_report
+    assert report["tokens_saved"] == report["original_tokens"] - report["prompt_tokens"] > 0
+
+    builder.build("Summarize.")
+    stats = builder.stats()
+    assert stats["requests"] == 2
+    assert stats["tokens_saved"] == report["tokens_saved"]
+    assert stats["original_tokens"] - stats["prompt_tokens"] == stats["tokens_saved"]
+    assert stats["prefix_tokens"] == builder.count("sys")
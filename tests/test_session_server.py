@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.hue_bridge import FakeBridge
+from backend.pipeline_benchmark import generate_fixtures
+from backend.playlist_index import PlaylistIndex
+from backend.session_server import SessionServer, SharedResources, stream_recording
+from backend.spotify_client import FakeSpotify
+from backend.transcription import StubTranscriptionEngine
+from integrations.mock_openai_server import MockOpenAIServer
+from integrations.openai_config import OpenAIConfig
+from integrations.response_cache import ResponseCache
+
+UNREACHABLE_IP = "10.0.0.99"
+
+
+@pytest.fixture
+def recording(tmp_path):
+    fixture = generate_fixtures(str(tmp_path / "fixtures"), count=1, seconds=30)[0]
+    return str(tmp_path / "fixtures" / fixture["file"])
+
+
+@pytest.fixture
+def mock_api():
+    server = MockOpenAIServer().start()
+    yield server
+    server.stop()
+
+
+def serve_rooms(tmp_path, mock_api, rooms):
+    bridges = {}
+
+    def connect(bridge_ip):
+        if bridge_ip == UNREACHABLE_IP:
+            raise ConnectionError("bridge unreachable")
+        return bridges.setdefault(bridge_ip, FakeBridge())
+
+    devices = [{"id": f"speaker-{name}", "name": f"{name} speaker", "is_active": True} for name in rooms]
+    shared = SharedResources(
+        openai_config=OpenAIConfig(api_key="test", api_base=mock_api.url, cache=ResponseCache()),
+        transcription_engine=StubTranscriptionEngine(),
+        spotify=FakeSpotify(devices=devices),
+        search_cache=ResponseCache(),
+        playlist_index=PlaylistIndex(str(tmp_path / "playlist_index.json")),
+        bridge_factory=connect,
+        workers=4
+    )
+
+    async def run():
+        server = await SessionServer(shared, host="127.0.0.1", port=0,
+                                     recordings_folder=str(tmp_path / "rooms")).start()
+        try:
+            return await asyncio.gather(*(
+                stream_recording(path, port=server.port, room=name, speedup=0, spotify_device=f"{name} speaker",
+                                 summarize=False, **options)
+                for name, (path, options) in rooms.items()
+            )), server
+        finally:
+            await server.stop()
+            shared.close()
+
+    results, server = asyncio.run(run())
+    return dict(zip(rooms, results)), server, bridges
+
+
+def test_two_rooms_stream_concurrently(tmp_path, mock_api, recording):
+    rooms = {
+        "room-1": (recording, {"bridge_ip": "10.0.0.1", "group_id": 1}),
+        "room-2": (recording, {"bridge_ip": "10.0.0.1", "group_id": 2}),
+    }
+    messages, server, bridges = serve_rooms(tmp_path, mock_api, rooms)
+
+    for name, room_messages in messages.items():
+        windows = [message for message in room_messages if message["type"] == "window"]
+        summary = room_messages[-1]
+        assert windows and all(message["room"] == name for message in windows)
+        assert summary["type"] == "summary" and summary["stats"]["errors"] == 0
+    # Both rooms share one bridge connection and drive their own light group
+    assert list(bridges) == ["10.0.0.1"]
+    assert {target for _, kind, target, _ in bridges["10.0.0.1"].commands if kind == "group"} == {1, 2}
+    assert server.rooms == {} and server.rooms_served == 2
+
+
+def test_rooms_without_a_reachable_bridge_run_without_lighting(tmp_path, mock_api, recording, monkeypatch):
+    monkeypatch.delenv("HUE_BRIDGE_IP", raising=False)
+    rooms = {
+        "unreachable": (recording, {"bridge_ip": UNREACHABLE_IP}),
+        "no-bridge": (recording, {}),
+    }
+    messages, server, bridges = serve_rooms(tmp_path, mock_api, rooms)
+
+    for room_messages in messages.values():
+        assert not [message for message in room_messages if message["type"] == "error"]
+        assert any(message["type"] == "window" for message in room_messages)
+        assert room_messages[-1]["type"] == "summary"
+    assert bridges == {}
+    assert server.rooms_served == 2
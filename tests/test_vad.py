@@ -0,0 +1,92 @@
+import numpy as np
+
+from backend.vad import VoiceActivityDetector
+
+RATE = 16000
+
+
+def pcm(samples):
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+
+def hum(seconds, amplitude=600, frequency=300):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def band_noise(seconds, rms=500, low=200, high=2000, seed=0):
+    # White noise limited to the speech band, so its zero-crossing rate looks like voice
+    spectrum = np.fft.rfft(np.random.default_rng(seed).normal(size=int(seconds * RATE)))
+    frequencies = np.fft.rfftfreq(int(seconds * RATE), 1 / RATE)
+    spectrum[(frequencies < low) | (frequencies > high)] = 0
+    noise = np.fft.irfft(spectrum, int(seconds * RATE))
+    return noise * rms / np.sqrt(np.mean(noise ** 2))
+
+
+def speech_bursts(seconds, bursts, amplitude=4000):
+    """
+    Voiced 'utterances' (a 150 Hz harmonic tone with a syllable-rate envelope) at the given (start, end) times.
+    """
+    t = np.arange(int(seconds * RATE)) / RATE
+    voice = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+    mask = np.zeros_like(t)
+    for start, end in bursts:
+        mask[int(start * RATE):int(end * RATE)] = 1.0
+    return amplitude * voice * envelope * mask / 2
+
+
+def test_silence_is_skipped():
+    vad = VoiceActivityDetector()
+    frames = pcm(np.random.default_rng(1).normal(scale=20, size=10 * RATE))
+
+    assert vad.detect(frames, RATE) == []
+    assert not vad.is_speech(frames, RATE)
+    assert vad.stats()["skipped_ratio"] == 1.0
+
+
+def test_stationary_noise_is_not_speech():
+    for noise in (hum(10), band_noise(10)):
+        vad = VoiceActivityDetector()
+        frames = pcm(noise)
+
+        assert vad.speech_frames(np.frombuffer(frames, dtype=np.int16), RATE).mean() == 0.0
+        assert not vad.is_speech(frames, RATE)
+        assert vad.detect(frames, RATE) == []
+
+
+def test_speech_bursts_over_noise_are_found():
+    vad = VoiceActivityDetector()
+    vad.detect(pcm(band_noise(10, seed=1)), RATE)
+    assert vad.noise_floor is not None
+
+    bursts = [(1.0, 2.5), (4.0, 5.0), (7.0, 8.5)]
+    frames = pcm(band_noise(10, seed=2) + speech_bursts(10, bursts))
+
+    assert vad.is_speech(frames, RATE)
+    segments = vad.detect(frames, RATE, offset=10.0)
+    assert len(segments) == len(bursts)
+    for segment, (start, end) in zip(segments, bursts):
+        assert segment["start"] <= 10.0 + start and segment["end"] >= 10.0 + end
+        assert segment["end"] - segment["start"] < (end - start) + 1.0
+
+
+def test_noise_floor_adapts_to_the_room():
+    vad = VoiceActivityDetector()
+    vad.detect(pcm(band_noise(10, rms=100)), RATE)
+    quiet_floor = vad.noise_floor
+
+    vad.detect(pcm(band_noise(10, rms=500, seed=3)), RATE)
+    assert vad.noise_floor > 3 * quiet_floor
+    # Speech is still found once the room got louder
+    assert vad.is_speech(pcm(band_noise(10, seed=4) + speech_bursts(10, [(2.0, 6.0)])), RATE)
+
+
+def test_overlapping_windows_are_counted_once():
+    vad = VoiceActivityDetector()
+    audio = band_noise(18) + speech_bursts(18, [(3.0, 6.0), (12.0, 15.0)])
+    vad.detect(pcm(audio[:10 * RATE]), RATE, offset=0.0)
+    vad.detect(pcm(audio[8 * RATE:]), RATE, offset=8.0)
+
+    stats = vad.stats()
+    assert abs(stats["speech_seconds"] + stats["silence_seconds"] - 18.0) < 1e-6
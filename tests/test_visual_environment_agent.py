@@ -0,0 +1,92 @@
+import time
+
+from backend.hue_bridge import FakeBridge
+from backend.visual_environment_agent import VisualLightAgent
+from integrations.tracing import Tracer
+
+CALM = [0.4, 0.5]
+UPLIFTING = [0.5, 0.4]
+NEUTRAL = [0.33, 0.33]
+
+
+def make_agent(**kwargs):
+    bridge = FakeBridge()
+    agent = VisualLightAgent(None, bridge=bridge, tracer=Tracer(), **kwargs)
+    return agent, bridge
+
+
+def sent_colors(agent, bridge):
+    agent.command_queue.flush(timeout=5)
+    return [params["xy"] for _, _, _, params in bridge.commands]
+
+
+def test_first_mood_is_applied_immediately():
+    agent, bridge = make_agent()
+
+    assert agent.adjust_lighting("calm") is True
+    assert sent_colors(agent, bridge) == [CALM]
+
+
+def test_change_during_hold_is_applied_when_hold_expires():
+    agent, bridge = make_agent(min_hold_seconds=0.2)
+
+    agent.adjust_lighting("calm")
+    assert agent.adjust_lighting("uplifting") is False
+    assert sent_colors(agent, bridge) == [CALM]
+
+    time.sleep(0.4)
+    assert sent_colors(agent, bridge) == [CALM, UPLIFTING]
+    assert all(light.xy == UPLIFTING for light in bridge.lights)
+
+
+def test_newer_request_replaces_pending_color():
+    agent, bridge = make_agent(min_hold_seconds=0.2)
+
+    agent.adjust_lighting("calm")
+    agent.adjust_lighting("uplifting")
+    agent.adjust_lighting("neutral")
+
+    time.sleep(0.4)
+    assert sent_colors(agent, bridge) == [CALM, NEUTRAL]
+
+
+def test_returning_to_current_color_cancels_pending_change():
+    agent, bridge = make_agent(min_hold_seconds=0.2)
+
+    agent.adjust_lighting("calm")
+    agent.adjust_lighting("uplifting")
+    assert agent.adjust_lighting("calm") is False
+
+    time.sleep(0.4)
+    assert sent_colors(agent, bridge) == [CALM]
+
+
+def test_change_after_hold_is_applied_immediately():
+    agent, bridge = make_agent(min_hold_seconds=0)
+
+    agent.adjust_lighting("calm")
+    agent.command_queue.flush(timeout=5)
+    assert agent.adjust_lighting("uplifting") is True
+    assert sent_colors(agent, bridge) == [CALM, UPLIFTING]
+
+
+def test_confirm_updates_requires_repeated_requests():
+    agent, bridge = make_agent(min_hold_seconds=0, confirm_updates=2)
+
+    agent.adjust_lighting("calm")
+    agent.command_queue.flush(timeout=5)
+    assert agent.adjust_lighting("uplifting") is False
+    assert agent.adjust_lighting("uplifting") is True
+    assert sent_colors(agent, bridge) == [CALM, UPLIFTING]
+
+
+def test_only_sent_commands_are_traced():
+    agent, bridge = make_agent(min_hold_seconds=0.2)
+
+    agent.adjust_lighting("calm")
+    agent.adjust_lighting("calm")
+    agent.adjust_lighting("uplifting")
+    time.sleep(0.4)
+
+    assert sent_colors(agent, bridge) == [CALM, UPLIFTING]
+    assert agent.tracer.snapshot()["adjust_lighting"]["count"] == 2